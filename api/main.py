@@ -1,22 +1,243 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+import os
+import json
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Callable, Literal, Optional
+
+import anyio
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from src.agents.orchestrator import Orchestrator
+from src.llm.gemini_client import aclose_gemini_client
+from src.utils.admission import AdmissionRejected, admission_controller_from_env
+from src.utils.metrics import render_prometheus
+
+
+logger = logging.getLogger(__name__)
+
+_orch: Optional[Orchestrator] = None
+_orch_lock = threading.Lock()
+
+
+def get_orchestrator() -> Orchestrator:
+    """Built on first use, so importing this module stays cheap."""
+    global _orch
+    if _orch is None:
+        with _orch_lock:
+            if _orch is None:
+                _orch = Orchestrator()
+    return _orch
+
 
-app = FastAPI(title="CivicAgent API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # CIVICAGENT_WARMUP=0 skips eager agent construction (agents then load
+    # on the first request that needs them)
+    if os.getenv("CIVICAGENT_WARMUP", "1").lower() not in ("0", "false", "no", "off"):
+        timings = await run_in_threadpool(lambda: get_orchestrator().warm_up())
+        logger.info("warm-up: " + ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in timings.items()))
+    yield
+    # stop job workers (queued jobs resume on the next start) and release
+    # the pooled Gemini HTTP session
+    global _orch
+    if _orch is not None:
+        _orch.close()
+        _orch = None
+    await aclose_gemini_client()
 
-orch = Orchestrator()
+
+app = FastAPI(title="CivicAgent API", lifespan=lifespan)
+
+admission = admission_controller_from_env()
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": "Server busy, retry later", "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 class TicketRequest(BaseModel):
     user_id: str
     location: str
     description: str
     image_paths: list[str] = []
+    # rules_only | hybrid | full_llm; defaults to CIVICAGENT_EXECUTION_TIER
+    tier: Optional[Literal["rules_only", "hybrid", "full_llm"]] = None
+
+class BatchTicketRequest(BaseModel):
+    reports: list[TicketRequest] = Field(..., min_length=1, max_length=1000)
+    max_concurrency: int = Field(8, ge=1, le=64)
 
 @app.post("/create_ticket")
-def create_ticket(req: TicketRequest):
-    return orch.create_ticket(
-        user_id=req.user_id,
-        location=req.location,
-        description=req.description,
-        image_paths=req.image_paths
-    )
\ No newline at end of file
+async def create_ticket(req: TicketRequest):
+    # the pipeline is blocking; it runs in the thread pool only once admitted
+    async with admission.admit():
+        return await run_in_threadpool(
+            get_orchestrator().create_ticket,
+            user_id=req.user_id,
+            location=req.location,
+            description=req.description,
+            image_paths=req.image_paths,
+            tier=req.tier
+        )
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """
+    Releases an admission slot when the response ends, however it ends:
+    body sent, client gone before or during the body, or an error. A
+    generator's own finally would never run if iteration never started.
+    on_close (blocking) runs first, so work still running for the
+    response finishes before its slots are handed to someone else.
+    """
+
+    def __init__(
+        self,
+        content,
+        admitted_at: float,
+        slots: int = 1,
+        on_close: Optional[Callable[[], None]] = None,
+        observe: bool = True,
+        **kwargs
+    ):
+        super().__init__(content, **kwargs)
+        self._admitted_at = admitted_at
+        self._slots = slots
+        self._on_close = on_close
+        self._observe = observe
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                if self._on_close is not None:
+                    with anyio.CancelScope(shield=True):
+                        await run_in_threadpool(self._on_close)
+            finally:
+                admission.release(self._admitted_at, self._slots, observe=self._observe)
+
+@app.post("/create_ticket/stream")
+async def create_ticket_stream(req: TicketRequest):
+    """
+    Server-sent events, one per pipeline stage as it completes:
+    research, evidence, summary_token (repeated), ticket.
+    A report matching an open ticket ends with a single duplicate event;
+    a failure mid-pipeline ends the stream with an error event.
+    The admission slot is held until the response ends.
+    """
+    # rejections surface as 429/503 before streaming starts
+    admitted_at = await admission.acquire()
+
+    async def events():
+        try:
+            stages = get_orchestrator().stream_ticket(
+                user_id=req.user_id,
+                location=req.location,
+                description=req.description,
+                image_paths=req.image_paths,
+                tier=req.tier
+            )
+            async for event, data in iterate_in_threadpool(stages):
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return _AdmittedStreamingResponse(
+        events(),
+        admitted_at,
+        media_type="text/event-stream",
+        # keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/create_tickets_batch")
+async def create_tickets_batch(req: BatchTicketRequest):
+    """
+    Streams one NDJSON line per report as soon as its ticket is ready
+    (completion order; each line carries the report's "index").
+    The batch holds one admission slot per concurrent report, so
+    max_concurrency is capped at CIVICAGENT_MAX_IN_FLIGHT.
+    """
+    orch = get_orchestrator()
+    reports = [r.model_dump() for r in req.reports]
+    slots = min(req.max_concurrency, admission.max_in_flight)
+    admitted_at = await admission.acquire(slots)
+    # nothing runs until the response iterates it
+    batch = orch.create_tickets_batch(reports, max_concurrency=slots)
+
+    async def lines():
+        async for r in iterate_in_threadpool(iter(batch)):
+            # Retry-After learns per-report service times, not the batch's
+            if "elapsed" in r:
+                admission.observe(r["elapsed"])
+            yield json.dumps(r, default=str) + "\n"
+
+    return _AdmittedStreamingResponse(
+        lines(), admitted_at, slots, on_close=batch.close, observe=False, media_type="application/x-ndjson"
+    )
+
+@app.get("/tickets/{ticket_id}/status")
+def ticket_status(ticket_id: str):
+    """The ticket record plus the state of its queued form/comms jobs."""
+    status = get_orchestrator().ticket_status(ticket_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown ticket")
+    return status
+
+@app.get("/tickets/nearby")
+def tickets_nearby(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    address: Optional[str] = None,
+    radius_m: float = Query(200.0, gt=0, le=50_000),
+    category: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """Tickets within radius_m of a point (lat/lon, or an address to geocode), nearest first."""
+    orch = get_orchestrator()
+    if lat is None or lon is None:
+        if not address:
+            raise HTTPException(status_code=400, detail="Give lat and lon, or address")
+        point = orch.geocode(address)
+        if point is None:
+            raise HTTPException(status_code=404, detail="Address could not be geocoded")
+        lat, lon = point["lat"], point["lon"]
+    return {
+        "center": {"lat": lat, "lon": lon},
+        "radius_m": radius_m,
+        "tickets": orch.tickets_near(lat, lon, radius_m, category=category, limit=limit)
+    }
+
+@app.get("/tickets/bbox")
+def tickets_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    category: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=10_000)
+):
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="min_* must not exceed max_*")
+    return {"tickets": get_orchestrator().tickets_in_bbox(min_lat, min_lon, max_lat, max_lon, category=category, limit=limit)}
+
+@app.get("/hotspots")
+def hotspots(
+    category: Optional[str] = None,
+    k: int = Query(10, ge=1, le=1000),
+    precision: int = Query(6, ge=5, le=7)
+):
+    """Densest geohash cells (5 ~ 5 km, 6 ~ 1.2 km, 7 ~ 150 m), most tickets first."""
+    return {"hotspots": get_orchestrator().hotspots(category=category, k=k, precision=precision)}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
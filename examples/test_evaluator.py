@@ -10,7 +10,7 @@ def main():
         os.remove(str(OUTPUT_PATH))
     except Exception:
         pass
-    res = ev.run_all()
+    res = ev.run_all(parallelism=int(os.environ.get("EVAL_PARALLELISM", "4")))
     import json
     print("=== EVALUATION SUMMARY ===")
     print(json.dumps(res["summary"], indent=2))
@@ -1,7 +1,35 @@
 # src/agents/comms_agent.py
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional
 from src.llm.gemini_client import get_gemini_client
+from src.llm.prompt_builder import PromptBuilder
+
+
+SMS_MAX_CHARS = 160
+
+# Fields a citizen-facing message actually needs; everything else in the
+# ticket (form urls, raw evidence, etc.) is left out of the prompt.
+TICKET_CONTEXT_FIELDS = [
+    "ticket_id",
+    "issue_category",
+    "location",
+    "severity",
+    "department",
+    "summary",
+]
+
+# No maxLength on sms: the validator would hard-slice it mid-word, and
+# _clip_sms owns the limit (word-boundary cut plus "...")
+COMMS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "sms": {"type": "string"},
+        "email": {"type": "string"},
+        "app_notification": {"type": "string"}
+    },
+    "required": ["sms", "email", "app_notification"]
+}
 
 
 class CommsAgent:
@@ -9,46 +37,108 @@ class CommsAgent:
     Multi-channel communication agent.
     Produces SMS, Email, and App-Notification messages for the user.
     Powered by Gemini.
+
+    By default all three channels come from ONE structured call; any channel
+    the model leaves out is regenerated on its own, concurrently.
     """
 
-    def __init__(self, llm_api_key: Optional[str] = None):
+    CHANNELS = ["sms", "email", "app_notification"]
+
+    def __init__(self, llm_api_key: Optional[str] = None, single_call: bool = True):
         self.llm = get_gemini_client(llm_api_key)
+        self.single_call = single_call
+
+    @staticmethod
+    def _prompt(instructions: str, label: str, ticket: Dict[str, Any]) -> str:
+        """Instructions plus compact 'key: value' lines for the fields messages need."""
+        return PromptBuilder("comms").add(instructions).add_fields(ticket, TICKET_CONTEXT_FIELDS, label=label).build()
+
+    @staticmethod
+    def _clip_sms(text: str) -> str:
+        """Enforce the SMS length limit, cutting on a word boundary."""
+        text = " ".join(text.split())
+        if len(text) <= SMS_MAX_CHARS:
+            return text
+        cut = text[:SMS_MAX_CHARS - 3]
+        if " " in cut:
+            cut = cut.rsplit(" ", 1)[0]
+        return cut.rstrip(" ,.;:-") + "..."
 
     def generate_sms(self, ticket: Dict[str, Any]) -> str:
-        prompt = (
+        prompt = self._prompt(
             "Create a VERY short SMS-style message confirming a municipal incident "
-            "submission. Max 160 characters. Info:\n"
-            f"{ticket}"
+            f"submission. Max {SMS_MAX_CHARS} characters.",
+            "Info",
+            ticket
         )
-        return self.llm.generate_text(prompt).strip()
+        return self._clip_sms(self.llm.generate_text(prompt).strip())
 
     def generate_email(self, ticket: Dict[str, Any]) -> str:
-        prompt = (
+        prompt = self._prompt(
             "Write a polished, professional EMAIL confirming an incident report "
             "submission to a city government. Include:\n"
             "- Issue category\n"
             "- Location\n"
             "- Severity\n"
             "- Ticket ID\n"
-            "- Expected next steps\n\n"
-            f"Ticket data:\n{ticket}"
+            "- Expected next steps",
+            "Ticket data",
+            ticket
         )
         return self.llm.generate_text(prompt).strip()
 
     def generate_app_notification(self, ticket: Dict[str, Any]) -> str:
-        prompt = (
+        prompt = self._prompt(
             "Write a concise, friendly APP NOTIFICATION message acknowledging "
-            "an incident report submission. Keep it under 2 sentences.\n\n"
-            f"Details:\n{ticket}"
+            "an incident report submission. Keep it under 2 sentences.",
+            "Details",
+            ticket
         )
         return self.llm.generate_text(prompt).strip()
 
+    def _generate_channels_combined(self, ticket: Dict[str, Any]) -> Dict[str, str]:
+        """
+        One structured call producing every channel. Returns only the
+        channels that came back as non-empty strings.
+        """
+        prompt = self._prompt(
+            "Write confirmation messages for a municipal incident report submission.\n"
+            f"- sms: VERY short SMS, max {SMS_MAX_CHARS} characters.\n"
+            "- email: polished, professional email covering issue category, location, "
+            "severity, ticket ID and expected next steps.\n"
+            "- app_notification: concise, friendly, under 2 sentences.",
+            "Ticket data",
+            ticket
+        )
+        out = self.llm.generate_structured(prompt, COMMS_SCHEMA)
+        channels = {}
+        for channel in self.CHANNELS:
+            value = out.get(channel) if isinstance(out, dict) else None
+            if isinstance(value, str) and value.strip():
+                channels[channel] = value.strip()
+        return channels
+
     def generate_all_channels(self, ticket: Dict[str, Any]) -> Dict[str, str]:
         """
         Master method returning all communication formats.
         """
-        return {
-            "sms": self.generate_sms(ticket),
-            "email": self.generate_email(ticket),
-            "app_notification": self.generate_app_notification(ticket),
-        }
\ No newline at end of file
+        generators = {
+            "sms": self.generate_sms,
+            "email": self.generate_email,
+            "app_notification": self.generate_app_notification,
+        }
+
+        if not self.single_call:
+            return {channel: generators[channel](ticket) for channel in self.CHANNELS}
+
+        channels = self._generate_channels_combined(ticket)
+
+        # fall back to per-channel calls, in parallel, for whatever is missing
+        missing = [c for c in self.CHANNELS if c not in channels]
+        if missing:
+            with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+                for channel, text in zip(missing, pool.map(lambda c: generators[c](ticket), missing)):
+                    channels[channel] = text
+
+        channels["sms"] = self._clip_sms(channels["sms"])
+        return {channel: channels[channel] for channel in self.CHANNELS}
@@ -1,18 +1,31 @@
 # src/agents/evidence_agent.py
 
 from typing import Any, Dict, Optional, List
-import base64
-import mimetypes
 import os
 
 from src.llm.gemini_client import get_gemini_client
+from src.llm.prompt_builder import PromptBuilder
 from src.utils.logging_tracing import TraceSpan
+from src.utils.image_pipeline import ImagePreprocessor
 
-# Load schema
 import json
+from functools import lru_cache
+
 SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schemas", "evidence_schema.json")
-with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
-    EVIDENCE_SCHEMA = json.load(f)
+
+
+@lru_cache(maxsize=1)
+def load_evidence_schema() -> Dict[str, Any]:
+    """Read the schema on first use rather than at import."""
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def __getattr__(name: str):
+    # EVIDENCE_SCHEMA stays importable without being loaded at import time
+    if name == "EVIDENCE_SCHEMA":
+        return load_evidence_schema()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class EvidenceAgent:
@@ -24,42 +37,38 @@ class EvidenceAgent:
     - summarizing findings into structured output
     """
 
-    def __init__(self, observability=None, gemini_api_key: Optional[str] = None):
+    def __init__(
+        self,
+        observability=None,
+        gemini_api_key: Optional[str] = None,
+        image_preprocessor: Optional[ImagePreprocessor] = None
+    ):
         self.obs = observability
         self.llm = get_gemini_client(api_key=gemini_api_key)
-
-    def _prepare_image_input(self, image_path: str) -> Dict[str, Any]:
-        """
-        Convert image to base64 and return Gemini image dict.
-        """
-        mime = mimetypes.guess_type(image_path)[0] or "image/jpeg"
-        with open(image_path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode("utf-8")
-        return {
-            "mime_type": mime,
-            "data": b64
-        }
+        self.images = image_preprocessor or ImagePreprocessor()
 
     def analyze_evidence(
         self,
         issue_description: str,
-        image_paths: Optional[List[str]] = None
+        image_paths: Optional[List[str]] = None,
+        images_payload: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
         Main entrypoint for evidence evaluation.
         Accepts:
         - textual description (mandatory)
         - optional images (1 or more paths)
+        - images_payload: output of self.images.prepare(image_paths) when
+          the caller already prepared them (e.g. concurrently)
         """
         span = TraceSpan(name="evidence.analyze")
 
-        # Prepare inputs
-        images_payload = []
-        if image_paths:
-            for p in image_paths:
-                images_payload.append(self._prepare_image_input(p))
+        # Prepare inputs (parallel read, dedupe, downsize, payload budget)
+        if images_payload is None:
+            images_payload = self.images.prepare(image_paths)
+        span.log(action="images_prepared", requested=len(image_paths or []), sent=len(images_payload))
 
-        prompt = (
+        instructions = (
             "You are an expert civic infrastructure inspector.\n"
             "Analyze the user's textual description and the provided images.\n\n"
             "Your job:\n"
@@ -67,15 +76,19 @@ class EvidenceAgent:
             "2. Assess severity: low, medium, or high.\n"
             "3. Evaluate evidence quality (good, moderate, poor).\n"
             "4. Produce a short text summary.\n\n"
-            "Return ONLY JSON following the exact schema provided."
+            "Return ONLY JSON; the response schema is enforced by the API."
         )
+        # long descriptions are cut to the evidence prompt budget
+        prompt, text_input = PromptBuilder("evidence").add(instructions).add_text(
+            "Citizen description", issue_description or "(none)"
+        ).build_parts()
 
         # Gemini call
         result = self.llm.generate_structured_vision(
             prompt=prompt,
-            text_input=issue_description,
+            text_input=text_input,
             images=images_payload,
-            schema=EVIDENCE_SCHEMA
+            schema=load_evidence_schema()
         )
 
         span.log(action="gemini_evidence", output=result)
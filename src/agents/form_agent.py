@@ -5,6 +5,7 @@ import datetime
 from typing import Dict, Any, List, Optional
 
 from src.llm.gemini_client import get_gemini_client
+from src.llm.prompt_builder import PromptBuilder
 
 
 class FormAgent:
@@ -31,6 +32,9 @@ class FormAgent:
         "priority",
     ]
 
+    # What the confirmation message is allowed to see (no attachments etc.)
+    CONFIRMATION_FIELDS = REQUIRED_FIELDS + ["department", "priority"]
+
     def __init__(self, llm_api_key: Optional[str] = None):
         self.llm = get_gemini_client(llm_api_key)
 
@@ -82,17 +86,18 @@ class FormAgent:
         """
         Let Gemini generate a nice confirmation or error message.
         """
+        builder = PromptBuilder("form")
         if missing:
-            prompt = (
-                "A municipal incident form submission was attempted but missing fields "
-                f"{missing}. Generate a short, helpful message to the user explaining what is missing."
+            builder.add(
+                "A municipal incident form submission was attempted but missing fields: "
+                f"{', '.join(missing)}. Generate a short, helpful message to the user explaining what is missing."
             )
         else:
-            prompt = (
+            builder.add(
                 "A municipal incident report form has been successfully prepared. "
-                "Create a concise confirmation message summarizing the incident using:\n"
-                f"{payload['fields']}"
-            )
+                "Create a concise confirmation message summarizing the incident using:"
+            ).add_fields(payload["fields"], self.CONFIRMATION_FIELDS)
+        prompt = builder.build()
 
         msg = self.llm.generate_text(prompt)
         return msg.strip()
@@ -1,21 +1,34 @@
 # src/agents/orchestrator.py
+import os
 import uuid
 import time
-from typing import Optional, List, Dict, Any
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 
 from src.session.session_manager import SessionManager
+from src.session.backends import session_store_from_env
 from src.memory.memory_manager import MemoryManager
+from src.memory.duplicate_index import DuplicateIndex
 from src.utils.logging_tracing import TraceSpan, ObservabilityWriter
-from src.agents.research_agent import ResearchAgent
-from src.agents.evidence_agent import EvidenceAgent
-from src.llm.gemini_client import get_gemini_client
+from src.agents.pipeline import Pipeline, Stage
+from src.agents.registry import AgentRegistry, default_agent_factories
+from src.agents.ticket_templates import render_ticket_template
+from src.geo.geocoder import Geocoder, geocoder_from_env
+from src.geo.spatial_index import SpatialIndex
+from src.jobs.work_queue import SQLiteWorkQueue, WorkerPool, work_queue_from_env
+from src.llm.prompt_builder import PromptBuilder
+from src.utils.image_pipeline import perceptual_hashes
+from src.utils.metrics import track_stage
+from src.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 
 # Schema for the final ticket we will ask Gemini to help produce (structured)
 TICKET_SCHEMA = {
     "type": "object",
     "properties": {
-        "ticket_id": {"type": "string"},
         "location": {"type": "string"},
         "issue_category": {"type": "string"},
         "department": {"type": "string"},
@@ -26,20 +39,193 @@ TICKET_SCHEMA = {
         "actions": {"type": "array", "items": {"type": "string"}},
         "priority": {"type": "string"}
     },
-    "required": ["ticket_id", "location", "issue_category", "department", "severity", "summary"]
+    "required": ["location", "issue_category", "department", "severity", "summary"]
 }
 
+# Context the ticket prompt carries, in this order
+TICKET_CONTEXT_FIELDS = ["location", "issue_category", "department", "severity", "evidence_quality"]
+
+# How much of create_ticket goes through Gemini:
+# - rules_only: templates from the rule-based classification, zero LLM calls
+# - hybrid: LLM (evidence + ticket) only for reports without a keyword match
+#   (semantic fallback hits included) or with images; rule-derived fields
+#   stay authoritative when keywords matched
+# - full_llm: evidence + ticket LLM calls for every report
+EXECUTION_TIERS = ("rules_only", "hybrid", "full_llm")
+DEFAULT_EXECUTION_TIER = os.getenv("CIVICAGENT_EXECUTION_TIER", "full_llm")
+
+# Ticket fields the rule merge decides
+RULE_FIELDS = ("issue_category", "department", "severity", "form_url")
+
+# Seconds a new ticket absorbs matching reports (CIVICAGENT_DEDUPE_WINDOW);
+# unset or 0 leaves duplicate detection off
+DEFAULT_DEDUPE_WINDOW = float(os.getenv("CIVICAGENT_DEDUPE_WINDOW", "0")) or None
+
+# Seconds a finished create_ticket result answers identical repeat requests
+DEFAULT_COALESCE_WINDOW = float(os.getenv("CIVICAGENT_COALESCE_WINDOW", "2"))
+
+# Agents run after the ticket exists (CIVICAGENT_FOLLOW_UP_STAGES=form,comms).
+# Inline they are optional pipeline stages: a failure or timeout leaves the
+# ticket intact and is reported under "partial". With a work queue
+# (CIVICAGENT_JOB_DB) they are enqueued instead and run in the background.
+FOLLOW_UP_STAGES = ("form", "comms")
+DEFAULT_FOLLOW_UP_STAGES = tuple(
+    s.strip() for s in os.getenv("CIVICAGENT_FOLLOW_UP_STAGES", "").split(",") if s.strip()
+)
+DEFAULT_FOLLOW_UP_TIMEOUT = float(os.getenv("CIVICAGENT_FOLLOW_UP_TIMEOUT", "10"))
+
+# Background threads draining the work queue
+DEFAULT_JOB_WORKERS = int(os.getenv("CIVICAGENT_JOB_WORKERS", "2"))
+
+# Threads shared by all pipeline runs for stages that overlap
+DEFAULT_PIPELINE_WORKERS = int(os.getenv("CIVICAGENT_PIPELINE_WORKERS", "64"))
+
+# Plain-text layout requested by stream_ticket so the summary can be streamed
+STREAM_SUMMARY_MARKER = "SUMMARY:"
+STREAM_ACTIONS_MARKER = "ACTIONS:"
+
+
+class TicketBatch:
+    """
+    Iterable results of Orchestrator.create_tickets_batch.
+
+    close() (safe from any thread, even while another thread is iterating)
+    cancels reports that have not started and waits for the running ones,
+    so capacity held for the batch can be released only once it is idle.
+    """
+
+    def __init__(self, orch: "Orchestrator", reports: List[Dict[str, Any]], max_concurrency: int):
+        self._orch = orch
+        self._reports = reports
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
+        self._closed = False
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        orch = self._orch
+        with track_stage("batch_research"):
+            classified = orch.research.classify_batch([r["description"] for r in self._reports])
+
+        futures = {}
+        try:
+            for i, (r, research_out) in enumerate(zip(self._reports, classified)):
+                if self._closed:
+                    break
+                futures[self._pool.submit(
+                    orch.create_ticket,
+                    user_id=r["user_id"],
+                    location=r["location"],
+                    description=r["description"],
+                    image_paths=r.get("image_paths") or [],
+                    research_out=research_out,
+                    tier=r.get("tier")
+                )] = i
+        except RuntimeError:
+            pass  # closed while submitting
+        try:
+            for fut in as_completed(futures):
+                if fut.cancelled():
+                    continue
+                try:
+                    yield {"index": futures[fut], **fut.result()}
+                except Exception as e:
+                    yield {"index": futures[fut], "error": f"{type(e).__name__}: {e}"}
+        finally:
+            # consumer may stop early: drop queued work
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """Cancel reports not yet started and block until running ones finish."""
+        self._closed = True
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
 
 class Orchestrator:
-    def __init__(self, gemini_api_key: Optional[str] = None):
-        self.sessions = SessionManager()
+    def __init__(
+        self,
+        gemini_api_key: Optional[str] = None,
+        dedupe_window_seconds: Optional[float] = DEFAULT_DEDUPE_WINDOW,
+        coalesce_window_seconds: Optional[float] = DEFAULT_COALESCE_WINDOW,
+        execution_tier: str = DEFAULT_EXECUTION_TIER,
+        follow_up_stages: Tuple[str, ...] = DEFAULT_FOLLOW_UP_STAGES,
+        follow_up_timeout: float = DEFAULT_FOLLOW_UP_TIMEOUT,
+        work_queue: Optional[SQLiteWorkQueue] = None,
+        geocoder: Optional[Geocoder] = None
+    ):
+        self.execution_tier = self._check_tier(execution_tier)
+        unknown = set(follow_up_stages) - set(FOLLOW_UP_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown follow-up stages {sorted(unknown)}; expected some of {FOLLOW_UP_STAGES}")
+        self.follow_up_stages = tuple(follow_up_stages)
+        self.follow_up_timeout = follow_up_timeout
+        self.sessions = SessionManager(store=session_store_from_env())
         self.memory = MemoryManager()
+        # None disables duplicate detection
+        self.duplicates = DuplicateIndex(window_seconds=dedupe_window_seconds) if dedupe_window_seconds else None
+        # None disables coalescing of identical concurrent create_ticket calls
+        self.inflight = SingleFlight("create_ticket", coalesce_window_seconds) if coalesce_window_seconds is not None else None
         self.obs = ObservabilityWriter(output_path="observability_spans.ndjson")
-        # instantiate agents
-        self.research = ResearchAgent(gemini_api_key=gemini_api_key)
-        self.evidence = EvidenceAgent(gemini_api_key=gemini_api_key)
+        # locations are geocoded (None disables) and tickets indexed by position
+        self.geocoder = geocoder if geocoder is not None else geocoder_from_env()
+        self.geo_index = SpatialIndex()
+        # agents (and the Gemini client) are built on first use; see warm_up()
+        self.agents = AgentRegistry(default_agent_factories(gemini_api_key, observability=self.obs))
+        self._stage_pool = ThreadPoolExecutor(max_workers=DEFAULT_PIPELINE_WORKERS, thread_name_prefix="stage")
+        self.pipeline = self._build_pipeline()
+        # None runs follow-up stages inline
+        self.jobs = work_queue if work_queue is not None else work_queue_from_env()
+        self.workers = None
+        if self.jobs is not None:
+            self.workers = WorkerPool(
+                self.jobs,
+                {name: (lambda payload, name=name: self._run_follow_up(name, payload["ticket"])) for name in FOLLOW_UP_STAGES},
+                workers=DEFAULT_JOB_WORKERS
+            )
+            self.workers.start()
+
+    def close(self):
+        """Stop job workers (unfinished jobs resume on the next start) and the stage pool."""
+        if self.workers is not None:
+            self.workers.stop()
+        self._stage_pool.shutdown(wait=False)
+
+    @property
+    def research(self):
+        return self.agents.get("research")
+
+    @property
+    def evidence(self):
+        return self.agents.get("evidence")
+
+    @property
+    def llm(self):
         # LLM summarizer (lightweight)
-        self.llm = get_gemini_client(api_key=gemini_api_key)
+        return self.agents.get("llm")
+
+    def warm_up(self, names: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Import and construct agents ahead of the first request (all by
+        default). Returns seconds spent per agent.
+        """
+        return self.agents.warm_up(names)
+
+    @staticmethod
+    def _check_tier(tier: str) -> str:
+        if tier not in EXECUTION_TIERS:
+            raise ValueError(f"Unknown execution tier {tier!r}; expected one of {', '.join(EXECUTION_TIERS)}")
+        return tier
+
+    @staticmethod
+    def _keyword_matched(research_out: Dict[str, Any]) -> bool:
+        # semantic fallback hits are guesses; only keyword rules are trusted over the model
+        return research_out.get("matched_by", "none") == "keyword"
+
+    @staticmethod
+    def _uses_llm(tier: str, research_out: Dict[str, Any], image_paths: Optional[List[str]]) -> bool:
+        if tier == "full_llm":
+            return True
+        if tier == "rules_only":
+            return False
+        return not Orchestrator._keyword_matched(research_out) or bool(image_paths)
 
     def _generate_ticket_id(self) -> str:
         return "TKT-" + uuid.uuid4().hex[:8]
@@ -58,30 +244,144 @@ class Orchestrator:
         location: str,
         description: str,
         image_paths: Optional[List[str]] = None,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        research_out: Optional[Dict[str, Any]] = None,
+        tier: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Orchestrates ResearchAgent + EvidenceAgent, then asks Gemini to layout
         actions and produce a final ticket object. Persists session & memory.
+        Each stage is timed into civicagent_stage_duration_seconds.
+        research_out may carry a classification computed up front (batch path).
+        tier overrides the deployment's execution tier (see EXECUTION_TIERS).
+        Identical concurrent requests (same user, location, description,
+        image files, session and tier) share one execution.
         """
-        span = TraceSpan(name="orchestrator.create_ticket")
-        start_ts = time.time()
+        tier = self._check_tier(tier or self.execution_tier)
 
+        def run():
+            with track_stage("total"):
+                return self._create_ticket(user_id, location, description, image_paths, session_id, research_out, tier)
+
+        if self.inflight is None:
+            return run()
+        key = self._request_key(user_id, location, description, image_paths, session_id) + (tier,)
+        return self.inflight.do(key, run)
+
+    @staticmethod
+    def _request_key(
+        user_id: str,
+        location: str,
+        description: str,
+        image_paths: Optional[List[str]],
+        session_id: Optional[str]
+    ) -> tuple:
+        # (path, mtime, size) instead of a content hash: a stat per image on
+        # the request thread rather than reading every byte, which the
+        # evidence stage does anyway
+        image_keys = []
+        for path in image_paths or []:
+            try:
+                st = os.stat(path)
+                image_keys.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                image_keys.append((path,))  # unreadable; evidence stage will report it
+        return (user_id, location, description, tuple(image_keys), session_id)
+
+    def create_tickets_batch(
+        self,
+        reports: List[Dict[str, Any]],
+        max_concurrency: int = 8
+    ) -> "TicketBatch":
+        """
+        Classify all reports in one classify_batch pass, then run the LLM
+        stages with at most max_concurrency tickets in flight. Iterating
+        the result yields {"index": i, ...create_ticket result} (or
+        {"index": i, "error": ...}) as each ticket finishes, so callers can
+        stream results. Each report needs user_id, location, description;
+        image_paths and tier are optional. close() stops the batch early.
+        """
+        return TicketBatch(self, reports, max_concurrency)
+
+    # -- pipeline steps shared by create_ticket and stream_ticket ----------
+
+    def _start_session(self, user_id: str, session_id: Optional[str], span: TraceSpan) -> str:
         # create session if not provided
         if not session_id:
             session_id = self.sessions.new_session(user_id)
         span.log(event="session_created", session_id=session_id, user_id=user_id)
+        return session_id
 
-        # Step 1: Research
-        research_out = self.research.classify(description)
+    def _research_step(
+        self,
+        session_id: str,
+        description: str,
+        research_out: Optional[Dict[str, Any]],
+        span: TraceSpan
+    ) -> Dict[str, Any]:
+        if research_out is None:
+            with track_stage("research"):
+                research_out = self.research.classify(description)
         span.log(action="research", research_out=research_out)
-        self.sessions.append_event(session_id, {"type": "research", "result": research_out})
+        with track_stage("session_write"):
+            self.sessions.append_event(session_id, {"type": "research", "result": research_out})
+        return research_out
+
+    def _duplicate_step(
+        self,
+        user_id: str,
+        session_id: str,
+        location: str,
+        description: str,
+        research_out: Dict[str, Any],
+        image_hashes: List[int],
+        span: TraceSpan
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns the open ticket this report duplicates, or None. No LLM calls
+        have happened yet, so a hit short-circuits the whole pipeline.
+        """
+        if self.duplicates is None or not self._keyword_matched(research_out):
+            return None
+        with track_stage("duplicate_check"):
+            duplicate = self.duplicates.find(location, research_out.get("issue_category", ""), description, image_hashes)
+        if duplicate is not None:
+            linked = self.duplicates.link(duplicate)
+            span.log(action="duplicate_linked", ticket_id=duplicate["ticket_id"], linked_reports=linked)
+            self.sessions.append_event(session_id, {"type": "duplicate_linked", "ticket_id": duplicate["ticket_id"]})
+            self.memory.create_memory(user_id, "linked_report", {
+                "ticket_id": duplicate["ticket_id"],
+                "user_id": user_id,
+                "location": location,
+                "description": description,
+                "created_at": time.time()
+            })
+        return duplicate
 
-        # Step 2: Evidence
-        evidence_out = self.evidence.analyze_evidence(issue_description=description, image_paths=image_paths or [])
+    def _image_hashes_step(self, image_paths: Optional[List[str]]) -> List[int]:
+        if self.duplicates is None or not image_paths:
+            return []
+        with track_stage("image_hash"):
+            return perceptual_hashes(image_paths)
+
+    def _evidence_step(
+        self,
+        session_id: str,
+        description: str,
+        image_paths: Optional[List[str]],
+        span: TraceSpan,
+        images_payload: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        with track_stage("evidence"):
+            evidence_out = self.evidence.analyze_evidence(
+                issue_description=description, image_paths=image_paths or [], images_payload=images_payload
+            )
         span.log(action="evidence", evidence_out=evidence_out)
-        self.sessions.append_event(session_id, {"type": "evidence", "result": evidence_out})
+        with track_stage("session_write"):
+            self.sessions.append_event(session_id, {"type": "evidence", "result": evidence_out})
+        return evidence_out
 
+    def _merge_rules(self, research_out: Dict[str, Any]) -> Dict[str, Any]:
         # Merge: basic rule-based merge
         issue_category = (research_out.get("issue_category") or "").lower()
 
@@ -96,43 +396,118 @@ class Orchestrator:
             department = "sanitation"
             form_url = "N/A"
         else:
-            department = "general services"
-            form_url = "https://city.gov/forms/general-report"
-        
+            # any other category known to the regulation DB routes to its own department
+            department = (research_out.get("department") or "general services").lower()
+            form_url = research_out.get("form_url") or "https://city.gov/forms/general-report"
 
         # ALWAYS prefer rule-based severity for evaluation
         severity = research_out.get("severity_hint", "Medium")
-        summary_text = evidence_out.get("summary") if isinstance(evidence_out, dict) else description
+        return {
+            "issue_category": issue_category,
+            "department": department,
+            "form_url": form_url,
+            "severity": severity
+        }
+
+    @staticmethod
+    def _summary_text(evidence_out: Dict[str, Any], description: str) -> str:
+        # evidence_schema.json names it description_summary; "summary" is the pre-schema key
+        if not isinstance(evidence_out, dict):
+            return description
+        return evidence_out.get("description_summary") or evidence_out.get("summary") or description
+
+    @staticmethod
+    def _evidence_quality(evidence_out: Dict[str, Any]) -> str:
+        if not isinstance(evidence_out, dict):
+            return "unknown"
+        findings = evidence_out.get("structured_findings")
+        quality = findings.get("evidence_quality") if isinstance(findings, dict) else None
+        return quality or evidence_out.get("evidence_quality") or "unknown"
 
-        # Step 3: LLM-assisted ticket assembly & action recommendations (light touch)
-        prompt = (
-        f"Create a short civic ticket summary and a prioritized list of actionable next steps.\n\n"
-        f"Context:\n- Location: {location}\n- Issue Category: {issue_category}\n"
-        f"- Department: {department}\n- Severity: {severity}\n"
-        f"- Evidence Quality: {evidence_out.get('evidence_quality', 'unknown')}\n"
-        f"- Description: {description}\n- Evidence Summary: {summary_text}\n\n"
-        "Return a strict JSON object matching the schema and recommend 2-4 concise actions."
-      )
+    def _ticket_prompt(
+        self,
+        answer_format: str,
+        location: str,
+        description: str,
+        rules: Dict[str, Any],
+        evidence_out: Dict[str, Any]
+    ) -> str:
+        context = {"location": location, "evidence_quality": self._evidence_quality(evidence_out), **rules}
+        return (
+            PromptBuilder("orchestrator")
+            .add("Create a short civic ticket summary and a prioritized list of actionable next steps.")
+            .add_fields(context, TICKET_CONTEXT_FIELDS, label="Context")
+            .add_text("Description", description)
+            .add_text("Evidence summary", self._summary_text(evidence_out, description))
+            .add(answer_format)
+            .build()
+        )
+
+    def _template_ticket(self, location: str, description: str, rules: Dict[str, Any], span: TraceSpan) -> Dict[str, Any]:
+        """Summary/actions from the category template; no LLM call."""
+        with track_stage("ticket_template"):
+            ticket_struct = render_ticket_template(
+                rules["issue_category"], {"location": location, "description": description, **rules}
+            )
+        span.log(action="template_ticket", ticket_struct=ticket_struct)
+        return ticket_struct
 
-        ticket_struct = self.llm.generate_structured(prompt, TICKET_SCHEMA)
-        span.log(action="llm_ticket_struct", ticket_struct=ticket_struct)
+    @staticmethod
+    def _keep_rule_fields(tier: str, research_out: Dict[str, Any], ticket_struct: Dict[str, Any]) -> Dict[str, Any]:
+        # hybrid: when the rules matched, the model only contributes text
+        if tier == "hybrid" and Orchestrator._keyword_matched(research_out) and isinstance(ticket_struct, dict):
+            return {k: v for k, v in ticket_struct.items() if k not in RULE_FIELDS}
+        return ticket_struct
+
+    def _assemble_ticket(
+        self,
+        ticket_struct: Dict[str, Any],
+        location: str,
+        description: str,
+        rules: Dict[str, Any],
+        evidence_out: Dict[str, Any],
+        research_out: Dict[str, Any],
+        geo: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        summary_text = self._summary_text(evidence_out, description)
 
         # Fill defaults & ensure required fields
         ticket = {}
-        ticket["ticket_id"] = ticket_struct.get("ticket_id") or self._generate_ticket_id()
+        # always ours: a model-made id would repeat across unrelated tickets
+        ticket["ticket_id"] = self._generate_ticket_id()
         ticket["location"] = ticket_struct.get("location") or location
-        ticket["issue_category"] = (ticket_struct.get("issue_category") or issue_category).lower()
-        ticket["department"] = ticket_struct.get("department") or department
-        ticket["severity"] = ticket_struct.get("severity") or severity
-        ticket["evidence_quality"] = ticket_struct.get("evidence_quality") or evidence_out.get("evidence_quality", "unknown")
+        ticket["issue_category"] = (ticket_struct.get("issue_category") or rules["issue_category"]).lower()
+        ticket["department"] = ticket_struct.get("department") or rules["department"]
+        ticket["severity"] = ticket_struct.get("severity") or rules["severity"]
+        ticket["evidence_quality"] = ticket_struct.get("evidence_quality") or self._evidence_quality(evidence_out)
         ticket["summary"] = ticket_struct.get("summary") or summary_text
-        ticket["form_url"] = ticket_struct.get("form_url") or form_url
+        ticket["form_url"] = ticket_struct.get("form_url") or rules["form_url"]
         ticket["actions"] = ticket_struct.get("actions") or [
             f"Submit report via {ticket['form_url']}",
             "Attach images and summary"
         ]
+        match_score = sum((research_out.get("matches") or {}).values())
         ticket["priority"] = ticket_struct.get("priority") or self._determine_priority(ticket["severity"], match_score)
+        if geo is not None:
+            ticket["geo"] = geo
+        return ticket
+
+    def _geocode_step(self, location: str) -> Optional[Dict[str, Any]]:
+        if self.geocoder is None:
+            return None
+        with track_stage("geocode"):
+            return self.geocoder.geocode(location)
 
+    def _persist_step(
+        self,
+        user_id: str,
+        session_id: str,
+        location: str,
+        description: str,
+        ticket: Dict[str, Any],
+        research_out: Dict[str, Any],
+        image_hashes: List[int]
+    ):
         # Persist memory (simple)
         mem = {
             "ticket_id": ticket["ticket_id"],
@@ -142,11 +517,424 @@ class Orchestrator:
             "severity": ticket["severity"],
             "created_at": time.time()
         }
-        self.memory.create_memory(user_id, "submitted_ticket", mem)
-        self.sessions.append_event(session_id, {"type": "ticket_created", "ticket": ticket})
+        geo = ticket.get("geo")
+        if geo is not None:
+            mem["geo"] = geo
+        with track_stage("memory_write"):
+            self.memory.create_memory(user_id, "submitted_ticket", mem)
+            if geo is not None:
+                self.geo_index.add(ticket["ticket_id"], geo["lat"], geo["lon"], ticket["issue_category"], mem["created_at"])
+            if self.duplicates is not None and self._keyword_matched(research_out):
+                self.duplicates.add(location, research_out.get("issue_category", ""), ticket, description, image_hashes)
+        with track_stage("session_write"):
+            self.sessions.append_event(session_id, {"type": "ticket_created", "ticket": ticket})
+
+    def _ticket_step(
+        self,
+        location: str,
+        description: str,
+        rules: Dict[str, Any],
+        evidence: Dict[str, Any],
+        research: Dict[str, Any],
+        tier: str,
+        image_paths: Optional[List[str]],
+        span: TraceSpan,
+        geo: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        if self._uses_llm(tier, research, image_paths):
+            # LLM-assisted ticket assembly & action recommendations (light touch)
+            prompt = self._ticket_prompt(
+                "Return a strict JSON object matching the schema and recommend 2-4 concise actions.",
+                location, description, rules, evidence
+            )
+            with track_stage("ticket_llm"):
+                ticket_struct = self.llm.generate_structured(prompt, TICKET_SCHEMA)
+            span.log(action="llm_ticket_struct", ticket_struct=ticket_struct)
+            ticket_struct = self._keep_rule_fields(tier, research, ticket_struct)
+        else:
+            # without Gemini: no evidence analysis, templated text
+            ticket_struct = self._template_ticket(location, description, rules, span)
+        return self._assemble_ticket(ticket_struct, location, description, rules, evidence, research, geo)
+
+    def _follow_up_wanted(self, name: str, ticket: Optional[Dict[str, Any]], tier: str) -> bool:
+        # rules_only promises zero LLM calls; form and comms both make one
+        return ticket is not None and name in self.follow_up_stages and tier != "rules_only"
+
+    def _run_follow_up(self, name: str, ticket: Dict[str, Any]) -> Dict[str, Any]:
+        if name == "form":
+            return self.agents.get("form").submit_form(ticket)
+        return self.agents.get("comms").generate_all_channels(ticket)
+
+    def _follow_up_step(self, name: str, ticket: Dict[str, Any], request_id: str) -> Dict[str, Any]:
+        if self.jobs is None:
+            return self._run_follow_up(name, ticket)
+        # keyed by the request that made the ticket: enqueued at most once per request
+        job_id = self.jobs.job_key(name, request_id)
+        if not self.jobs.enqueue(name, ticket["ticket_id"], {"ticket": ticket}, job_id=job_id):
+            logger.warning(f"[orchestrator] {name} job {job_id} already queued; not queued again")
+            return {"status": "already_queued", "job_id": job_id}
+        return {"status": "queued", "job_id": job_id}
+
+    def _stream_follow_ups(self, ticket: Dict[str, Any], tier: str) -> Dict[str, Any]:
+        """
+        Follow-ups for stream_ticket, matching the form/comms pipeline
+        stages: run together (or just enqueued) under follow_up_timeout;
+        failures land in "partial" instead of failing the ticket.
+        """
+        request_id = uuid.uuid4().hex
+        futures = {
+            name: self._stage_pool.submit(self._follow_up_step, name, ticket, request_id)
+            for name in self.follow_up_stages
+            if self._follow_up_wanted(name, ticket, tier)
+        }
+        out: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        deadline = time.monotonic() + self.follow_up_timeout
+        for name, fut in futures.items():
+            try:
+                out[name] = fut.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                out[name] = None
+                errors[name] = f"StageTimeout: {name} exceeded {self.follow_up_timeout}s"
+            except Exception as e:
+                out[name] = None
+                errors[name] = f"{type(e).__name__}: {e}"
+        if errors:
+            out["partial"] = errors
+        return out
+
+    def ticket_status(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The stored ticket record plus its follow-up jobs. None if neither
+        is known (the in-process memory does not survive a restart; queued
+        jobs do).
+        """
+        record = self.memory.get_ticket(ticket_id)
+        jobs = self.jobs.jobs_for_ticket(ticket_id) if self.jobs is not None else []
+        if record is None and not jobs:
+            return None
+        return {"ticket_id": ticket_id, "ticket": record, "jobs": {job["kind"]: job for job in jobs}}
+
+    # -- geospatial queries (tickets whose location could be geocoded) -----
+
+    def geocode(self, address: str) -> Optional[Dict[str, Any]]:
+        return self._geocode_step(address)
+
+    def tickets_near(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: float = 200.0,
+        category: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Tickets within radius_m metres, nearest first."""
+        with track_stage("geo_query"):
+            return self.geo_index.within_radius(lat, lon, radius_m, category=category, limit=limit)
+
+    def tickets_in_bbox(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        category: Optional[str] = None,
+        limit: Optional[int] = 500
+    ) -> List[Dict[str, Any]]:
+        with track_stage("geo_query"):
+            return self.geo_index.within_bbox(min_lat, min_lon, max_lat, max_lon, category=category, limit=limit)
+
+    def hotspots(
+        self,
+        category: Optional[str] = None,
+        k: int = 10,
+        precision: int = 6,
+        bbox: Optional[Tuple[float, float, float, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Top-k geohash cells by ticket count (precision 5 ~ 5 km, 6 ~ 1.2 km, 7 ~ 150 m)."""
+        with track_stage("geo_query"):
+            return self.geo_index.hotspots(category=category, k=k, precision=precision, bbox=bbox)
+
+    def _build_pipeline(self) -> Pipeline:
+        """
+        Stage graph for create_ticket. Critical path:
+          research -> duplicate -> evidence -> ticket -> persist / form / comms
+        Geocoding, image hashing and image preparation (read, resize,
+        re-encode) overlap with research and the duplicate check; form and comms run together
+        (or are just enqueued) once the ticket is persisted.
+        """
+        no_duplicate = lambda duplicate, **_: duplicate is None  # noqa: E731
+        return Pipeline([
+            Stage(
+                "research",
+                lambda session_id, description, research_in, span: self._research_step(
+                    session_id, description, research_in, span
+                ),
+                ["session_id", "description", "research_in", "span"]
+            ),
+            Stage("image_hashes", self._image_hashes_step, ["image_paths"]),
+            # a failed lookup only costs the ticket its coordinates
+            Stage("geo", lambda location: self._geocode_step(location), ["location"], optional=True),
+            Stage(
+                "images_payload",
+                lambda image_paths, tier: self.evidence.images.prepare(image_paths),
+                ["image_paths", "tier"],
+                when=lambda image_paths, tier: bool(image_paths) and tier != "rules_only"
+            ),
+            Stage(
+                "duplicate",
+                lambda user_id, session_id, location, description, research, image_hashes, span: self._duplicate_step(
+                    user_id, session_id, location, description, research, image_hashes, span
+                ),
+                ["user_id", "session_id", "location", "description", "research", "image_hashes", "span"]
+            ),
+            Stage("rules", lambda research: self._merge_rules(research), ["research"]),
+            Stage(
+                "evidence",
+                lambda session_id, description, image_paths, span, images_payload, **_: self._evidence_step(
+                    session_id, description, image_paths, span, images_payload
+                ),
+                ["session_id", "description", "image_paths", "span", "images_payload", "research", "tier", "duplicate"],
+                default={},
+                when=lambda research, tier, image_paths, duplicate, **_: (
+                    duplicate is None and self._uses_llm(tier, research, image_paths)
+                )
+            ),
+            Stage(
+                "ticket",
+                lambda location, description, rules, evidence, research, tier, image_paths, span, geo, duplicate: (
+                    self._ticket_step(location, description, rules, evidence, research, tier, image_paths, span, geo)
+                ),
+                ["location", "description", "rules", "evidence", "research", "tier", "image_paths", "span", "geo", "duplicate"],
+                when=no_duplicate
+            ),
+            Stage(
+                "persist",
+                lambda user_id, session_id, location, description, ticket, research, image_hashes: self._persist_step(
+                    user_id, session_id, location, description, ticket, research, image_hashes
+                ),
+                ["user_id", "session_id", "location", "description", "ticket", "research", "image_hashes"],
+                when=lambda ticket, **_: ticket is not None
+            ),
+            Stage(
+                "form",
+                lambda ticket, tier, persist, request_id: self._follow_up_step("form", ticket, request_id),
+                ["ticket", "tier", "persist", "request_id"],
+                timeout=self.follow_up_timeout,
+                optional=True,
+                when=lambda ticket, tier, **_: self._follow_up_wanted("form", ticket, tier)
+            ),
+            Stage(
+                "comms",
+                lambda ticket, tier, persist, request_id: self._follow_up_step("comms", ticket, request_id),
+                ["ticket", "tier", "persist", "request_id"],
+                timeout=self.follow_up_timeout,
+                optional=True,
+                when=lambda ticket, tier, **_: self._follow_up_wanted("comms", ticket, tier)
+            ),
+        ], executor=self._stage_pool)
+
+    # -- entry points ------------------------------------------------------
 
+    def _create_ticket(
+        self,
+        user_id: str,
+        location: str,
+        description: str,
+        image_paths: Optional[List[str]],
+        session_id: Optional[str],
+        research_out: Optional[Dict[str, Any]] = None,
+        tier: str = "full_llm"
+    ) -> Dict[str, Any]:
+        span = TraceSpan(name="orchestrator.create_ticket")
+        start_ts = time.time()
+        session_id = self._start_session(user_id, session_id, span)
+        span.log(action="execution_tier", tier=tier)
+
+        run = self.pipeline.run({
+            "user_id": user_id,
+            "location": location,
+            "description": description,
+            "image_paths": image_paths or [],
+            "session_id": session_id,
+            "request_id": uuid.uuid4().hex,
+            "research_in": research_out,
+            "tier": tier,
+            "span": span,
+        })
+        span.log(action="pipeline", timings=run.timings, skipped=run.skipped, errors=run.errors)
+
+        duplicate = run["duplicate"]
+        if duplicate is not None:
+            # linked instead of re-processed
+            span.finish()
+            self.obs.write_span(span)
+            return {
+                "session_id": session_id,
+                "ticket": duplicate["ticket"],
+                "duplicate_of": duplicate["ticket_id"],
+                "elapsed": time.time() - start_ts
+            }
+
+        ticket = run["ticket"]
         span.log(result=ticket)
         span.finish()
         self.obs.write_span(span)
 
-        return {"session_id": session_id, "ticket": ticket, "elapsed": time.time() - start_ts}
\ No newline at end of file
+        result = {"session_id": session_id, "ticket": ticket, "execution_tier": tier}
+        for name in self.follow_up_stages:
+            if name not in run.skipped:
+                result[name] = run[name]
+        if run.partial:
+            result["partial"] = run.errors
+        result["elapsed"] = time.time() - start_ts
+        return result
+
+    @staticmethod
+    def _summary_start(text: str) -> int:
+        """Offset just past leading whitespace and the SUMMARY: marker, if present."""
+        stripped = text.lstrip()
+        start = len(text) - len(stripped)
+        if stripped.upper().startswith(STREAM_SUMMARY_MARKER):
+            start += len(STREAM_SUMMARY_MARKER)
+        return start
+
+    @staticmethod
+    def _parse_streamed_ticket(text: str) -> Dict[str, Any]:
+        """
+        Parse the 'SUMMARY: ... / ACTIONS: - ...' text format used by
+        stream_ticket into the same shape generate_structured returns.
+        """
+        head, _, tail = text.partition(STREAM_ACTIONS_MARKER)
+        summary = head.strip()
+        if summary.upper().startswith(STREAM_SUMMARY_MARKER):
+            summary = summary[len(STREAM_SUMMARY_MARKER):].strip()
+        actions = [line.strip().lstrip("-*0123456789. ").strip() for line in tail.splitlines()]
+        return {"summary": summary, "actions": [a for a in actions if a]}
+
+    def stream_ticket(
+        self,
+        user_id: str,
+        location: str,
+        description: str,
+        image_paths: Optional[List[str]] = None,
+        session_id: Optional[str] = None,
+        tier: Optional[str] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Same pipeline as create_ticket, but yields (event, data) pairs as
+        each stage completes:
+          research -> evidence -> summary_token* -> ticket
+        (or research -> duplicate when the report matches an open ticket).
+        The summary is produced by a streaming text call so its tokens can
+        be forwarded to the client as they arrive. When the tier skips the
+        LLM, evidence is reported as skipped and the templated summary
+        arrives as a single summary_token.
+        """
+        tier = self._check_tier(tier or self.execution_tier)
+        span = TraceSpan(name="orchestrator.stream_ticket")
+        start_ts = time.time()
+        with track_stage("total_stream"):
+            session_id = self._start_session(user_id, session_id, span)
+
+            research_out = self._research_step(session_id, description, None, span)
+            yield "research", {"session_id": session_id, "research": research_out}
+
+            image_hashes = self._image_hashes_step(image_paths)
+            duplicate = self._duplicate_step(
+                user_id, session_id, location, description, research_out, image_hashes, span
+            )
+            if duplicate is not None:
+                span.finish()
+                self.obs.write_span(span)
+                yield "duplicate", {
+                    "session_id": session_id,
+                    "ticket": duplicate["ticket"],
+                    "duplicate_of": duplicate["ticket_id"],
+                    "elapsed": time.time() - start_ts
+                }
+                return
+
+            rules = self._merge_rules(research_out)
+            span.log(action="execution_tier", tier=tier)
+            if not self._uses_llm(tier, research_out, image_paths):
+                yield "evidence", {"evidence": None, "skipped": True}
+                ticket_struct = self._template_ticket(location, description, rules, span)
+                yield "summary_token", {"text": ticket_struct["summary"]}
+                ticket = self._assemble_ticket(
+                    ticket_struct, location, description, rules, {}, research_out, self._geocode_step(location)
+                )
+                self._persist_step(user_id, session_id, location, description, ticket, research_out, image_hashes)
+                follow_ups = self._stream_follow_ups(ticket, tier)
+                span.log(result=ticket)
+                span.finish()
+                self.obs.write_span(span)
+                yield "ticket", {
+                    "session_id": session_id,
+                    "ticket": ticket,
+                    "execution_tier": tier,
+                    **follow_ups,
+                    "elapsed": time.time() - start_ts
+                }
+                return
+
+            evidence_out = self._evidence_step(session_id, description, image_paths, span)
+            yield "evidence", {"evidence": evidence_out}
+
+            prompt = self._ticket_prompt(
+                f"Answer in exactly this format:\n{STREAM_SUMMARY_MARKER} <one or two sentences>\n"
+                f"{STREAM_ACTIONS_MARKER}\n- <action>\n(2-4 concise actions)",
+                location, description, rules, evidence_out
+            )
+
+            # forward summary tokens; hold back a marker-sized tail so a
+            # marker split across chunks is never emitted
+            text = ""
+            emitted = None  # offset of the first unsent summary char, once the marker is past
+            first_sent = False
+            done = False
+            with track_stage("ticket_llm"):
+                for chunk in self.llm.generate_text_stream(prompt):
+                    text += chunk
+                    if done:
+                        continue
+                    if emitted is None:
+                        if len(text.lstrip()) < len(STREAM_SUMMARY_MARKER):
+                            continue
+                        emitted = self._summary_start(text)
+                    cut = text.find(STREAM_ACTIONS_MARKER)
+                    end = cut if cut != -1 else len(text) - (len(STREAM_ACTIONS_MARKER) - 1)
+                    if end > emitted:
+                        piece = text[emitted:end] if first_sent else text[emitted:end].lstrip()
+                        if piece:
+                            yield "summary_token", {"text": piece}
+                            first_sent = True
+                        emitted = end
+                    done = cut != -1
+                if not done:
+                    # short answer with no ACTIONS section: flush what's left
+                    if emitted is None:
+                        emitted = self._summary_start(text)
+                    head = text[emitted:] if first_sent else text[emitted:].lstrip()
+                    if head:
+                        yield "summary_token", {"text": head}
+
+            ticket_struct = self._keep_rule_fields(tier, research_out, self._parse_streamed_ticket(text))
+            span.log(action="llm_ticket_stream", ticket_struct=ticket_struct)
+
+            ticket = self._assemble_ticket(
+                ticket_struct, location, description, rules, evidence_out, research_out, self._geocode_step(location)
+            )
+            self._persist_step(user_id, session_id, location, description, ticket, research_out, image_hashes)
+            follow_ups = self._stream_follow_ups(ticket, tier)
+
+            span.log(result=ticket)
+            span.finish()
+            self.obs.write_span(span)
+            yield "ticket", {
+                "session_id": session_id,
+                "ticket": ticket,
+                "execution_tier": tier,
+                **follow_ups,
+                "elapsed": time.time() - start_ts
+            }
@@ -0,0 +1,180 @@
+# src/agents/pipeline.py
+"""
+Dependency-aware stage scheduler for the ticket pipeline.
+
+A Pipeline is a DAG of Stages. Each stage names its inputs: either values
+passed to run() or outputs of other stages. A stage starts as soon as all
+of its inputs are available, so independent stages overlap and a run
+takes as long as its critical path instead of the sum of its stages.
+
+Per stage:
+- timeout: seconds before the stage is abandoned (its thread cannot be
+  killed; the result is simply ignored)
+- optional: failures and timeouts yield `default` and are reported in
+  PipelineRun.errors instead of failing the run
+- when: predicate over the stage's inputs; False skips the stage, which
+  then outputs `default`
+"""
+import time
+from concurrent.futures import Executor, FIRST_COMPLETED, wait as wait_futures
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+
+class StageTimeout(TimeoutError):
+    pass
+
+
+class Stage:
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        inputs: Sequence[str] = (),
+        timeout: Optional[float] = None,
+        optional: bool = False,
+        default: Any = None,
+        when: Optional[Callable[..., bool]] = None
+    ):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.timeout = timeout
+        self.optional = optional
+        self.default = default
+        self.when = when
+
+
+class PipelineRun:
+    """Outcome of Pipeline.run: outputs by stage, plus what went wrong."""
+
+    def __init__(self, values: Dict[str, Any]):
+        self.values = values
+        self.errors: Dict[str, str] = {}
+        self.skipped: List[str] = []
+        self.timings: Dict[str, float] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        return self.values[name]
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.values.get(name, default)
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.errors)
+
+
+class Pipeline:
+    """
+    Stages run on the given executor, except that whenever stages become
+    ready one of them (without a timeout) runs on the calling thread, so a
+    linear chain never leaves it.
+    """
+
+    def __init__(self, stages: Iterable[Stage], executor: Executor):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage {stage.name!r}")
+            self.stages[stage.name] = stage
+        self.executor = executor
+        self._order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order, state = [], {}
+
+        def visit(name: str, path: tuple):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Stage cycle: {' -> '.join(path + (name,))}")
+            state[name] = "visiting"
+            for dep in self.stages[name].inputs:
+                if dep in self.stages:
+                    visit(dep, path + (name,))
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, ())
+        return order
+
+    def _check_inputs(self, inputs: Dict[str, Any]):
+        for stage in self.stages.values():
+            missing = [d for d in stage.inputs if d not in self.stages and d not in inputs]
+            if missing:
+                raise ValueError(f"Stage {stage.name!r} needs unknown inputs {missing}")
+
+    def run(self, inputs: Dict[str, Any]) -> PipelineRun:
+        self._check_inputs(inputs)
+        run = PipelineRun(dict(inputs))
+        values = run.values
+        pending = list(self._order)
+        running = {}  # future -> (stage, started_at)
+
+        def finish(stage: Stage, result: Any = None, error: Optional[BaseException] = None, elapsed: float = 0.0):
+            run.timings[stage.name] = elapsed
+            if error is None:
+                values[stage.name] = result
+                return
+            if not stage.optional:
+                raise error
+            run.errors[stage.name] = f"{type(error).__name__}: {error}"
+            values[stage.name] = stage.default
+
+        while pending or running:
+            # collect everything whose inputs are ready (skips can unblock more)
+            ready, progressed = [], True
+            while progressed:
+                progressed = False
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if any(dep not in values for dep in stage.inputs):
+                        continue
+                    pending.remove(name)
+                    progressed = True
+                    args = {dep: values[dep] for dep in stage.inputs}
+                    if stage.when is not None and not stage.when(**args):
+                        run.skipped.append(name)
+                        values[name] = stage.default
+                        continue
+                    ready.append((stage, args))
+
+            # hand all but one ready stage to the executor; the calling thread
+            # runs the last one itself (unless it has a timeout to enforce)
+            inline = None
+            if ready and ready[-1][0].timeout is None:
+                inline = ready.pop()
+            for stage, args in ready:
+                running[self.executor.submit(stage.fn, **args)] = (stage, time.perf_counter())
+            if inline is not None:
+                stage, args = inline
+                start = time.perf_counter()
+                try:
+                    result = stage.fn(**args)
+                except Exception as e:
+                    finish(stage, error=e, elapsed=time.perf_counter() - start)
+                else:
+                    finish(stage, result, elapsed=time.perf_counter() - start)
+                continue
+
+            if not running:
+                if pending:
+                    raise RuntimeError(f"Pipeline stalled with stages {pending} unscheduled")
+                break
+
+            now = time.perf_counter()
+            deadlines = [started + s.timeout for s, started in running.values() if s.timeout is not None]
+            timeout = max(0.0, min(deadlines) - now) if deadlines else None
+            done, _ = wait_futures(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            now = time.perf_counter()
+            for fut in done:
+                stage, started = running.pop(fut)
+                error = fut.exception()
+                finish(stage, None if error else fut.result(), error, now - started)
+            for fut, (stage, started) in list(running.items()):
+                if stage.timeout is not None and now - started >= stage.timeout:
+                    del running[fut]
+                    finish(stage, error=StageTimeout(f"{stage.name} exceeded {stage.timeout}s"), elapsed=now - started)
+        return run
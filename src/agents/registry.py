@@ -0,0 +1,97 @@
+# src/agents/registry.py
+"""
+Lazy agent registry.
+
+Agents (and the modules behind them: the Gemini SDK, numpy/faiss for the
+semantic index, ...) are imported and constructed on first get(), once
+per registry. warm_up() does the same eagerly, e.g. from the API lifespan,
+and also calls an agent's own warm_up() if it has one.
+"""
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+AGENT_INIT_SECONDS = REGISTRY.histogram(
+    "civicagent_agent_init_seconds",
+    "Time to import and construct an agent on first use.",
+    ["agent"],
+)
+
+
+class AgentRegistry:
+    def __init__(self, factories: Optional[Dict[str, Callable[[], Any]]] = None):
+        self._factories: Dict[str, Callable[[], Any]] = dict(factories or {})
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Add or replace a factory; drops an already built instance."""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def names(self) -> List[str]:
+        return list(self._factories)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def get(self, name: str) -> Any:
+        agent = self._instances.get(name)
+        if agent is not None:
+            return agent
+        with self._lock:
+            agent = self._instances.get(name)
+            if agent is None:
+                if name not in self._factories:
+                    raise KeyError(f"No agent registered as {name!r}")
+                start = time.perf_counter()
+                agent = self._factories[name]()
+                dur = time.perf_counter() - start
+                AGENT_INIT_SECONDS.observe(dur, agent=name)
+                logger.info(f"[registry] built {name} in {dur * 1000:.1f}ms")
+                self._instances[name] = agent
+        return agent
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Build the named agents (default: all) now; returns seconds per agent."""
+        timings = {}
+        for name in names or self.names():
+            start = time.perf_counter()
+            agent = self.get(name)
+            hook = getattr(agent, "warm_up", None)
+            if callable(hook):
+                hook()
+            timings[name] = time.perf_counter() - start
+        return timings
+
+
+def default_agent_factories(gemini_api_key: Optional[str] = None, observability=None) -> Dict[str, Callable[[], Any]]:
+    """Factories for the Orchestrator's agents; each imports its module on call."""
+
+    def llm():
+        from src.llm.gemini_client import get_gemini_client
+        return get_gemini_client(api_key=gemini_api_key)
+
+    def research():
+        from src.agents.research_agent import ResearchAgent
+        return ResearchAgent(gemini_api_key=gemini_api_key)
+
+    def evidence():
+        from src.agents.evidence_agent import EvidenceAgent
+        return EvidenceAgent(observability=observability, gemini_api_key=gemini_api_key)
+
+    def form():
+        from src.agents.form_agent import FormAgent
+        return FormAgent(gemini_api_key)
+
+    def comms():
+        from src.agents.comms_agent import CommsAgent
+        return CommsAgent(gemini_api_key)
+
+    return {"llm": llm, "research": research, "evidence": evidence, "form": form, "comms": comms}
@@ -1,12 +1,28 @@
 # src/agents/research_agent.py
 # SIMPLE, DETERMINISTIC, GUARANTEED-TO-PASS CLASSIFIER
 
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
 from src.llm.gemini_client import get_gemini_client
+from src.tools.keyword_classifier import KeywordClassifier, REGULATION_DB_PATH
+
+logger = logging.getLogger(__name__)
 
 
 class ResearchAgent:
     """
     Ultra-simple rule-based classifier designed to match golden evaluation tests exactly.
+
+    RULES take precedence; every category in src/tools/regulation_db.json is
+    matched as well. Both are compiled once into a KeywordClassifier shared
+    by all instances. Descriptions no keyword matches are looked up in a
+    RegulationIndex (semantic fallback) before landing in general_issue.
+    Set CIVICAGENT_SEMANTIC_INDEX to a file path to persist that index.
+    The index (numpy/faiss) is imported and built on the first lookup that
+    needs it, or by warm_up().
     """
 
     RULES = [
@@ -30,23 +46,106 @@ class ResearchAgent:
         }
     ]
 
-    def __init__(self, gemini_api_key=None):
-        self.llm = get_gemini_client(gemini_api_key)
-
-    def classify(self, description: str):
-        text = description.lower()
-
-        for rule in self.RULES:
-            if any(k in text for k in rule["keywords"]):
-                return {
-                    "issue_category": rule["issue_category"],
-                    "department": rule["department"],
-                    "severity_hint": rule["default_severity"]
-                }
-
-        # fallback (general never used in golden tests)
-        return {
-            "issue_category": "general_issue",
-            "department": "General Services",
-            "severity_hint": "Medium"
-        }
\ No newline at end of file
+    DEFAULT_SEVERITY = "Medium"
+
+    _classifier: Optional[KeywordClassifier] = None
+    _semantic_index = None  # RegulationIndex, built on first use
+    _semantic_unavailable = False
+    _semantic_lock = threading.Lock()
+
+    def __init__(self, gemini_api_key=None, semantic_fallback: bool = True):
+        self._gemini_api_key = gemini_api_key
+        self.classifier = self.get_classifier()
+        self.semantic_fallback = semantic_fallback
+
+    @property
+    def llm(self):
+        # not needed for classification; resolved only if someone asks
+        return get_gemini_client(self._gemini_api_key)
+
+    @property
+    def semantic_index(self):
+        return self.get_semantic_index() if self.semantic_fallback else None
+
+    def warm_up(self):
+        """Build the shared semantic index now instead of on the first miss."""
+        if self.semantic_fallback:
+            self.get_semantic_index()
+
+    @classmethod
+    def get_classifier(cls) -> KeywordClassifier:
+        if cls._classifier is None:
+            cls._classifier = KeywordClassifier.from_sources(cls.RULES, REGULATION_DB_PATH)
+        return cls._classifier
+
+    @classmethod
+    def get_semantic_index(cls):
+        if cls._semantic_index is None and not cls._semantic_unavailable:
+            with cls._semantic_lock:
+                if cls._semantic_index is None and not cls._semantic_unavailable:
+                    try:
+                        from src.tools.semantic_index import RegulationIndex
+                        cls._semantic_index = RegulationIndex(
+                            db_path=REGULATION_DB_PATH,
+                            index_path=os.getenv("CIVICAGENT_SEMANTIC_INDEX") or None
+                        )
+                    except RuntimeError as e:
+                        logger.warning(f"Semantic fallback disabled: {e}")
+                        cls._semantic_unavailable = True
+        return cls._semantic_index
+
+    def _semantic_match(self, hits) -> Optional[Dict[str, Any]]:
+        if not hits:
+            return None
+        entry, score = hits[0]
+        match = dict(entry)
+        match["matches"] = {}
+        match["confidence"] = score
+        match["matched_by"] = "semantic"
+        return match
+
+    def _to_result(self, match: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if match is None:
+            # fallback (general never used in golden tests)
+            return {
+                "issue_category": "general_issue",
+                "department": "General Services",
+                "severity_hint": "Medium",
+                "matches": {},
+                "confidence": 0.0,
+                "matched_by": "none"
+            }
+
+        result = {
+            "issue_category": match["issue_category"],
+            "department": match["department"],
+            "severity_hint": match.get("default_severity", self.DEFAULT_SEVERITY),
+            "matches": match["matches"],
+            "confidence": match["confidence"],
+            "matched_by": match.get("matched_by", "keyword")
+        }
+        if match.get("form_url"):
+            result["form_url"] = match["form_url"]
+        return result
+
+    def classify(self, description: str) -> Dict[str, Any]:
+        match = self.classifier.classify(description)
+        if match is None and self.semantic_index is not None:
+            match = self._semantic_match(self.semantic_index.search(description))
+        return self._to_result(match)
+
+    def classify_batch(self, descriptions: List[str]) -> List[Dict[str, Any]]:
+        """
+        Classify many descriptions with the same compiled matcher;
+        linear in the total input length.
+        """
+        matches = self.classifier.classify_batch(descriptions)
+
+        # one batched vector search for everything the keywords missed
+        misses = [i for i, m in enumerate(matches) if m is None]
+        if misses and self.semantic_index is not None:
+            hits = self.semantic_index.search_batch([descriptions[i] for i in misses])
+            for i, h in zip(misses, hits):
+                matches[i] = self._semantic_match(h)
+
+        return [self._to_result(m) for m in matches]
\ No newline at end of file
@@ -0,0 +1,120 @@
+# src/agents/ticket_templates.py
+"""
+Per-category ticket text used when no LLM call is made (rules_only tier,
+and the non-LLM branch of hybrid).
+
+Each template has a summary format and an ordered action list. Both may
+use {location}, {department}, {severity}, {category}, {form_url} and
+{detail} (the first sentence of the citizen's description).
+Categories without an entry use DEFAULT_TEMPLATE.
+"""
+import re
+from typing import Any, Dict
+
+from src.llm.prompt_builder import truncate_to_tokens
+
+DEFAULT_TEMPLATE = {
+    "summary": "{severity} severity {category} reported at {location}: {detail}",
+    "actions": [
+        "Route report to {department}",
+        "Schedule a site inspection",
+        "Update the reporter once the issue is resolved",
+    ],
+}
+
+CATEGORY_TEMPLATES: Dict[str, Dict[str, Any]] = {
+    "pothole": {
+        "summary": "Pothole reported at {location} ({severity} severity): {detail}",
+        "actions": [
+            "Dispatch a public works crew to inspect the pothole",
+            "Cone off the hazard if it endangers vehicles or pedestrians",
+            "Schedule a road surface repair",
+        ],
+    },
+    "streetlight_outage": {
+        "summary": "Streetlight outage reported at {location} ({severity} severity): {detail}",
+        "actions": [
+            "Log the outage with street lighting maintenance",
+            "Inspect the lamp and power supply",
+            "Replace the lamp or repair the fixture",
+        ],
+    },
+    "garbage_overflow": {
+        "summary": "Overflowing garbage reported at {location} ({severity} severity): {detail}",
+        "actions": [
+            "Schedule an extra sanitation pickup",
+            "Check the collection route for missed bins",
+        ],
+    },
+    "water_leak": {
+        "summary": "Water leak reported at {location} ({severity} severity): {detail}",
+        "actions": [
+            "Dispatch water services to locate the leak",
+            "Isolate the affected main if water loss is significant",
+            "Repair the pipe and restore the surface",
+        ],
+    },
+    "flooding": {
+        "summary": "Flooding reported at {location} ({severity} severity): {detail}",
+        "actions": [
+            "Send stormwater crew to clear drains",
+            "Place warning signs on the flooded section",
+        ],
+    },
+    "tree_hazard": {
+        "summary": "Tree hazard reported at {location} ({severity} severity): {detail}",
+        "actions": [
+            "Dispatch parks & forestry to assess the tree",
+            "Clear the obstruction from the road or path",
+        ],
+    },
+    "public_safety": {
+        "summary": "Public safety hazard reported at {location} ({severity} severity): {detail}",
+        "actions": [
+            "Alert emergency management immediately",
+            "Secure the area around the hazard",
+            "Assign a crew to remove or repair the hazard",
+        ],
+    },
+    "graffiti": {
+        "summary": "Graffiti reported at {location} ({severity} severity): {detail}",
+        "actions": [
+            "Schedule clean-up crew removal",
+            "Photograph the tag for the vandalism log",
+        ],
+    },
+    "noise_complaint": {
+        "summary": "Noise complaint at {location} ({severity} severity): {detail}",
+        "actions": [
+            "Forward the complaint to noise control",
+            "Check for repeat complaints at this address",
+        ],
+    },
+}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def _detail(description: str) -> str:
+    first = _SENTENCE_END.split(" ".join((description or "").split()), maxsplit=1)[0]
+    return truncate_to_tokens(first, 40) or "no description provided"
+
+
+def render_ticket_template(category: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Summary and actions for a category. context needs location, department,
+    severity, form_url and description.
+    """
+    template = CATEGORY_TEMPLATES.get(category, DEFAULT_TEMPLATE)
+    values = {
+        "location": context.get("location") or "the reported location",
+        "department": context.get("department") or "general services",
+        "severity": context.get("severity") or "Medium",
+        "category": (category or "issue").replace("_", " "),
+        "form_url": context.get("form_url") or "",
+        "detail": _detail(context.get("description", "")),
+    }
+    return {
+        "summary": template["summary"].format(**values),
+        "actions": [action.format(**values) for action in template["actions"]],
+    }
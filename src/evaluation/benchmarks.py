@@ -0,0 +1,283 @@
+# src/evaluation/benchmarks.py
+"""
+Microbenchmark suite for the Civic Agent pipeline.
+
+Runs fully offline against FakeGeminiClient (GEMINI_BACKEND=fake), so the
+numbers isolate our own code plus a modelled LLM latency. Output is one
+JSON document with stable benchmark names, meant to be diffed across
+commits to catch regressions:
+
+    python -m src.evaluation.benchmarks --out benchmark_results.json
+
+Benchmarks:
+- research.classify            ResearchAgent.classify on mixed descriptions
+- research.classify_batch      same inputs through classify_batch
+- llm.json_extraction          parse_json on chatty output
+- llm.schema_validation        compiled TICKET_SCHEMA validator on a parsed ticket
+- form.build_form_payload      FormAgent.build_form_payload
+- geo.*                        SpatialIndex radius (nearest 50 in 1 km) and
+                               hotspot queries over synthetic tickets
+- orchestrator.create_ticket   end-to-end, at several concurrency levels,
+                               plus the rules_only tier (no LLM calls)
+- startup.*                    fresh-interpreter cold start: importing the
+                               API, serving a first rules_only ticket, and
+                               a full agent warm-up
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+# must be set before any agent asks for the shared client
+os.environ.setdefault("GEMINI_BACKEND", "fake")
+
+SAMPLE_DESCRIPTIONS = [
+    "Large pothole near the crosswalk causing vehicle damage.",
+    "Streetlight has been out for 3 nights, area is dark and unsafe.",
+    "Overflowing garbage bins attracting pests and foul smell.",
+    "Burst pipe with water gushing across the road.",
+    "Someone sprayed graffiti all over the bus shelter.",
+    "Tree fell over the road after the storm.",
+    "The weather is lovely and nothing is wrong.",
+    "Loud music from a party every night past midnight.",
+]
+
+SAMPLE_LLM_OUTPUT = (
+    "Sure! Here is the ticket you asked for:\n```json\n"
+    + json.dumps({
+        "ticket_id": "TKT-12345678",
+        "location": "123 Main St",
+        "issue_category": "pothole",
+        "department": "public works",
+        "severity": "high",
+        "summary": "Large pothole causing vehicle damage near the crosswalk.",
+        "actions": ["Dispatch crew", "Cone off area", "Schedule repair"],
+        "priority": "high",
+    }, indent=2)
+    + "\n```\nLet me know if you need anything else."
+)
+
+SAMPLE_TICKET = {
+    "issue_category": "pothole",
+    "severity": "High",
+    "location": "123 Main St",
+    "summary": "Large pothole causing vehicle damage near the crosswalk.",
+    "priority": "high",
+    "attachments": [],
+    "evidence_quality": "moderate",
+    "department": "public works",
+}
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    from src.evaluation.evaluator import Evaluator
+    return Evaluator._percentile(sorted_values, q)
+
+
+def _summarize(name: str, params: Dict[str, Any], samples: List[float], wall: float) -> Dict[str, Any]:
+    samples = sorted(samples)
+    return {
+        "name": name,
+        "params": params,
+        "iterations": len(samples),
+        "wall_s": wall,
+        "ops_per_s": len(samples) / wall if wall > 0 else 0.0,
+        "mean_us": sum(samples) / len(samples) * 1e6 if samples else 0.0,
+        "p50_us": _percentile(samples, 50) * 1e6,
+        "p95_us": _percentile(samples, 95) * 1e6,
+        "p99_us": _percentile(samples, 99) * 1e6,
+    }
+
+
+def bench_callable(name: str, fn: Callable[[], Any], iterations: int, params: Dict[str, Any] = None) -> Dict[str, Any]:
+    for _ in range(min(100, iterations)):  # warm-up
+        fn()
+    samples = []
+    wall_start = time.perf_counter()
+    for _ in range(iterations):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return _summarize(name, params or {}, samples, time.perf_counter() - wall_start)
+
+
+def bench_create_ticket(concurrency: int, tickets: int, tier: str = "full_llm") -> Dict[str, Any]:
+    from src.agents.orchestrator import Orchestrator
+
+    # duplicate detection off so every request runs the full pipeline
+    orch = Orchestrator(dedupe_window_seconds=None, execution_tier=tier)
+
+    def one(i: int) -> float:
+        t = time.perf_counter()
+        orch.create_ticket(
+            user_id=f"bench-{i % 50}",
+            location=f"{i} Bench St",
+            description=SAMPLE_DESCRIPTIONS[i % len(SAMPLE_DESCRIPTIONS)],
+            image_paths=[],
+        )
+        return time.perf_counter() - t
+
+    try:
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(one, range(tickets)))
+        wall = time.perf_counter() - wall_start
+        orch.obs.flush()
+    finally:
+        # one orchestrator per concurrency level; don't leak its workers and stage pool
+        orch.close()
+    params = {"concurrency": concurrency, "tickets": tickets, "tier": tier}
+    return _summarize("orchestrator.create_ticket", params, samples, wall)
+
+
+STARTUP_SCRIPTS = {
+    "startup.import_api": "import api.main",
+    "startup.first_ticket": (
+        "import api.main; api.main.get_orchestrator().create_ticket("
+        "'bench', '1 Bench St', 'Large pothole near the crosswalk.', tier='rules_only')"
+    ),
+    "startup.warm_up": "import api.main; api.main.get_orchestrator().warm_up()",
+}
+
+
+def bench_startup(runs: int = 5) -> List[Dict[str, Any]]:
+    """Wall time of fresh `python -c ...` processes, interpreter start included."""
+    repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=repo_root + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    results = []
+    # scratch cwd so span/session files from the child don't land in the repo
+    with tempfile.TemporaryDirectory() as cwd:
+        for name, script in STARTUP_SCRIPTS.items():
+            samples = []
+            wall_start = time.perf_counter()
+            for _ in range(runs):
+                t = time.perf_counter()
+                subprocess.run([sys.executable, "-c", script], cwd=cwd, env=env, check=True, capture_output=True)
+                samples.append(time.perf_counter() - t)
+            results.append(_summarize(name, {"runs": runs}, samples, time.perf_counter() - wall_start))
+    return results
+
+
+def bench_geo(iterations: int, points: int = 200_000) -> List[Dict[str, Any]]:
+    from src.geo.spatial_index import SpatialIndex
+
+    rng = random.Random(7)
+    index = SpatialIndex()
+    categories = ("pothole", "streetlight", "garbage", "graffiti")
+    # roughly a 20 x 20 km city
+    for i in range(points):
+        index.add(f"T{i}", 40.6 + rng.random() * 0.18, -74.1 + rng.random() * 0.24, categories[i % len(categories)])
+    centers = [(40.6 + rng.random() * 0.18, -74.1 + rng.random() * 0.24) for _ in range(64)]
+    cycle = {"i": 0}
+
+    def radius_query():
+        cycle["i"] = (cycle["i"] + 1) % len(centers)
+        index.within_radius(*centers[cycle["i"]], radius_m=1000, limit=50)
+
+    params = {"points": points}
+    return [
+        bench_callable("geo.radius_query", radius_query, iterations, params),
+        bench_callable("geo.hotspots", lambda: index.hotspots(k=10, precision=6), max(1, iterations // 10), params),
+    ]
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run_benchmarks(
+    iterations: int = 2000,
+    concurrency_levels: List[int] = (1, 4, 16),
+    tickets: int = 64,
+    startup_runs: int = 5
+) -> Dict[str, Any]:
+    from src.agents.research_agent import ResearchAgent
+    from src.agents.form_agent import FormAgent
+    from src.agents.orchestrator import TICKET_SCHEMA
+    from src.llm.gemini_client import get_gemini_client
+    from src.llm.schema_validation import compile_schema, parse_json
+
+    research = ResearchAgent()
+    form = FormAgent()
+    ticket_validator = compile_schema(TICKET_SCHEMA)
+    sample_ticket = parse_json(SAMPLE_LLM_OUTPUT)
+    descriptions = SAMPLE_DESCRIPTIONS
+    cycle = {"i": 0}
+
+    def classify_one():
+        cycle["i"] = (cycle["i"] + 1) % len(descriptions)
+        research.classify(descriptions[cycle["i"]])
+
+    results = [
+        bench_callable("research.classify", classify_one, iterations),
+        bench_callable(
+            "research.classify_batch",
+            lambda: research.classify_batch(descriptions),
+            max(1, iterations // len(descriptions)),
+            {"batch_size": len(descriptions)},
+        ),
+        bench_callable("llm.json_extraction", lambda: parse_json(SAMPLE_LLM_OUTPUT), iterations),
+        bench_callable("llm.schema_validation", lambda: ticket_validator.validate(sample_ticket), iterations),
+        bench_callable("form.build_form_payload", lambda: form.build_form_payload(SAMPLE_TICKET), iterations),
+    ]
+    results.extend(bench_geo(iterations))
+    for level in concurrency_levels:
+        results.append(bench_create_ticket(level, tickets))
+    results.append(bench_create_ticket(1, tickets, tier="rules_only"))
+    if startup_runs:
+        results.extend(bench_startup(startup_runs))
+
+    llm = get_gemini_client()
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "llm_backend": type(llm).__name__,
+            "fake_latency_ms": getattr(llm, "latency_ms", None),
+            "fake_latency_sigma": getattr(llm, "latency_sigma", None),
+            "fake_error_rate": getattr(llm, "error_rate", None),
+        },
+        "benchmarks": results,
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Civic Agent microbenchmarks")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--tickets", type=int, default=64)
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated levels for create_ticket")
+    parser.add_argument("--startup-runs", type=int, default=5, help="cold-start processes per startup benchmark (0 skips)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        iterations=args.iterations,
+        concurrency_levels=[int(c) for c in args.concurrency.split(",") if c],
+        tickets=args.tickets,
+        startup_runs=args.startup_runs,
+    )
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for b in report["benchmarks"]:
+        print(f"{b['name']:<32} {json.dumps(b['params']):<36} "
+              f"{b['ops_per_s']:>12.1f} ops/s  p50={b['p50_us']:.1f}us  p99={b['p99_us']:.1f}us")
+    print(f"wrote {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
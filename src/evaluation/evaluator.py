@@ -7,7 +7,9 @@ Features:
 - Computes Goal Completion Rate (GCR)
 - Computes simple trajectory precision / recall (did orchestrator call expected agents)
 - Estimates token usage (very lightweight heuristic)
-- Measures latency (wall-clock)
+- Measures latency (wall-clock) with p50/p95/p99 and throughput
+- Runs cases on a worker pool (configurable parallelism); results keep the
+  golden-file order and stream through a single buffered writer
 - Outputs ndjson-style per-test results and a short summary
 
 Notes:
@@ -17,6 +19,7 @@ Notes:
 import time
 import json
 import math
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 from pathlib import Path
 
@@ -96,7 +99,20 @@ class Evaluator:
         }
         return result
 
-    def run_all(self, out_path: Path = OUTPUT_PATH) -> Dict[str, Any]:
+    @staticmethod
+    def _percentile(sorted_values: List[float], q: float) -> float:
+        # nearest-rank percentile
+        if not sorted_values:
+            return 0.0
+        rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+        return sorted_values[rank - 1]
+
+    def run_all(self, out_path: Path = OUTPUT_PATH, parallelism: int = 1) -> Dict[str, Any]:
+        """
+        Run every golden case, up to `parallelism` at a time. Results are
+        written (and returned) in golden-file order regardless of which
+        case finishes first.
+        """
         assert GOLDEN_PATH.exists(), f"Golden tests not found: {GOLDEN_PATH}"
         with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
             tests = json.load(f)
@@ -104,20 +120,30 @@ class Evaluator:
         results = []
         success_count = 0
         total = len(tests)
-        for case in tests:
-            r = self.run_case(case)
-            results.append(r)
-            if r["score"]["success"]:
-                success_count += 1
-            # append to ndjson file
-            with open(out_path, "a", encoding="utf-8") as fh:
+        wall_start = time.time()
+        # one buffered handle for the whole run
+        with open(out_path, "a", encoding="utf-8", buffering=1024 * 1024) as fh, \
+                ThreadPoolExecutor(max_workers=max(1, parallelism)) as pool:
+            # map() yields in submission order while cases run concurrently
+            for r in pool.map(self.run_case, tests):
+                results.append(r)
+                if r["score"]["success"]:
+                    success_count += 1
                 fh.write(json.dumps(r) + "\n")
+        wall = time.time() - wall_start
 
+        latencies = sorted(r["elapsed_s"] for r in results)
         gcr = success_count / total if total else 0.0
         summary = {
             "total_cases": total,
             "successful_cases": success_count,
             "GCR": gcr,
+            "parallelism": parallelism,
+            "wall_clock_s": wall,
+            "throughput_cases_per_s": total / wall if wall > 0 else 0.0,
+            "latency_p50_s": self._percentile(latencies, 50),
+            "latency_p95_s": self._percentile(latencies, 95),
+            "latency_p99_s": self._percentile(latencies, 99),
             "results_file": str(out_path)
         }
         return {"summary": summary, "results": results}
\ No newline at end of file
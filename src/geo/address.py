@@ -0,0 +1,93 @@
+# src/geo/address.py
+"""
+Address normalization for free-form report locations.
+
+normalize_address() gives the canonical key used everywhere an address is
+compared (duplicate detection, memory indexes, the gazetteer):
+'123 Main Street, Apt. #4' -> '123 main st apt 4'
+
+parse_address() splits that key into house number, street and unit for
+geocoders that interpolate along a street.
+"""
+import re
+from typing import Dict, List, Optional
+
+_ABBREVIATIONS = {
+    # street types
+    "street": "st",
+    "avenue": "ave",
+    "av": "ave",
+    "road": "rd",
+    "boulevard": "blvd",
+    "drive": "dr",
+    "lane": "ln",
+    "place": "pl",
+    "court": "ct",
+    "highway": "hwy",
+    "parkway": "pkwy",
+    "terrace": "ter",
+    "square": "sq",
+    "circle": "cir",
+    # directions
+    "north": "n",
+    "south": "s",
+    "east": "e",
+    "west": "w",
+    "northeast": "ne",
+    "northwest": "nw",
+    "southeast": "se",
+    "southwest": "sw",
+    # units
+    "apartment": "apt",
+    "suite": "ste",
+    "floor": "fl",
+}
+
+UNIT_DESIGNATORS = ("apt", "ste", "unit", "fl")
+
+_PUNCT = re.compile(r"[^a-z0-9# ]+")
+# 'no 12' / 'no. 12' prefixes before a house number
+_NUMBER_PREFIX = re.compile(r"^(?:no|number)\s+(?=\d)")
+# '123', '12b'; not ordinals like '1st' (a street name)
+_HOUSE_NUMBER = re.compile(r"^\d+[a-z]?$")
+
+
+def _tokens(address: Optional[str]) -> List[str]:
+    text = _PUNCT.sub(" ", (address or "").lower()).replace("#", " # ")
+    words: List[str] = []
+    for w in _NUMBER_PREFIX.sub("", " ".join(text.split())).split():
+        w = _ABBREVIATIONS.get(w, w)
+        if w == "#":
+            # '#4' means unit 4, but 'apt #4' is just apt 4
+            if words and words[-1] in UNIT_DESIGNATORS:
+                continue
+            w = "unit"
+        words.append(w)
+    return words
+
+
+def parse_address(address: Optional[str]) -> Dict[str, Optional[str]]:
+    """
+    {"normalized", "number", "street", "unit"}; number and unit are None
+    when absent. '123 Main St Apt #4' -> number '123', street 'main st',
+    unit 'apt 4'. A leading unit ('Suite 200, 1 Park Blvd') moves to the end.
+    """
+    words = _tokens(address)
+    unit = None
+    if len(words) > 2 and words[0] in UNIT_DESIGNATORS:
+        unit, words = " ".join(words[:2]), words[2:]
+    for i, w in enumerate(words):
+        if w in UNIT_DESIGNATORS and 0 < i < len(words) - 1 and unit is None:
+            unit, words = " ".join(words[i:]), words[:i]
+            break
+    number = None
+    if len(words) > 1 and _HOUSE_NUMBER.match(words[0]):
+        number, words = words[0], words[1:]
+    street = " ".join(words)
+    normalized = " ".join(part for part in (number, street, unit) if part)
+    return {"normalized": normalized, "number": number, "street": street, "unit": unit}
+
+
+def normalize_address(address: Optional[str]) -> str:
+    """Lowercase, strip punctuation, abbreviate street types/directions/units, unit last."""
+    return parse_address(address)["normalized"]
@@ -0,0 +1,132 @@
+# src/geo/geocoder.py
+"""
+Pluggable geocoding: address string -> coordinates.
+
+- Geocoder is the interface: geocode(address) returns
+  {"lat", "lon", "normalized_address", "precision", "source"} or None.
+- GazetteerGeocoder is an offline stand-in backed by
+  src/tools/gazetteer.json. It tries an exact address first, then
+  interpolates the house number along a known street segment, then
+  falls back to the street's midpoint.
+- CachingGeocoder memoizes another geocoder by normalized address,
+  misses included. Repeat reports from the same address are common.
+- More backends (e.g. a hosted API) plug in with register_geocoder();
+  CIVICAGENT_GEOCODER selects one by name.
+"""
+import os
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.geo.address import normalize_address, parse_address
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "tools", "gazetteer.json")
+
+
+class Geocoder:
+    name = "base"
+
+    def geocode(self, address: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+def _point(lat: float, lon: float, normalized: str, precision: str, source: str) -> Dict[str, Any]:
+    return {
+        "lat": round(lat, 6),
+        "lon": round(lon, 6),
+        "normalized_address": normalized,
+        "precision": precision,
+        "source": source,
+    }
+
+
+class GazetteerGeocoder(Geocoder):
+    """
+    Gazetteer format:
+      {"addresses": [{"address", "lat", "lon"}, ...],
+       "streets": [{"street", "from": [lat, lon], "to": [lat, lon], "numbers": [lo, hi]}, ...]}
+    precision in results: exact | interpolated | street
+    """
+
+    name = "gazetteer"
+
+    def __init__(self, path: str = GAZETTEER_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.addresses: Dict[str, Tuple[float, float]] = {
+            normalize_address(a["address"]): (a["lat"], a["lon"]) for a in data.get("addresses", [])
+        }
+        self.streets: Dict[str, Dict[str, Any]] = {
+            normalize_address(s["street"]): s for s in data.get("streets", [])
+        }
+
+    @staticmethod
+    def _house_number(number: Optional[str]) -> Optional[int]:
+        digits = "".join(ch for ch in (number or "") if ch.isdigit())
+        return int(digits) if digits else None
+
+    def geocode(self, address: str) -> Optional[Dict[str, Any]]:
+        parts = parse_address(address)
+        # units share the building's coordinates
+        key = " ".join(p for p in (parts["number"], parts["street"]) if p)
+        if key in self.addresses:
+            lat, lon = self.addresses[key]
+            return _point(lat, lon, parts["normalized"], "exact", self.name)
+
+        street = self.streets.get(parts["street"])
+        if street is None:
+            return None
+        (lat0, lon0), (lat1, lon1) = street["from"], street["to"]
+        lo, hi = street["numbers"]
+        number = self._house_number(parts["number"])
+        if number is not None and lo <= number <= hi and hi > lo:
+            t = (number - lo) / (hi - lo)
+            return _point(lat0 + t * (lat1 - lat0), lon0 + t * (lon1 - lon0), parts["normalized"], "interpolated", self.name)
+        return _point((lat0 + lat1) / 2, (lon0 + lon1) / 2, parts["normalized"], "street", self.name)
+
+
+class CachingGeocoder(Geocoder):
+    def __init__(self, inner: Geocoder, max_entries: int = 100_000):
+        self.inner = inner
+        self.name = inner.name
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def geocode(self, address: str) -> Optional[Dict[str, Any]]:
+        key = normalize_address(address)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = self.inner.geocode(address)
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+
+GEOCODERS: Dict[str, Callable[[], Geocoder]] = {
+    "gazetteer": lambda: GazetteerGeocoder(os.getenv("CIVICAGENT_GAZETTEER", GAZETTEER_PATH)),
+}
+
+
+def register_geocoder(name: str, factory: Callable[[], Geocoder]):
+    """Make a backend selectable with CIVICAGENT_GEOCODER=<name>."""
+    GEOCODERS[name] = factory
+
+
+def geocoder_from_env() -> Optional[Geocoder]:
+    """
+    CIVICAGENT_GEOCODER=gazetteer (default) picks a registered backend;
+    "none" disables geocoding. CIVICAGENT_GAZETTEER overrides the
+    gazetteer file.
+    """
+    name = os.getenv("CIVICAGENT_GEOCODER", "gazetteer").lower()
+    if name in ("", "none", "off"):
+        return None
+    if name not in GEOCODERS:
+        raise ValueError(f"Unknown CIVICAGENT_GEOCODER: {name}")
+    return CachingGeocoder(GEOCODERS[name]())
@@ -0,0 +1,288 @@
+# src/geo/spatial_index.py
+"""
+In-memory geohash grid over geocoded tickets.
+
+- Every ticket sits in one geohash cell at `precision`. The default is
+  7, roughly 150 m x 150 m at mid latitudes.
+- A bounding-box or radius query only visits the cells that overlap the
+  box. When the box covers more cells than exist, it walks the occupied
+  cells instead, so a city-wide query never enumerates empty grid.
+- Hotspot counts per (category, cell) are kept up to date on add and
+  remove for a few coarser precisions. A top-k hotspot query therefore
+  costs O(occupied cells), not O(tickets).
+
+Coordinates are WGS84 degrees. Boxes crossing the antimeridian are not
+supported (they are irrelevant for a single municipality).
+"""
+import math
+import heapq
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+
+# category key under which every ticket is also counted
+ALL_CATEGORIES = "*"
+
+
+MAX_PRECISION = 12
+
+
+def _spread(x: int) -> int:
+    # insert a zero bit between each of the low 32 bits of x (Morton order)
+    x &= 0xFFFFFFFF
+    x = (x | (x << 16)) & 0x0000FFFF0000FFFF
+    x = (x | (x << 8)) & 0x00FF00FF00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x << 2)) & 0x3333333333333333
+    return (x | (x << 1)) & 0x5555555555555555
+
+
+def geohash_encode(lat: float, lon: float, precision: int = 7) -> str:
+    if not 1 <= precision <= MAX_PRECISION:
+        raise ValueError(f"precision must be 1..{MAX_PRECISION}")
+    bits = 5 * precision
+    lat_bits, lon_bits = bits // 2, bits - bits // 2
+    lat_i = min(max(int((lat + 90.0) / 180.0 * (1 << lat_bits)), 0), (1 << lat_bits) - 1)
+    lon_i = min(max(int((lon + 180.0) / 360.0 * (1 << lon_bits)), 0), (1 << lon_bits) - 1)
+    # geohash interleaves starting with the longitude bit
+    if lon_bits == lat_bits:
+        code = (_spread(lon_i) << 1) | _spread(lat_i)
+    else:
+        code = _spread(lon_i) | (_spread(lat_i) << 1)
+    return "".join(_BASE32[(code >> (bits - 5 * (i + 1))) & 31] for i in range(precision))
+
+
+@lru_cache(maxsize=1 << 18)
+def geohash_bbox(geohash: str) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lon, max_lat, max_lon) of a cell. Cached: queries decode the same cells repeatedly."""
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for ch in geohash:
+        value = _DECODE[ch]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lon_lo, lat_hi, lon_hi
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(degrees latitude, degrees longitude) spanned by one cell."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** (bits - bits // 2)
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    dlon = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return max(-90.0, lat - dlat), max(-180.0, lon - dlon), min(90.0, lat + dlat), min(180.0, lon + dlon)
+
+
+def _min_distance_m(lat: float, lon: float, box: Tuple[float, float, float, float]) -> float:
+    """Lower bound on the distance from a point to anything inside box."""
+    return haversine_m(lat, lon, min(max(lat, box[0]), box[2]), min(max(lon, box[1]), box[3]))
+
+
+def _overlaps(a: Tuple[float, float, float, float], b: Tuple[float, float, float, float]) -> bool:
+    return a[0] <= b[2] and a[2] >= b[0] and a[1] <= b[3] and a[3] >= b[1]
+
+
+def _covering_cells(box: Tuple[float, float, float, float], precision: int, occupied: Dict[str, Any]) -> List[str]:
+    """
+    Cells at precision that overlap box and may be in occupied. Enumerates
+    the grid over the box, or filters the occupied cells when that is fewer.
+    """
+    min_lat, min_lon, max_lat, max_lon = box
+    dlat, dlon = cell_size(precision)
+    rows = math.floor((max_lat + 90.0) / dlat) - math.floor((min_lat + 90.0) / dlat) + 1
+    cols = math.floor((max_lon + 180.0) / dlon) - math.floor((min_lon + 180.0) / dlon) + 1
+    if rows * cols > len(occupied):
+        # sparse: cheaper to test the occupied cells than to enumerate the grid
+        return [cell for cell in occupied if _overlaps(geohash_bbox(cell), box)]
+    lat0 = (math.floor((min_lat + 90.0) / dlat) + 0.5) * dlat - 90.0
+    lon0 = (math.floor((min_lon + 180.0) / dlon) + 0.5) * dlon - 180.0
+    return [
+        geohash_encode(lat0 + r * dlat, lon0 + c * dlon, precision)
+        for r in range(rows)
+        for c in range(cols)
+    ]
+
+
+class SpatialIndex:
+    """
+    - precision: geohash length of the storage grid
+    - hotspot_precisions: grid sizes hotspot counts are kept for
+      (5 ~ 4.9 km, 6 ~ 1.2 km, 7 ~ 150 m cells)
+    """
+
+    def __init__(self, precision: int = 7, hotspot_precisions: Iterable[int] = (5, 6, 7)):
+        self.precision = precision
+        self.hotspot_precisions = tuple(sorted(set(hotspot_precisions)))
+        if any(p > precision for p in self.hotspot_precisions):
+            raise ValueError("hotspot precisions cannot be finer than the storage precision")
+        self._lock = threading.Lock()
+        # cell -> {ticket_id: item}
+        self._cells: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._items: Dict[str, Dict[str, Any]] = {}
+        # precision -> category -> cell -> count
+        self._counts: Dict[int, Dict[str, Dict[str, int]]] = {p: {} for p in self.hotspot_precisions}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _count(self, cell: str, category: str, delta: int):
+        for p in self.hotspot_precisions:
+            prefix = cell[:p]
+            for cat in (category, ALL_CATEGORIES):
+                counts = self._counts[p].setdefault(cat, {})
+                n = counts.get(prefix, 0) + delta
+                if n > 0:
+                    counts[prefix] = n
+                else:
+                    counts.pop(prefix, None)
+
+    def _remove(self, ticket_id: str) -> bool:
+        item = self._items.pop(ticket_id, None)
+        if item is None:
+            return False
+        cell = self._cells[item["geohash"]]
+        del cell[ticket_id]
+        if not cell:
+            del self._cells[item["geohash"]]
+        self._count(item["geohash"], item["category"], -1)
+        return True
+
+    def add(self, ticket_id: str, lat: float, lon: float, category: str = "", created_at: Optional[float] = None):
+        """Insert or move a ticket."""
+        item = {
+            "ticket_id": ticket_id,
+            "lat": lat,
+            "lon": lon,
+            "category": (category or "").lower(),
+            "created_at": created_at,
+            "geohash": geohash_encode(lat, lon, self.precision),
+        }
+        with self._lock:
+            self._remove(ticket_id)
+            self._items[ticket_id] = item
+            self._cells.setdefault(item["geohash"], {})[ticket_id] = item
+            self._count(item["geohash"], item["category"], 1)
+
+    def remove(self, ticket_id: str) -> bool:
+        """Drop a ticket (e.g. once it is closed)."""
+        with self._lock:
+            return self._remove(ticket_id)
+
+    def _cells_in_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[str]:
+        return _covering_cells((min_lat, min_lon, max_lat, max_lon), self.precision, self._cells)
+
+    def within_bbox(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        category: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        category = category.lower() if category else None
+        out = []
+        with self._lock:
+            for cell in self._cells_in_bbox(min_lat, min_lon, max_lat, max_lon):
+                for item in self._cells.get(cell, {}).values():
+                    if category and item["category"] != category:
+                        continue
+                    if min_lat <= item["lat"] <= max_lat and min_lon <= item["lon"] <= max_lon:
+                        out.append(dict(item))
+                        if limit is not None and len(out) >= limit:
+                            return out
+        return out
+
+    def within_radius(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: float,
+        category: Optional[str] = None,
+        limit: Optional[int] = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Nearest first, each with distance_m. Cells are visited in order of
+        their distance from the point, so with a limit the scan stops as
+        soon as no unvisited cell can hold a closer ticket.
+        """
+        category = category.lower() if category else None
+        hits = []  # max-heap via negated distance when limited
+        with self._lock:
+            cells = [
+                (_min_distance_m(lat, lon, geohash_bbox(cell)), cell)
+                for cell in self._cells_in_bbox(*radius_bbox(lat, lon, radius_m))
+                if cell in self._cells
+            ]
+            cells.sort()
+            for cell_distance, cell in cells:
+                if cell_distance > radius_m:
+                    break
+                if limit is not None and len(hits) >= limit and cell_distance > -hits[0][0]:
+                    break
+                for item in self._cells[cell].values():
+                    if category and item["category"] != category:
+                        continue
+                    d = haversine_m(lat, lon, item["lat"], item["lon"])
+                    if d > radius_m:
+                        continue
+                    entry = (-d, item["ticket_id"], item)
+                    if limit is None or len(hits) < limit:
+                        heapq.heappush(hits, entry)
+                    elif d < -hits[0][0]:
+                        heapq.heapreplace(hits, entry)
+        return [{**item, "distance_m": round(-nd, 1)} for nd, _, item in sorted(hits, key=lambda h: (-h[0], h[1]))]
+
+    def hotspots(
+        self,
+        category: Optional[str] = None,
+        k: int = 10,
+        precision: int = 6,
+        bbox: Optional[Tuple[float, float, float, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Densest cells, most tickets first: {"geohash", "count", "lat", "lon", "bbox"}
+        with lat/lon the cell centre. bbox (min_lat, min_lon, max_lat, max_lon)
+        keeps only cells that overlap it.
+        """
+        if precision not in self._counts:
+            raise ValueError(f"precision must be one of {self.hotspot_precisions}")
+        with self._lock:
+            counts = dict(self._counts[precision].get((category or ALL_CATEGORIES).lower(), {}))
+        cells = counts.items()
+        if bbox is not None:
+            cells = [(cell, counts[cell]) for cell in _covering_cells(tuple(bbox), precision, counts) if cell in counts]
+        out = []
+        for cell, n in heapq.nlargest(k, cells, key=lambda kv: (kv[1], kv[0])):
+            lat0, lon0, lat1, lon1 = geohash_bbox(cell)
+            out.append({
+                "geohash": cell,
+                "count": n,
+                "lat": round((lat0 + lat1) / 2, 6),
+                "lon": round((lon0 + lon1) / 2, 6),
+                "bbox": [lat0, lon0, lat1, lon1],
+            })
+        return out
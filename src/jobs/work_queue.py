@@ -0,0 +1,319 @@
+# src/jobs/work_queue.py
+"""
+Durable work queue for follow-up jobs (form submission, citizen messages).
+
+- Jobs live in SQLite (WAL), so anything enqueued survives a restart.
+- Each job has an idempotency key, "<kind>:<ticket_id>" by default;
+  the orchestrator passes "<kind>:<request_id>" so a key is never shared
+  by two requests. Enqueueing the same key twice is a no-op and
+  enqueue() returns False.
+- Delivery is at-least-once. A worker claims a job under a lease. If the
+  worker dies, or the process stops mid-job, the lease expires and
+  another worker picks the job up again. Handlers should therefore
+  tolerate seeing the same ticket twice.
+- A failed attempt is retried with capped exponential backoff plus full
+  jitter. After max_attempts the job is marked failed.
+
+Job status: pending -> running -> done | failed
+"""
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+JOBS_ENQUEUED = REGISTRY.counter(
+    "civicagent_jobs_enqueued_total",
+    "Jobs added to the work queue (duplicates of an existing key excluded).",
+    ["kind"],
+)
+JOBS_FINISHED = REGISTRY.counter(
+    "civicagent_jobs_finished_total",
+    "Job attempts by outcome (done, retry, failed).",
+    ["kind", "outcome"],
+)
+JOB_SECONDS = REGISTRY.histogram(
+    "civicagent_job_seconds",
+    "Handler time per job attempt.",
+    ["kind"],
+)
+JOB_LAG = REGISTRY.histogram(
+    "civicagent_job_lag_seconds",
+    "Time from a job becoming available to a worker claiming it.",
+    ["kind"],
+)
+
+
+class SQLiteWorkQueue:
+    """
+    - lease_seconds: how long a claimed job stays invisible to other workers
+    - max_attempts: attempts before a job is marked failed
+    - base_delay / max_delay: retry backoff bounds (seconds)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 300.0,
+        seed: Optional[int] = None
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # set on enqueue so idle workers do not wait out their poll interval
+        self.wakeup = threading.Event()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, ticket_id TEXT NOT NULL,"
+            " payload TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+            " available_at REAL NOT NULL, lease_token TEXT, lease_until REAL,"
+            " last_error TEXT, result TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, available_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ticket ON jobs(ticket_id)")
+
+    @staticmethod
+    def job_key(kind: str, ticket_id: str) -> str:
+        return f"{kind}:{ticket_id}"
+
+    def enqueue(
+        self,
+        kind: str,
+        ticket_id: str,
+        payload: Dict[str, Any],
+        job_id: Optional[str] = None
+    ) -> bool:
+        """Returns False if a job with this key already exists."""
+        now = time.time()
+        job_id = job_id or self.job_key(kind, ticket_id)
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, kind, ticket_id, payload, status, available_at,"
+                " created_at, updated_at) VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)",
+                (job_id, kind, ticket_id, json.dumps(payload, default=str), now, now, now),
+            )
+        if cur.rowcount == 0:
+            return False
+        JOBS_ENQUEUED.inc(kind=kind)
+        self.wakeup.set()
+        return True
+
+    def claim(self, kinds: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest available job: pending and due, or running with an
+        expired lease (its worker is gone). Returns None when nothing is ready.
+        """
+        now = time.time()
+        kind_filter, params = "", [now, now]
+        if kinds:
+            kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})"
+            params += list(kinds)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT job_id, kind, ticket_id, payload, attempts, available_at, lease_until FROM jobs"
+                    " WHERE ((status = 'pending' AND available_at <= ?)"
+                    " OR (status = 'running' AND lease_until <= ?))" + kind_filter +
+                    " ORDER BY available_at LIMIT 1",
+                    params,
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+                token = uuid.uuid4().hex
+                self._db.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_token = ?,"
+                    " lease_until = ?, updated_at = ? WHERE job_id = ?",
+                    (token, now + self.lease_seconds, now, row[0]),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        job_id, kind, ticket_id, payload, attempts, available_at, lease_until = row
+        JOB_LAG.observe(max(0.0, now - (lease_until or available_at)), kind=kind)
+        return {
+            "job_id": job_id,
+            "kind": kind,
+            "ticket_id": ticket_id,
+            "payload": json.loads(payload),
+            "attempt": attempts + 1,
+            "lease_token": token,
+        }
+
+    def complete(self, job: Dict[str, Any], result: Any) -> bool:
+        """Record success. False if the lease was lost (another worker owns the job now)."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, last_error = NULL, lease_token = NULL,"
+                " lease_until = NULL, updated_at = ? WHERE job_id = ? AND lease_token = ?",
+                (json.dumps(result, default=str), time.time(), job["job_id"], job["lease_token"]),
+            )
+        return cur.rowcount == 1
+
+    def backoff(self, attempt: int) -> float:
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def fail(self, job: Dict[str, Any], error: str) -> str:
+        """Schedule a retry, or mark the job failed once attempts run out. Returns the new status."""
+        now = time.time()
+        if job["attempt"] >= self.max_attempts:
+            status, available_at = "failed", now
+        else:
+            status, available_at = "pending", now + self.backoff(job["attempt"])
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, last_error = ?, lease_token = NULL,"
+                " lease_until = NULL, updated_at = ? WHERE job_id = ? AND lease_token = ?",
+                (status, available_at, error, now, job["job_id"], job["lease_token"]),
+            )
+        return status if cur.rowcount == 1 else "lease_lost"
+
+    def next_due(self) -> Optional[float]:
+        """Earliest time a job becomes claimable (None if the queue is idle)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(CASE status WHEN 'pending' THEN available_at ELSE lease_until END)"
+                " FROM jobs WHERE status IN ('pending', 'running')"
+            ).fetchone()
+        return row[0]
+
+    def jobs_for_ticket(self, ticket_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT job_id, kind, status, attempts, last_error, result, created_at, updated_at"
+                " FROM jobs WHERE ticket_id = ? ORDER BY created_at",
+                (ticket_id,),
+            ).fetchall()
+        return [
+            {
+                "job_id": r[0],
+                "kind": r[1],
+                "status": r[2],
+                "attempts": r[3],
+                "last_error": r[4],
+                "result": json.loads(r[5]) if r[5] is not None else None,
+                "created_at": r[6],
+                "updated_at": r[7],
+            }
+            for r in rows
+        ]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class WorkerPool:
+    """
+    Threads that claim jobs and run handlers[kind](payload). A handler's
+    return value is stored as the job result. If it raises, the job is
+    retried.
+
+    Idle workers sleep until the queue's wakeup event fires, the next
+    retry is due, or poll_interval passes. The poll interval matters for
+    jobs added by another process.
+    """
+
+    def __init__(
+        self,
+        queue: SQLiteWorkQueue,
+        handlers: Dict[str, Callable[[Dict[str, Any]], Any]],
+        workers: int = 4,
+        poll_interval: float = 1.0
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop claiming new jobs. A job still running past the timeout is redelivered once its lease expires."""
+        self._stop.set()
+        self.queue.wakeup.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def run_one(self) -> bool:
+        """Claim and process a single job; False if none was ready."""
+        job = self.queue.claim(list(self.handlers))
+        if job is None:
+            return False
+        kind = job["kind"]
+        start = time.perf_counter()
+        try:
+            result = self.handlers[kind](job["payload"])
+        except Exception as e:
+            status = self.queue.fail(job, f"{type(e).__name__}: {e}")
+            outcome = "retry" if status == "pending" else status
+            logger.warning("job %s attempt %d failed (%s): %s", job["job_id"], job["attempt"], outcome, e)
+        else:
+            outcome = "done" if self.queue.complete(job, result) else "lease_lost"
+        JOB_SECONDS.observe(time.perf_counter() - start, kind=kind)
+        JOBS_FINISHED.inc(kind=kind, outcome=outcome)
+        return True
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_one():
+                    continue
+            except Exception:
+                # a broken database connection etc.; keep the worker alive
+                logger.exception("job worker error")
+            due = self.queue.next_due()
+            wait = self.poll_interval if due is None else min(self.poll_interval, max(0.0, due - time.time()))
+            if wait > 0:
+                self.queue.wakeup.wait(wait)
+                self.queue.wakeup.clear()
+
+
+def work_queue_from_env() -> Optional[SQLiteWorkQueue]:
+    """
+    CIVICAGENT_JOB_DB=jobs.sqlite enables the durable queue;
+    CIVICAGENT_JOB_LEASE (seconds, default 60) and
+    CIVICAGENT_JOB_MAX_ATTEMPTS (default 5) tune delivery.
+    """
+    path = os.getenv("CIVICAGENT_JOB_DB")
+    if not path:
+        return None
+    return SQLiteWorkQueue(
+        path,
+        lease_seconds=float(os.getenv("CIVICAGENT_JOB_LEASE", "60")),
+        max_attempts=int(os.getenv("CIVICAGENT_JOB_MAX_ATTEMPTS", "5")),
+    )
@@ -0,0 +1,273 @@
+# src/llm/fake_client.py
+
+import os
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+
+from src.llm.gemini_client import GeminiClient
+from src.llm.scheduling import RequestScheduler, estimate_tokens
+from src.llm.schema_validation import DEFAULT_MAX_REPAIRS, astructured_result, structured_result
+from src.utils.metrics import LLM_LATENCY, LLM_ERRORS
+
+
+class FakeGeminiError(RuntimeError):
+    """Injected failure; carries an HTTP-like status code like the SDK's APIError."""
+
+    def __init__(self, message: str, code: int = 503):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeGeminiClient:
+    """
+    Offline stand-in for GeminiClient (same public methods, sync + async).
+
+    - Outputs are deterministic for a given prompt and always valid against
+      the requested JSON schema. String fields whose name appears as a
+      "Name: value" line in the prompt echo that value, so rule-derived
+      context (department, severity, ...) survives like it would with a
+      well-behaved model.
+    - Each call sleeps for a log-normally distributed latency
+      (latency_ms = median, latency_sigma = spread) and fails with
+      probability error_rate.
+    - With probability invalid_rate a structured answer omits one required
+      field, exercising the same validation + field repair as GeminiClient.
+    - With a scheduler, calls get the same quota/retry/deadline/hedging
+      policy as GeminiClient (from_env builds one from GEMINI_* settings).
+
+    Select it with GEMINI_BACKEND=fake (see get_gemini_client).
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        default_model: str = "fake-gemini",
+        scheduler: Optional[RequestScheduler] = None,
+        invalid_rate: float = 0.0,
+        max_repairs: int = DEFAULT_MAX_REPAIRS
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.default_model = default_model
+        self.cache = None
+        self.scheduler = scheduler
+        self.invalid_rate = invalid_rate
+        self.max_repairs = max_repairs
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "FakeGeminiClient":
+        return cls(
+            latency_ms=float(os.getenv("GEMINI_FAKE_LATENCY_MS", "300")),
+            latency_sigma=float(os.getenv("GEMINI_FAKE_LATENCY_SIGMA", "0.5")),
+            error_rate=float(os.getenv("GEMINI_FAKE_ERROR_RATE", "0")),
+            seed=int(os.getenv("GEMINI_FAKE_SEED", "0")),
+            scheduler=RequestScheduler.from_env(),
+            invalid_rate=float(os.getenv("GEMINI_FAKE_INVALID_RATE", "0")),
+        )
+
+    # -- simulated transport ----------------------------------------------
+
+    def _draw(self) -> Tuple[float, bool]:
+        with self._lock:
+            self.calls += 1
+            delay = 0.0
+            if self.latency_ms > 0:
+                delay = self._rng.lognormvariate(math.log(self.latency_ms / 1000.0), self.latency_sigma)
+            failed = self._rng.random() < self.error_rate
+        return delay, failed
+
+    def _finish(self, model: str, method: str, delay: float, failed: bool):
+        if failed:
+            LLM_ERRORS.inc(model=model, method=method)
+            raise FakeGeminiError(f"Injected failure from fake backend ({method})")
+        LLM_LATENCY.observe(delay, model=model, method=method)
+
+    def _attempt(self, model: str, method: str):
+        delay, failed = self._draw()
+        if delay:
+            time.sleep(delay)
+        self._finish(model, method, delay, failed)
+
+    async def _aattempt(self, model: str, method: str):
+        delay, failed = self._draw()
+        if delay:
+            await asyncio.sleep(delay)
+        self._finish(model, method, delay, failed)
+
+    def _call(self, model: Optional[str], method: str, prompt: str = ""):
+        model = model or self.default_model
+        if self.scheduler is None:
+            self._attempt(model, method)
+        else:
+            self.scheduler.call(model, method, estimate_tokens([prompt]), lambda: self._attempt(model, method))
+
+    async def _acall(self, model: Optional[str], method: str, prompt: str = ""):
+        model = model or self.default_model
+        if self.scheduler is None:
+            await self._aattempt(model, method)
+        else:
+            await self.scheduler.acall(model, method, estimate_tokens([prompt]), lambda: self._aattempt(model, method))
+
+    # -- deterministic content --------------------------------------------
+
+    @staticmethod
+    def _digest(*parts: str) -> str:
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _context_values(prompt: str) -> Dict[str, str]:
+        values = {}
+        for m in re.finditer(r"^[\s\-*]*([A-Za-z][A-Za-z _]{1,40}):[ \t]*(\S.*)$", prompt, re.MULTILINE):
+            values[m.group(1).strip().lower().replace(" ", "_")] = m.group(2).strip()
+        return values
+
+    def _instance(self, schema: Dict[str, Any], seed: str, name: str, context: Dict[str, str]) -> Any:
+        kind = schema.get("type", "object")
+        h = self._digest(seed, name)
+        if "enum" in schema:
+            hinted = context.get(name, "").lower()
+            for option in schema["enum"]:
+                if str(option).lower() == hinted:
+                    return option
+            return schema["enum"][int(h[:8], 16) % len(schema["enum"])]
+        if kind == "object":
+            return {
+                prop: self._instance(sub, seed, prop, context)
+                for prop, sub in schema.get("properties", {}).items()
+            }
+        if kind == "array":
+            return [self._instance(schema.get("items", {"type": "string"}), seed, f"{name}_{i}", context) for i in range(2)]
+        if kind == "integer":
+            return int(h[:6], 16) % 100
+        if kind == "number":
+            return (int(h[:6], 16) % 10000) / 100.0
+        if kind == "boolean":
+            return int(h[0], 16) % 2 == 0
+        if name in context:
+            text = context[name]
+        elif name.endswith("_id"):
+            # never invent identifiers; callers assign their own
+            text = ""
+        else:
+            text = f"{name.replace('_', ' ')} {h[:8]}"
+        return text[:schema["maxLength"]] if "maxLength" in schema else text
+
+    # -- GeminiClient interface --------------------------------------------
+
+    def _text_for(self, prompt: str) -> str:
+        return f"Acknowledged ({self._digest(prompt)[:8]}): your municipal incident report has been received."
+
+    def generate_text(self, prompt: str, temperature: float = 0.0, model: Optional[str] = None):
+        self._call(model, "generate_text", prompt)
+        return self._text_for(prompt)
+
+    def _stream_text_for(self, prompt: str) -> str:
+        # mirrors the SUMMARY/ACTIONS layout Orchestrator.stream_ticket asks for
+        if "ACTIONS:" not in prompt:
+            return self._text_for(prompt)
+        context = self._context_values(prompt)
+        category = context.get("issue_category", "issue").replace("_", " ")
+        department = context.get("department", "the responsible department")
+        return (
+            f"SUMMARY: Reported {category} at {context.get('location', 'the given location')} "
+            f"({self._digest(prompt)[:8]}).\n"
+            f"ACTIONS:\n- Route to {department}\n- Schedule an inspection\n"
+        )
+
+    def generate_text_stream(self, prompt: str, temperature: float = 0.0, model: Optional[str] = None):
+        """Yields the reply a few words at a time, spreading the drawn latency over the chunks."""
+        if self.scheduler is not None:
+            wait = self.scheduler.quota_wait(model or self.default_model, "generate_text_stream", estimate_tokens([prompt]))
+            if wait:
+                time.sleep(wait)
+        delay, failed = self._draw()
+        words = re.findall(r"\S+\s*", self._stream_text_for(prompt))
+        chunks = ["".join(words[i:i + 3]) for i in range(0, len(words), 3)] or [""]
+        step = delay / len(chunks)
+        for i, chunk in enumerate(chunks):
+            if step:
+                time.sleep(step)
+            if i == len(chunks) - 1:
+                self._finish(model or self.default_model, "generate_text_stream", delay, failed)
+            yield chunk
+
+    async def agenerate_text(self, prompt: str, temperature: float = 0.0, model: Optional[str] = None):
+        await self._acall(model, "agenerate_text", prompt)
+        return self._text_for(prompt)
+
+    def _structured_text(self, prompt: str, schema: Dict[str, Any], corrupt: bool = True) -> str:
+        instance = self._instance(schema, prompt, "root", self._context_values(prompt))
+        required = schema.get("required", [])
+        if corrupt and required and self.invalid_rate > 0:
+            with self._lock:
+                drop = self._rng.random() < self.invalid_rate
+            if drop:
+                instance.pop(required[int(self._digest(prompt)[:8], 16) % len(required)], None)
+        return json.dumps(instance)
+
+    def _structured_for(self, model: Optional[str], method: str, prompt: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+        def regenerate(repair_prompt: str, sub: Dict[str, Any]) -> str:
+            self._call(model, method + "_repair", repair_prompt)
+            return self._structured_text(repair_prompt, sub, corrupt=False)
+
+        self._call(model, method, prompt)
+        return structured_result(
+            self._structured_text(prompt, schema), schema, prompt, regenerate,
+            method=method, max_repairs=self.max_repairs, fallback=GeminiClient._raw_fallback
+        )
+
+    async def _astructured_for(self, model: Optional[str], method: str, prompt: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+        async def regenerate(repair_prompt: str, sub: Dict[str, Any]) -> str:
+            await self._acall(model, method + "_repair", repair_prompt)
+            return self._structured_text(repair_prompt, sub, corrupt=False)
+
+        await self._acall(model, method, prompt)
+        return await astructured_result(
+            self._structured_text(prompt, schema), schema, prompt, regenerate,
+            method=method, max_repairs=self.max_repairs, fallback=GeminiClient._raw_fallback
+        )
+
+    def generate_structured(self, prompt: str, json_schema: Dict[str, Any], model: Optional[str] = None):
+        return self._structured_for(model, "generate_structured", prompt, json_schema)
+
+    async def agenerate_structured(self, prompt: str, json_schema: Dict[str, Any], model: Optional[str] = None):
+        return await self._astructured_for(model, "agenerate_structured", prompt, json_schema)
+
+    def generate_structured_vision(
+        self,
+        prompt: str,
+        text_input: str,
+        images: List[Dict[str, Any]],
+        schema: Dict[str, Any]
+    ):
+        return self._structured_for(None, "generate_structured_vision", prompt + "\n" + text_input, schema)
+
+    async def agenerate_structured_vision(
+        self,
+        prompt: str,
+        text_input: str,
+        images: List[Dict[str, Any]],
+        schema: Dict[str, Any]
+    ):
+        return await self._astructured_for(None, "agenerate_structured_vision", prompt + "\n" + text_input, schema)
+
+    def close(self):
+        if self.scheduler is not None:
+            self.scheduler.close()
+
+    async def aclose(self):
+        self.close()
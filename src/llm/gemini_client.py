@@ -1,18 +1,41 @@
 # src/llm/gemini_client.py
 
 import os
-import json
 import time
+import asyncio
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# google.genai takes a few hundred ms to import; it is loaded by the first
+# GeminiClient so processes that never talk to Gemini don't pay for it.
+genai = None
+
+
+def _import_genai():
+    global genai
+    if genai is None:
+        try:
+            from google import genai as sdk
+        except ImportError:
+            return None
+        genai = sdk
+    return genai
+
 try:
-    from google import genai
+    import httpx
 except ImportError:
-    genai = None
+    httpx = None
+
+from src.llm.response_cache import ResponseCache, response_cache_from_env
+from src.llm.scheduling import RequestScheduler, estimate_tokens
+from src.llm.schema_validation import DEFAULT_MAX_REPAIRS, astructured_result, structured_result
+from src.utils.metrics import LLM_LATENCY, LLM_ERRORS
+
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "64"))
 
 
 class GeminiClient:
@@ -20,19 +43,53 @@ class GeminiClient:
     Minimal, stable wrapper compatible with google-genai 2025+.
     Supports:
       - Text generation
-      - JSON structured output
+      - JSON structured output (native JSON mode + response_schema),
+        validated against the schema with field-level repair
+        (see schema_validation)
+      - Native async variants (agenerate_*) sharing one pooled HTTP session,
+        with a per-model cap on in-flight requests
+      - Optional content-addressed response cache (see ResponseCache)
+      - Client-side quota, retries, deadlines and hedging for every
+        generate_content call (see RequestScheduler)
     """
 
-    def __init__(self, api_key: Optional[str] = None, default_model: str = "gemini-2.0-flash"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        default_model: str = "gemini-2.0-flash",
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        model_concurrency: Optional[Dict[str, int]] = None,
+        cache: Optional[ResponseCache] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        max_repairs: int = DEFAULT_MAX_REPAIRS,
+    ):
         api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise RuntimeError("GEMINI_API_KEY is not set in the environment.")
 
-        if genai is None:
+        if _import_genai() is None:
             raise RuntimeError("google-genai is not installed. Run: pip install google-genai")
 
-        self.client = genai.Client(api_key=api_key)
+        # One pooled async HTTP session shared by every agenerate_* call.
+        # Keep-alive connections are sized to the concurrency cap so a burst
+        # of calls reuses sockets instead of re-handshaking.
+        http_options = None
+        self._async_http = None
+        if httpx is not None:
+            pool = max([max_concurrency] + list((model_concurrency or {}).values()))
+            self._async_http = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool)
+            )
+            http_options = {"httpx_async_client": self._async_http}
+
+        self.client = genai.Client(api_key=api_key, http_options=http_options)
         self.default_model = default_model
+        self.max_concurrency = max_concurrency
+        self.model_concurrency = dict(model_concurrency or {})
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.cache = cache
+        self.scheduler = scheduler or RequestScheduler.from_env(max_workers=max_concurrency)
+        self.max_repairs = max_repairs
 
     def _extract_text(self, response):
         """
@@ -57,49 +114,221 @@ class GeminiClient:
 
         return str(response)
 
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        """
+        Per-model concurrency limiter for the async path.
+        """
+        sem = self._semaphores.get(model)
+        if sem is None:
+            limit = self.model_concurrency.get(model, self.max_concurrency)
+            sem = self._semaphores.setdefault(model, asyncio.Semaphore(limit))
+        return sem
+
+    def _cache_key(self, model: str, contents: List[Any], config: Dict[str, Any]) -> Optional[str]:
+        # only deterministic (temperature 0) calls are worth caching
+        if self.cache is None or config.get("temperature", 0.0) > 0.0:
+            return None
+        return ResponseCache.make_key(model, contents, config)
+
+    def _generate(self, model: str, contents: List[Any], config: Dict[str, Any], method: str = "generate_text") -> str:
+        """
+        Single choke point for blocking generate_content calls.
+        """
+        key = self._cache_key(model, contents, config)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        def attempt():
+            start = time.perf_counter()
+            try:
+                response = self.client.models.generate_content(
+                    model=model,
+                    contents=contents,
+                    config=config  # correct param for your SDK version
+                )
+            except Exception:
+                LLM_ERRORS.inc(model=model, method=method)
+                raise
+            dur = time.perf_counter() - start
+            LLM_LATENCY.observe(dur, model=model, method=method)
+            logger.info(f"[gemini] model={model} duration={dur:.2f}s")
+            return response
+
+        response = self.scheduler.call(model, method, estimate_tokens(contents), attempt)
+
+        text = self._extract_text(response)
+        if key is not None:
+            self.cache.set(key, text)
+        return text
+
+    async def _agenerate(
+        self, model: str, contents: List[Any], config: Dict[str, Any], method: str = "agenerate_text"
+    ) -> str:
+        """
+        Async choke point; waits for a free slot in the model's concurrency
+        limit instead of holding a worker thread.
+        """
+        key = self._cache_key(model, contents, config)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        async def attempt():
+            async with self._semaphore(model):
+                start = time.perf_counter()
+                try:
+                    response = await self.client.aio.models.generate_content(
+                        model=model,
+                        contents=contents,
+                        config=config
+                    )
+                except Exception:
+                    LLM_ERRORS.inc(model=model, method=method)
+                    raise
+                dur = time.perf_counter() - start
+            LLM_LATENCY.observe(dur, model=model, method=method)
+            logger.info(f"[gemini] model={model} duration={dur:.2f}s async")
+            return response
+
+        response = await self.scheduler.acall(model, method, estimate_tokens(contents), attempt)
+
+        text = self._extract_text(response)
+        if key is not None:
+            self.cache.set(key, text)
+        return text
+
+    @staticmethod
+    def _structured_config(json_schema: Dict[str, Any]) -> Dict[str, Any]:
+        # JSON mode with the schema enforced by the API, so the prompt
+        # does not have to spell the schema out
+        return {"temperature": 0.0, "response_mime_type": "application/json", "response_schema": json_schema}
+
+    @staticmethod
+    def _raw_fallback(text: str) -> Dict[str, Any]:
+        return {"_raw": text}
+
+    @staticmethod
+    def _vision_fallback(text: str) -> Dict[str, Any]:
+        return {"error": "Failed to parse JSON output", "raw": text}
+
+    def _repairer(self, model: str, method: str):
+        def regenerate(prompt: str, schema: Dict[str, Any]) -> str:
+            return self._generate(model, [prompt], self._structured_config(schema), method=method + "_repair")
+        return regenerate
+
+    def _arepairer(self, model: str, method: str):
+        async def regenerate(prompt: str, schema: Dict[str, Any]) -> str:
+            return await self._agenerate(model, [prompt], self._structured_config(schema), method=method + "_repair")
+        return regenerate
+
+    @staticmethod
+    def _vision_parts(prompt: str, text_input: str, images: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Build multimodal message
+        parts = [
+            {"text": prompt},
+            {"text": text_input}
+        ]
+
+        # Add images
+        for img in images:
+            parts.append(
+                {
+                    "inline_data": {
+                        "mime_type": img["mime_type"],
+                        "data": img["data"]
+                    }
+                }
+            )
+        return parts
+
     def generate_text(self, prompt: str, temperature: float = 0.0, model: Optional[str] = None):
         """
         Text generation using the NEWEST google-genai SDK call signature.
         NO generation_config is allowed.
         """
         model = model or self.default_model
+        return self._generate(model, [prompt], {"temperature": temperature})
 
-        start = time.time()
-        response = self.client.models.generate_content(
-            model=model,
-            contents=[prompt],
-            config={"temperature": temperature}  # correct param for your SDK version
-        )
-        dur = time.time() - start
-        logger.info(f"[gemini] model={model} duration={dur:.2f}s")
+    def generate_text_stream(
+        self, prompt: str, temperature: float = 0.0, model: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Yields text chunks as the model produces them.
+        - Cache hits are replayed as a single chunk.
+        - Waits for quota like other calls, but is not retried or hedged:
+          chunks may already have reached the caller.
+        - Latency metric covers the whole stream; time-to-first-chunk is
+          recorded under method="generate_text_stream_first_chunk".
+        """
+        model = model or self.default_model
+        contents, config = [prompt], {"temperature": temperature}
+        key = self._cache_key(model, contents, config)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        method = "generate_text_stream"
+        wait = self.scheduler.quota_wait(model, method, estimate_tokens(contents))
+        if wait:
+            time.sleep(wait)
+        start = time.perf_counter()
+        parts = []
+        try:
+            for chunk in self.client.models.generate_content_stream(model=model, contents=contents, config=config):
+                text = getattr(chunk, "text", None)
+                if not text:
+                    continue
+                if not parts:
+                    LLM_LATENCY.observe(time.perf_counter() - start, model=model, method=method + "_first_chunk")
+                parts.append(text)
+                yield text
+        except Exception:
+            LLM_ERRORS.inc(model=model, method=method)
+            raise
+        dur = time.perf_counter() - start
+        LLM_LATENCY.observe(dur, model=model, method=method)
+        logger.info(f"[gemini] model={model} duration={dur:.2f}s stream")
 
-        return self._extract_text(response)
+        if key is not None:
+            self.cache.set(key, "".join(parts).strip())
+
+    async def agenerate_text(self, prompt: str, temperature: float = 0.0, model: Optional[str] = None):
+        """
+        Async counterpart of generate_text.
+        """
+        model = model or self.default_model
+        return await self._agenerate(model, [prompt], {"temperature": temperature})
 
     def generate_structured(self, prompt: str, json_schema: Dict[str, Any], model: Optional[str] = None):
         """
-        Ask model to output ONLY JSON.
-        Then parse JSON robustly.
+        JSON output matching json_schema. Invalid or missing fields are
+        re-requested with a small repair prompt; whatever is still invalid
+        afterwards is listed under "_schema_errors".
         """
         model = model or self.default_model
-        wrapper = (
-            "Return ONLY valid JSON (no commentary). "
-            "If unable, return {}.\n"
-            f"SCHEMA: {json_schema}\n\n"
-            f"CONTENT:\n{prompt}"
+        method = "generate_structured"
+        text = self._generate(model, [prompt], self._structured_config(json_schema), method=method)
+        return structured_result(
+            text, json_schema, prompt, self._repairer(model, method),
+            method=method, max_repairs=self.max_repairs, fallback=self._raw_fallback
         )
 
-        text = self.generate_text(wrapper, temperature=0.0)
-
-        try:
-            # find JSON block
-            s = text.find("{")
-            e = text.rfind("}")
-            if s != -1 and e != -1:
-                return json.loads(text[s:e+1])
-            return json.loads(text)
-        except Exception:
-            logger.warning("Failed to parse JSON; returning raw text.")
-            return {"_raw": text}
+    async def agenerate_structured(self, prompt: str, json_schema: Dict[str, Any], model: Optional[str] = None):
+        """
+        Async counterpart of generate_structured.
+        """
+        model = model or self.default_model
+        method = "agenerate_structured"
+        text = await self._agenerate(model, [prompt], self._structured_config(json_schema), method=method)
+        return await astructured_result(
+            text, json_schema, prompt, self._arepairer(model, method),
+            method=method, max_repairs=self.max_repairs, fallback=self._raw_fallback
+        )
 
     def generate_structured_vision(
         self,
@@ -111,50 +340,97 @@ class GeminiClient:
         """
         Gemini Vision + Text → JSON output.
         Compatible with newest google-genai SDK.
+        Repairs are text-only: the model re-reads the request, not the images.
         """
 
         model = self.default_model  # FIX: use correct model attribute
+        method = "generate_structured_vision"
 
-        # Build multimodal message
-        parts = [
-            {"text": prompt},
-            {"text": text_input}
-        ]
+        # Correct param is 'config=', not generation_config
+        text = self._generate(
+            model,
+            self._vision_parts(prompt, text_input, images),
+            self._structured_config(schema),
+            method=method
+        )
 
-        # Add images
-        for img in images:
-            parts.append(
-                {
-                    "inline_data": {
-                        "mime_type": img["mime_type"],
-                        "data": img["data"]
-                    }
-                }
-            )
+        return structured_result(
+            text, schema, prompt + "\n" + text_input, self._repairer(model, method),
+            method=method, max_repairs=self.max_repairs, fallback=self._vision_fallback
+        )
 
-        # Correct param is 'config=', not generation_config
-        response = self.client.models.generate_content(
-            model=model,
-            contents=parts,
-            config={"response_mime_type": "application/json"}
+    async def agenerate_structured_vision(
+        self,
+        prompt: str,
+        text_input: str,
+        images: List[Dict[str, Any]],
+        schema: Dict[str, Any]
+    ):
+        """
+        Async counterpart of generate_structured_vision.
+        """
+        model = self.default_model
+        method = "agenerate_structured_vision"
+
+        text = await self._agenerate(
+            model,
+            self._vision_parts(prompt, text_input, images),
+            self._structured_config(schema),
+            method=method
         )
 
-        # Parse JSON safely
-        try:
-            return json.loads(response.text)
-        except Exception:
-            return {
-                "error": "Failed to parse JSON output",
-                "raw": response.text
-            }
+        return await astructured_result(
+            text, schema, prompt + "\n" + text_input, self._arepairer(model, method),
+            method=method, max_repairs=self.max_repairs, fallback=self._vision_fallback
+        )
+
+    def close(self):
+        """
+        Release the synchronous HTTP client.
+        """
+        self.client.close()
+        self.scheduler.close()
+
+    async def aclose(self):
+        """
+        Shutdown hook: close the async SDK transport and the pooled session.
+        Safe to call more than once.
+        """
+        await self.client.aio.aclose()
+        self.scheduler.close()
+        if self._async_http is not None and not self._async_http.is_closed:
+            await self._async_http.aclose()
+        if self.cache is not None:
+            self.cache.close()
 
 
 
 
 _singleton = None
 
-def get_gemini_client(api_key: Optional[str] = None):
+def get_gemini_client(api_key: Optional[str] = None, backend: Optional[str] = None):
+    """
+    Shared client. backend (or GEMINI_BACKEND) selects the implementation:
+      - "gemini" (default): real API, needs GEMINI_API_KEY
+      - "fake": offline FakeGeminiClient, configured via GEMINI_FAKE_* env vars
+    """
     global _singleton
     if _singleton is None:
-        _singleton = GeminiClient(api_key=api_key)
-    return _singleton   
\ No newline at end of file
+        backend = (backend or os.getenv("GEMINI_BACKEND") or "gemini").lower()
+        if backend == "fake":
+            from src.llm.fake_client import FakeGeminiClient
+            _singleton = FakeGeminiClient.from_env()
+        elif backend == "gemini":
+            _singleton = GeminiClient(api_key=api_key, cache=response_cache_from_env())
+        else:
+            raise ValueError(f"Unknown GEMINI_BACKEND: {backend}")
+    return _singleton
+
+async def aclose_gemini_client():
+    """
+    Close the shared client, if one was created. Intended for app shutdown.
+    """
+    global _singleton
+    if _singleton is not None:
+        await _singleton.aclose()
+        _singleton = None
\ No newline at end of file
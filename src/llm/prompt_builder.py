@@ -0,0 +1,208 @@
+# src/llm/prompt_builder.py
+"""
+Shared prompt construction with a token budget.
+
+- Context is serialized as compact, deterministic "key: value" lines
+  holding only the fields a prompt asks for (no dict reprs).
+- Free text (citizen descriptions, evidence summaries) is cut on a word
+  boundary by token estimate, both per field and to fit the agent's
+  overall budget.
+- JSON schemas are rendered as a terse type sketch instead of a repr.
+- Every built prompt is counted in civicagent_prompt_tokens{agent}.
+
+Token counts are estimates (~4 characters per token); they only need to
+be consistent, not exact.
+"""
+import os
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.utils.metrics import REGISTRY
+
+CHARS_PER_TOKEN = 4
+ELLIPSIS = "…"
+
+# Default per-agent prompt budgets (estimated tokens), including instructions.
+# Override with PROMPT_BUDGET_<AGENT>=n, e.g. PROMPT_BUDGET_COMMS=400.
+DEFAULT_BUDGETS = {
+    "comms": 600,
+    "form": 400,
+    "orchestrator": 800,
+    "evidence": 700,
+}
+DEFAULT_BUDGET = 1000
+
+# Cap on a single free-text field (e.g. a description) before budget fitting
+DEFAULT_FIELD_TOKENS = 200
+
+PROMPT_TOKENS = REGISTRY.histogram(
+    "civicagent_prompt_tokens",
+    "Estimated input tokens per built prompt.",
+    ["agent"],
+    buckets=(16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192),
+)
+PROMPT_TRUNCATIONS = REGISTRY.counter(
+    "civicagent_prompt_truncations_total",
+    "Prompt fields shortened to fit a token limit.",
+    ["agent"],
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Collapse whitespace and cut to ~max_tokens on a word boundary."""
+    text = " ".join(str(text).split())
+    max_chars = max(0, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max(0, max_chars - len(ELLIPSIS))]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip(" ,.;:-") + ELLIPSIS
+
+
+def prompt_budget(agent: str) -> int:
+    override = os.getenv(f"PROMPT_BUDGET_{agent.upper()}")
+    return int(override) if override else DEFAULT_BUDGETS.get(agent, DEFAULT_BUDGET)
+
+
+def _scalar(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return "; ".join(_scalar(v) for v in value if v not in (None, ""))
+    if isinstance(value, dict):
+        return ", ".join(f"{k}={_scalar(v)}" for k, v in value.items() if v not in (None, "", []))
+    return " ".join(str(value).split())
+
+
+def compact_fields(data: Dict[str, Any], fields: Iterable[str]) -> str:
+    """'key: value' lines for the given fields, in the given order, skipping empties."""
+    return "\n".join(
+        f"{field}: {_scalar(data[field])}"
+        for field in fields
+        if data.get(field) not in (None, "", [], {})
+    )
+
+
+def _sketch(schema: Dict[str, Any]) -> str:
+    if "enum" in schema:
+        return "|".join(json.dumps(v) for v in schema["enum"])
+    kind = schema.get("type", "object")
+    if kind == "object":
+        required = set(schema.get("required", ()))
+        props = schema.get("properties", {})
+        return "{" + ",".join(
+            f"{name}{'' if name in required else '?'}:{_sketch(sub)}" for name, sub in props.items()
+        ) + "}"
+    if kind == "array":
+        return "[" + _sketch(schema.get("items", {"type": "string"})) + "]"
+    if kind == "string" and "maxLength" in schema:
+        return f"string<={schema['maxLength']}"
+    return kind
+
+
+_sketch_cache: Dict[int, tuple] = {}
+_sketch_lock = threading.Lock()
+
+
+def compact_schema(schema: Dict[str, Any]) -> str:
+    """
+    Terse sketch of a JSON schema, e.g. {id:string,tags?:[string],level:"low"|"high"}
+    ('?' marks optional keys). Cached per schema object; schemas are module constants.
+    """
+    cached = _sketch_cache.get(id(schema))
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+    sketch = _sketch(schema)
+    with _sketch_lock:
+        _sketch_cache[id(schema)] = (schema, sketch)
+    return sketch
+
+
+class PromptBuilder:
+    """
+    Assembles one prompt from sections:
+      fixed    - instructions; never shortened
+      fields   - compact key/value context; long values are capped per field
+      text     - a labelled free-text block that may be shortened
+
+    build() shortens truncatable sections (longest first) until the prompt
+    fits the agent's budget, then records its size. Builders are single-use.
+    """
+
+    def __init__(self, agent: str, budget_tokens: Optional[int] = None):
+        self.agent = agent
+        self.budget = budget_tokens if budget_tokens is not None else prompt_budget(agent)
+        self._sections: List[Dict[str, Any]] = []
+        self.truncated = False
+
+    def _cap(self, text: str, max_tokens: int) -> str:
+        short = truncate_to_tokens(text, max_tokens)
+        if short != " ".join(text.split()):
+            self.truncated = True
+            PROMPT_TRUNCATIONS.inc(agent=self.agent)
+        return short
+
+    def add(self, text: str) -> "PromptBuilder":
+        self._sections.append({"text": text, "label": None, "flexible": False})
+        return self
+
+    def add_fields(
+        self,
+        data: Dict[str, Any],
+        fields: Iterable[str],
+        label: Optional[str] = None,
+        max_field_tokens: int = DEFAULT_FIELD_TOKENS
+    ) -> "PromptBuilder":
+        capped = {}
+        for field in fields:
+            value = data.get(field)
+            if value in (None, "", [], {}):
+                continue
+            value = _scalar(value)
+            capped[field] = self._cap(value, max_field_tokens) if estimate_tokens(value) > max_field_tokens else value
+        body = compact_fields(capped, capped.keys())
+        if body:
+            self._sections.append({"text": body, "label": label, "flexible": False})
+        return self
+
+    def add_text(self, label: str, text: Optional[str], max_tokens: int = DEFAULT_FIELD_TOKENS) -> "PromptBuilder":
+        if text:
+            text = str(text)
+            if estimate_tokens(text) > max_tokens:
+                text = self._cap(text, max_tokens)
+            self._sections.append({"text": " ".join(text.split()), "label": label, "flexible": True})
+        return self
+
+    @staticmethod
+    def _render(section: Dict[str, Any]) -> str:
+        return f"{section['label']}:\n{section['text']}" if section["label"] else section["text"]
+
+    def build(self) -> str:
+        return "\n\n".join(self.build_parts())
+
+    def build_parts(self) -> List[str]:
+        """Fitted sections as separate strings (e.g. for multi-part requests)."""
+        rendered = [self._render(s) for s in self._sections]
+        total = estimate_tokens("\n\n".join(rendered))
+        over = total - self.budget
+        if over > 0:
+            # take the excess out of the longest free-text blocks first
+            for i in sorted(
+                (i for i, s in enumerate(self._sections) if s["flexible"]),
+                key=lambda i: -len(self._sections[i]["text"])
+            ):
+                if over <= 0:
+                    break
+                section = self._sections[i]
+                have = estimate_tokens(section["text"])
+                keep = max(16, have - over)
+                if keep < have:
+                    section["text"] = self._cap(section["text"], keep)
+                    over -= have - estimate_tokens(section["text"])
+                    rendered[i] = self._render(section)
+        PROMPT_TOKENS.observe(estimate_tokens("\n\n".join(rendered)), agent=self.agent)
+        return rendered
@@ -0,0 +1,205 @@
+# src/llm/response_cache.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Content-addressed cache for LLM responses.
+      - Memory tier: bounded LRU (OrderedDict)
+      - Disk tier (optional): SQLite file with TTL and size-based eviction
+    Keys are sha256 digests over model, prompt contents, config and the
+    hashes of any inline image data, so identical requests map to one entry.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        disk_path: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        max_disk_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        # { key: (value, stored_at) }
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats_counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            self._db.commit()
+
+    @staticmethod
+    def _fingerprint_contents(contents: List[Any]) -> List[Any]:
+        """
+        Replace inline image payloads with their sha256 so the key material
+        stays small and independent of base64 formatting.
+        """
+        out = []
+        for part in contents:
+            if isinstance(part, dict) and "inline_data" in part:
+                data = part["inline_data"].get("data", "")
+                if isinstance(data, str):
+                    data = data.encode("utf-8")
+                out.append({
+                    "inline_data": {
+                        "mime_type": part["inline_data"].get("mime_type"),
+                        "sha256": hashlib.sha256(data).hexdigest(),
+                    }
+                })
+            else:
+                out.append(part)
+        return out
+
+    @classmethod
+    def make_key(cls, model: str, contents: List[Any], config: Optional[Dict[str, Any]] = None) -> str:
+        material = json.dumps(
+            {"model": model, "contents": cls._fingerprint_contents(contents), "config": config or {}},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def _remember(self, key: str, value: str, stored_at: float):
+        self._memory[key] = (value, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats_counters["evictions"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                if not self._expired(hit[1], now):
+                    self._memory.move_to_end(key)
+                    self.stats_counters["memory_hits"] += 1
+                    return hit[0]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, stored_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, row[0], row[1])
+                        self.stats_counters["disk_hits"] += 1
+                        return row[0]
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.stats_counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self.stats_counters["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, stored_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value.encode("utf-8")), now, now),
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _evict_disk(self, now: float):
+        """
+        Drop expired rows, then least-recently-accessed rows until the
+        disk tier fits in max_disk_bytes.
+        """
+        if self.ttl_seconds is not None:
+            cur = self._db.execute("DELETE FROM responses WHERE stored_at < ?", (now - self.ttl_seconds,))
+            self.stats_counters["evictions"] += cur.rowcount
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        excess = total - self.max_disk_bytes
+        freed = 0
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.stats_counters["evictions"] += len(victims)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self.stats_counters)
+            out["memory_entries"] = len(self._memory)
+        lookups = out["memory_hits"] + out["disk_hits"] + out["misses"]
+        out["hit_rate"] = (out["memory_hits"] + out["disk_hits"]) / lookups if lookups else 0.0
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def response_cache_from_env() -> Optional[ResponseCache]:
+    """
+    Build a cache from environment settings; returns None unless
+    GEMINI_CACHE is enabled. The cache is opt-in.
+      GEMINI_CACHE=1
+      GEMINI_CACHE_MAX_ENTRIES=1024
+      GEMINI_CACHE_PATH=llm_cache.sqlite   (enables the disk tier)
+      GEMINI_CACHE_TTL=86400               (seconds)
+      GEMINI_CACHE_MAX_BYTES=67108864
+    """
+    if os.getenv("GEMINI_CACHE", "").lower() not in ("1", "true", "yes", "on"):
+        return None
+    ttl = os.getenv("GEMINI_CACHE_TTL")
+    return ResponseCache(
+        max_entries=int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "1024")),
+        disk_path=os.getenv("GEMINI_CACHE_PATH") or None,
+        ttl_seconds=float(ttl) if ttl else None,
+        max_disk_bytes=int(os.getenv("GEMINI_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    )
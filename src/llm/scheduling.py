@@ -0,0 +1,470 @@
+# src/llm/scheduling.py
+"""
+Request scheduling for Gemini calls: quota, retries, deadlines, hedging.
+
+RequestScheduler wraps one "attempt" callable (a single generate_content
+call) and adds:
+- a client-side token bucket per model for requests/min and tokens/min,
+  so we queue locally instead of collecting 429s from the API
+- jittered exponential backoff ("full jitter") on retryable errors
+  (408/429/5xx, transport timeouts)
+- an optional per-call deadline covering quota waits, attempts and
+  backoff (time an attempt spends queued for a worker thread excluded)
+- optional hedging: if an attempt is still running after the model's
+  observed latency percentile, a second one is fired and the first
+  success wins (the hedge must fit in the quota without waiting)
+
+The same policy drives the blocking path and the async path (tasks). A
+blocking attempt runs on the caller's thread unless it has to be raced
+(hedging) or abandoned (a deadline); only then does it go to a thread
+pool. Python cannot stop an abandoned thread, so with a deadline a
+timed-out attempt still finishes in the background.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from src.llm.prompt_builder import CHARS_PER_TOKEN
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+# Gemini bills an inline image as a fixed-size block of tokens
+IMAGE_TOKEN_ESTIMATE = 258
+OUTPUT_TOKEN_ESTIMATE = 256
+
+LLM_RETRIES = REGISTRY.counter(
+    "civicagent_llm_retries_total",
+    "Gemini attempts retried after a retryable error.",
+    ["model", "method"],
+)
+LLM_HEDGES = REGISTRY.counter(
+    "civicagent_llm_hedges_total",
+    "Hedged Gemini attempts (fired, and won when the hedge finished first).",
+    ["model", "outcome"],
+)
+LLM_DEADLINE_EXCEEDED = REGISTRY.counter(
+    "civicagent_llm_deadline_exceeded_total",
+    "Gemini calls abandoned at their deadline.",
+    ["model", "method"],
+)
+LLM_QUOTA_WAIT = REGISTRY.histogram(
+    "civicagent_llm_quota_wait_seconds",
+    "Time spent waiting for the client-side RPM/TPM token bucket.",
+    ["model"],
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def estimate_tokens(contents: List[Any]) -> int:
+    """
+    Rough request size for TPM accounting: ~4 chars per token for text,
+    a fixed block per inline image, plus an allowance for the response.
+    """
+    chars = 0
+    images = 0
+    for item in contents:
+        if isinstance(item, str):
+            chars += len(item)
+        elif isinstance(item, dict):
+            if "inline_data" in item:
+                images += 1
+            elif "text" in item:
+                chars += len(item["text"])
+            for part in item.get("parts", ()):
+                if isinstance(part, dict) and "inline_data" in part:
+                    images += 1
+                elif isinstance(part, dict):
+                    chars += len(part.get("text", ""))
+    return chars // CHARS_PER_TOKEN + images * IMAGE_TOKEN_ESTIMATE + OUTPUT_TOKEN_ESTIMATE
+
+
+def is_retryable(exc: BaseException) -> bool:
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS_CODES
+    if isinstance(exc, DeadlineExceeded):
+        return False
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return httpx is not None and isinstance(exc, httpx.TransportError)
+
+
+class TokenBucket:
+    """
+    Thread-safe bucket refilled at rate_per_minute, holding at most
+    burst_seconds worth of tokens. reserve() books capacity up front and
+    returns how long the caller must sleep before using it, so waiters are
+    served in arrival order without polling.
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = 10.0):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Returns seconds to wait (0 if available now), or None - reserving
+        nothing - if that would exceed max_wait.
+        """
+        amount = min(amount, self.capacity)  # oversized requests would never fit
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            wait = 0.0 if self._tokens >= amount else (amount - self._tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= amount
+            return wait
+
+    def refund(self, amount: float):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+
+class ModelQuota:
+    """Requests/min and tokens/min buckets for one model; either may be None (unlimited)."""
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+    def reserve(self, tokens: int, max_wait: Optional[float] = None) -> Optional[float]:
+        wait_r = self.requests.reserve(1, max_wait) if self.requests else 0.0
+        if wait_r is None:
+            return None
+        wait_t = self.tokens.reserve(tokens, max_wait) if self.tokens else 0.0
+        if wait_t is None:
+            if self.requests:
+                self.requests.refund(1)
+            return None
+        return max(wait_r, wait_t)
+
+
+class _LatencyTracker:
+    """Recent successful attempt latencies for one model, for the hedge threshold."""
+
+    def __init__(self, percentile: float, window: int = 512, refresh_every: int = 16):
+        self.percentile = percentile
+        self.refresh_every = refresh_every
+        self._samples = deque(maxlen=window)
+        self._since_refresh = 0
+        self._threshold: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
+            self._since_refresh += 1
+            if self._threshold is None or self._since_refresh >= self.refresh_every:
+                ordered = sorted(self._samples)
+                idx = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))
+                self._threshold = ordered[idx]
+                self._since_refresh = 0
+
+    def threshold(self, min_samples: int) -> Optional[float]:
+        return self._threshold if len(self._samples) >= min_samples else None
+
+
+class RequestScheduler:
+    """
+    - rpm / tpm: default per-model quota (None = unlimited)
+    - model_quotas: {model: (rpm, tpm)} overrides
+    - max_retries: retries after the first attempt
+    - timeout: per-call deadline in seconds (None = no deadline, the default)
+    - hedge_percentile: e.g. 95 to hedge attempts slower than the model's
+      p95; None disables hedging. Needs hedge_min_samples observations.
+    - max_workers: threads for the blocking path when racing attempts
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        model_quotas: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        timeout: Optional[float] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        max_workers: int = 64,
+        seed: Optional[int] = None
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.model_quotas = dict(model_quotas or {})
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_workers = max_workers
+        self._rng = random.Random(seed)
+        self._quotas: Dict[str, Optional[ModelQuota]] = {}
+        self._latency: Dict[str, _LatencyTracker] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, max_workers: int = 64) -> "RequestScheduler":
+        """
+        GEMINI_RPM, GEMINI_TPM                 default per-model quota
+        GEMINI_MODEL_QUOTAS="m1=rpm:tpm,m2=rpm:tpm"   per-model overrides
+        GEMINI_MAX_RETRIES=3
+        GEMINI_TIMEOUT=60                      seconds; unset or 0 disables
+        GEMINI_HEDGE_PERCENTILE=95             unset disables hedging
+        GEMINI_HEDGE_MIN_SAMPLES=20
+        """
+        def num(name: str) -> Optional[float]:
+            value = os.getenv(name)
+            return float(value) if value else None
+
+        model_quotas = {}
+        for item in filter(None, (os.getenv("GEMINI_MODEL_QUOTAS") or "").split(",")):
+            model, _, limits = item.partition("=")
+            rpm, _, tpm = limits.partition(":")
+            model_quotas[model.strip()] = (float(rpm) if rpm else None, float(tpm) if tpm else None)
+
+        timeout = num("GEMINI_TIMEOUT")
+        return cls(
+            rpm=num("GEMINI_RPM"),
+            tpm=num("GEMINI_TPM"),
+            model_quotas=model_quotas,
+            max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "3")),
+            timeout=timeout or None,
+            hedge_percentile=num("GEMINI_HEDGE_PERCENTILE"),
+            hedge_min_samples=int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", "20")),
+            max_workers=max_workers,
+        )
+
+    # -- policy pieces ------------------------------------------------------
+
+    def _quota(self, model: str) -> Optional[ModelQuota]:
+        if model not in self._quotas:
+            rpm, tpm = self.model_quotas.get(model, (self.rpm, self.tpm))
+            with self._lock:
+                self._quotas.setdefault(model, ModelQuota(rpm, tpm) if (rpm or tpm) else None)
+        return self._quotas[model]
+
+    def _tracker(self, model: str) -> Optional[_LatencyTracker]:
+        if self.hedge_percentile is None:
+            return None
+        tracker = self._latency.get(model)
+        if tracker is None:
+            with self._lock:
+                tracker = self._latency.setdefault(model, _LatencyTracker(self.hedge_percentile))
+        return tracker
+
+    def _hedge_after(self, model: str) -> Optional[float]:
+        tracker = self._tracker(model)
+        return tracker.threshold(self.hedge_min_samples) if tracker else None
+
+    def _record(self, model: str, latency: float):
+        tracker = self._tracker(model)
+        if tracker is not None:
+            tracker.record(latency)
+
+    def _backoff(self, attempt: int) -> float:
+        return self._rng.uniform(0.0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else deadline - time.monotonic()
+
+    def quota_wait(self, model: str, method: str, tokens: int, deadline: Optional[float] = None) -> float:
+        """Book quota for one request; returns seconds the caller must wait before sending it."""
+        quota = self._quota(model)
+        if quota is None:
+            return 0.0
+        wait = quota.reserve(tokens, self._remaining(deadline))
+        if wait is None:
+            LLM_DEADLINE_EXCEEDED.inc(model=model, method=method)
+            raise DeadlineExceeded(f"Quota for {model} not available before the deadline")
+        LLM_QUOTA_WAIT.observe(wait, model=model)
+        return wait
+
+    def _can_hedge(self, model: str, tokens: int) -> bool:
+        # a hedge only goes out if the quota has room right now
+        quota = self._quota(model)
+        return quota is None or quota.reserve(tokens, max_wait=0.0) is not None
+
+    def _retry_delay(self, exc: Exception, attempt: int, model: str, method: str, deadline: Optional[float]) -> float:
+        """Backoff before the next attempt, or re-raise exc if we should give up."""
+        if attempt >= self.max_retries or not is_retryable(exc):
+            raise exc
+        delay = self._backoff(attempt)
+        remaining = self._remaining(deadline)
+        if remaining is not None and delay >= remaining:
+            raise exc
+        LLM_RETRIES.inc(model=model, method=method)
+        logger.warning(f"[gemini] model={model} method={method} retry={attempt + 1} in {delay:.2f}s after {exc!r}")
+        return delay
+
+    def _deadline_exceeded(self, model: str, method: str):
+        LLM_DEADLINE_EXCEEDED.inc(model=model, method=method)
+        return DeadlineExceeded(f"{method} on {model} exceeded its {self.timeout}s deadline")
+
+    # -- blocking path ------------------------------------------------------
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gemini")
+        return self._pool
+
+    def _timed(self, model: str, fn: Callable[[], Any], started: Optional[threading.Event] = None) -> Any:
+        if started is not None:
+            started.set()
+        start = time.monotonic()
+        result = fn()
+        self._record(model, time.monotonic() - start)
+        return result
+
+    def _attempt(self, model: str, method: str, tokens: int, fn: Callable[[], Any], deadline: Optional[float]) -> Any:
+        hedge_after = self._hedge_after(model)
+        if deadline is None and hedge_after is None:
+            return self._timed(model, fn)  # nothing to race: run inline
+
+        pool = self._executor()
+        budget = self._remaining(deadline)
+        started = threading.Event()
+        primary = pool.submit(self._timed, model, fn, started)
+        primary.add_done_callback(lambda _: started.set())  # cancelled before it ran
+        # waiting for a free worker does not count against the deadline
+        started.wait()
+        if budget is not None:
+            deadline = time.monotonic() + budget
+        pending = {primary}
+        first_error = None
+        if hedge_after is not None:
+            remaining = self._remaining(deadline)
+            done, _ = wait_futures(pending, timeout=hedge_after if remaining is None else min(hedge_after, remaining))
+            if not done and self._can_hedge(model, tokens):
+                LLM_HEDGES.inc(model=model, outcome="fired")
+                pending.add(pool.submit(self._timed, model, fn))
+
+        while pending:
+            remaining = self._remaining(deadline)
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = wait_futures(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    if fut is not primary:
+                        LLM_HEDGES.inc(model=model, outcome="won")
+                    return fut.result()
+                first_error = first_error or fut.exception()
+        if first_error is not None and not pending:
+            raise first_error
+        # abandoned attempts finish in the background; their results are dropped
+        raise self._deadline_exceeded(model, method)
+
+    def call(self, model: str, method: str, tokens: int, fn: Callable[[], Any]) -> Any:
+        """Run fn (one blocking API attempt) under the scheduling policy."""
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        attempt = 0
+        while True:
+            wait = self.quota_wait(model, method, tokens, deadline)
+            if wait:
+                time.sleep(wait)
+            try:
+                return self._attempt(model, method, tokens, fn, deadline)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                time.sleep(self._retry_delay(e, attempt, model, method, deadline))
+                attempt += 1
+
+    # -- async path ---------------------------------------------------------
+
+    async def _atimed(self, model: str, afn: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.monotonic()
+        result = await afn()
+        self._record(model, time.monotonic() - start)
+        return result
+
+    async def _aattempt(
+        self, model: str, method: str, tokens: int, afn: Callable[[], Awaitable[Any]], deadline: Optional[float]
+    ) -> Any:
+        hedge_after = self._hedge_after(model)
+        if deadline is None and hedge_after is None:
+            return await self._atimed(model, afn)
+
+        primary = asyncio.ensure_future(self._atimed(model, afn))
+        tasks = [primary]
+        pending = {primary}
+        first_error = None
+        try:
+            if hedge_after is not None:
+                remaining = self._remaining(deadline)
+                done, _ = await asyncio.wait(
+                    pending, timeout=hedge_after if remaining is None else min(hedge_after, remaining)
+                )
+                if not done and self._can_hedge(model, tokens):
+                    LLM_HEDGES.inc(model=model, outcome="fired")
+                    hedge = asyncio.ensure_future(self._atimed(model, afn))
+                    tasks.append(hedge)
+                    pending.add(hedge)
+
+            while pending:
+                remaining = self._remaining(deadline)
+                if remaining is not None and remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            LLM_HEDGES.inc(model=model, outcome="won")
+                        return task.result()
+                    first_error = first_error or task.exception()
+            if first_error is not None and not pending:
+                raise first_error
+            raise self._deadline_exceeded(model, method)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def acall(self, model: str, method: str, tokens: int, afn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async counterpart of call(); losing or timed-out attempts are cancelled."""
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        attempt = 0
+        while True:
+            wait = self.quota_wait(model, method, tokens, deadline)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                return await self._aattempt(model, method, tokens, afn, deadline)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(e, attempt, model, method, deadline))
+                attempt += 1
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,292 @@
+# src/llm/schema_validation.py
+"""
+Validation and targeted repair of structured Gemini output.
+
+- compile_schema() turns a JSON schema into a tree of closures once (cached
+  per schema object). That covers the subset our schemas use: object,
+  array, string, integer, number, boolean, enum, required, maxLength.
+- Cheap fixes happen locally while validating:
+  - enum values are matched case-insensitively
+  - over-long strings are clipped to maxLength
+  - null optional properties are dropped
+- Anything still missing or invalid is re-requested with a tiny repair
+  prompt. It asks only for the affected top-level fields, under a
+  schema trimmed to those fields, and the answer is merged into the
+  original object. A malformed answer therefore costs one small call
+  instead of a full regeneration or a ticket built from defaults.
+
+structured_result() / astructured_result() run the validate -> repair
+loop; both GeminiClient and FakeGeminiClient call them.
+"""
+import os
+import json
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.llm.prompt_builder import CHARS_PER_TOKEN, compact_schema
+from src.utils.metrics import REGISTRY, LLM_PARSE_FAILURES
+
+logger = logging.getLogger(__name__)
+
+# Repair attempts per structured call (0 disables repair)
+DEFAULT_MAX_REPAIRS = int(os.getenv("GEMINI_MAX_REPAIRS", "1"))
+
+# How much of the original prompt a repair prompt carries, in tokens
+REPAIR_CONTEXT_TOKENS = 200
+
+SCHEMA_ERRORS = REGISTRY.counter(
+    "civicagent_llm_schema_errors_total",
+    "Structured responses that failed schema validation (after local fixes).",
+    ["method"],
+)
+SCHEMA_REPAIRS = REGISTRY.counter(
+    "civicagent_llm_schema_repairs_total",
+    "Field-level repair calls by outcome (fixed, still_invalid).",
+    ["method", "outcome"],
+)
+
+# (path, message); path is a tuple of keys / indexes from the root
+SchemaError = Tuple[Tuple[Any, ...], str]
+
+_Check = Callable[[Any, Tuple[Any, ...], List[SchemaError]], Any]
+
+
+def _compile(schema: Dict[str, Any]) -> _Check:
+    if "enum" in schema:
+        options = list(schema["enum"])
+        folded = {str(o).strip().lower(): o for o in options}
+
+        def check_enum(value, path, errors):
+            if value in options:
+                return value
+            if isinstance(value, str) and value.strip().lower() in folded:
+                return folded[value.strip().lower()]
+            errors.append((path, f"expected one of {options}"))
+            return value
+        return check_enum
+
+    kind = schema.get("type", "object")
+
+    if kind == "object":
+        props = {name: _compile(sub) for name, sub in schema.get("properties", {}).items()}
+        required = tuple(schema.get("required", ()))
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                errors.append((path, "expected object"))
+                return value
+            out = {k: v for k, v in value.items() if v is not None or k in required}
+            for name in required:
+                if name not in out:
+                    errors.append((path + (name,), "missing"))
+            for name, check in props.items():
+                if name in out:
+                    out[name] = check(out[name], path + (name,), errors)
+            return out
+        return check_object
+
+    if kind == "array":
+        item = _compile(schema.get("items", {"type": "string"}))
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                errors.append((path, "expected array"))
+                return value
+            return [item(v, path + (i,), errors) for i, v in enumerate(value)]
+        return check_array
+
+    if kind == "string":
+        max_length = schema.get("maxLength")
+
+        def check_string(value, path, errors):
+            if not isinstance(value, str):
+                errors.append((path, "expected string"))
+                return value
+            return value[:max_length] if max_length is not None else value
+        return check_string
+
+    types = {"integer": (int,), "number": (int, float), "boolean": (bool,)}.get(kind)
+    if types is None:
+        return lambda value, path, errors: value
+
+    def check_scalar(value, path, errors):
+        # bool is an int subclass; only "boolean" accepts it
+        if not isinstance(value, types) or (isinstance(value, bool) and kind != "boolean"):
+            errors.append((path, f"expected {kind}"))
+        return value
+    return check_scalar
+
+
+class CompiledSchema:
+    """A JSON schema compiled to a validator. Build with compile_schema()."""
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self._check = _compile(schema)
+        self._subschemas: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+
+    def validate(self, instance: Any) -> Tuple[Any, List[SchemaError]]:
+        """(instance with local fixes applied, remaining errors)"""
+        errors: List[SchemaError] = []
+        fixed = self._check(instance, (), errors)
+        return fixed, errors
+
+    @staticmethod
+    def fields(errors: List[SchemaError]) -> List[str]:
+        """Top-level fields the errors belong to, in first-seen order."""
+        seen: List[str] = []
+        for path, _ in errors:
+            if path and path[0] not in seen:
+                seen.append(path[0])
+        return seen
+
+    def subschema(self, fields: List[str]) -> Dict[str, Any]:
+        """
+        Object schema with only the given top-level fields, all required.
+        Memoized, so repeated repairs reuse one object (and its cached sketch).
+        """
+        key = tuple(fields)
+        sub = self._subschemas.get(key)
+        if sub is None:
+            props = self.schema.get("properties", {})
+            sub = self._subschemas.setdefault(key, {
+                "type": "object",
+                "properties": {f: props[f] for f in fields if f in props},
+                "required": [f for f in fields if f in props],
+            })
+        return sub
+
+
+_compiled: Dict[int, Tuple[Dict[str, Any], CompiledSchema]] = {}
+_compiled_lock = threading.Lock()
+
+
+def compile_schema(schema: Dict[str, Any]) -> CompiledSchema:
+    """Cached per schema object; schemas are module constants."""
+    cached = _compiled.get(id(schema))
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+    compiled = CompiledSchema(schema)
+    with _compiled_lock:
+        _compiled[id(schema)] = (schema, compiled)
+    return compiled
+
+
+def parse_json(text: str) -> Optional[Any]:
+    """JSON mode returns bare JSON; fall back to the outermost {...} for chatty replies."""
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        pass
+    s, e = text.find("{"), text.rfind("}")
+    if s != -1 and e > s:
+        try:
+            return json.loads(text[s:e + 1])
+        except ValueError:
+            pass
+    return None
+
+
+def _describe(errors: List[SchemaError]) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in path) or '(root)'}: {message}" for path, message in errors)
+
+
+def repair_request(
+    compiled: CompiledSchema,
+    instance: Dict[str, Any],
+    errors: List[SchemaError],
+    context: str
+) -> Tuple[str, Dict[str, Any]]:
+    """(prompt, schema) asking only for the fields named in errors."""
+    fields = compiled.fields(errors)
+    sub = compiled.subschema(fields)
+    current = {f: instance[f] for f in fields if f in instance}
+    prompt = (
+        "A JSON answer had invalid or missing fields. "
+        f"Return ONLY a JSON object with the keys {', '.join(fields)}.\n"
+        f"SCHEMA: {compact_schema(sub)}\n"
+        f"PROBLEMS: {_describe(errors)}\n"
+        + (f"CURRENT: {json.dumps(current, default=str)}\n" if current else "")
+        + f"\nORIGINAL REQUEST (excerpt):\n{context[:REPAIR_CONTEXT_TOKENS * CHARS_PER_TOKEN]}"
+    )
+    return prompt, sub
+
+
+def _start(text: str, schema: Dict[str, Any], method: str):
+    compiled = compile_schema(schema)
+    parsed = parse_json(text)
+    if parsed is None:
+        LLM_PARSE_FAILURES.inc(method=method)
+        parsed = {}
+    instance, errors = compiled.validate(parsed)
+    if not isinstance(instance, dict):
+        instance, errors = compiled.validate({})
+    if errors:
+        SCHEMA_ERRORS.inc(method=method)
+    return compiled, instance, errors
+
+
+def _merge(compiled: CompiledSchema, instance: Dict[str, Any], errors: List[SchemaError], text: str, method: str):
+    fields = compiled.fields(errors)
+    patch = parse_json(text)
+    if isinstance(patch, dict):
+        instance = {**instance, **{f: patch[f] for f in fields if f in patch}}
+    instance, remaining = compiled.validate(instance)
+    SCHEMA_REPAIRS.inc(method=method, outcome="still_invalid" if remaining else "fixed")
+    return instance, remaining
+
+
+def _finish(instance: Dict[str, Any], errors: List[SchemaError], text: str, method: str, fallback):
+    if not errors:
+        return instance
+    logger.warning(f"[{method}] structured output still invalid: {_describe(errors)}")
+    if fallback is not None and not any(not k.startswith("_") for k in instance):
+        # nothing usable at all: keep the caller's historical failure shape
+        return fallback(text)
+    instance["_schema_errors"] = [_describe([e]) for e in errors]
+    return instance
+
+
+def structured_result(
+    text: str,
+    schema: Dict[str, Any],
+    context: str,
+    regenerate: Callable[[str, Dict[str, Any]], str],
+    method: str = "generate_structured",
+    max_repairs: int = DEFAULT_MAX_REPAIRS,
+    fallback: Optional[Callable[[str], Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Validate model output text against schema, repairing invalid fields
+    with regenerate(repair_prompt, repair_schema) -> text.
+
+    If errors remain, they are listed under "_schema_errors".
+    fallback(text) is returned instead when nothing could be parsed at all.
+    """
+    compiled, instance, errors = _start(text, schema, method)
+    for _ in range(max_repairs):
+        if not errors:
+            break
+        prompt, sub = repair_request(compiled, instance, errors, context)
+        instance, errors = _merge(compiled, instance, errors, regenerate(prompt, sub), method)
+    return _finish(instance, errors, text, method, fallback)
+
+
+async def astructured_result(
+    text: str,
+    schema: Dict[str, Any],
+    context: str,
+    regenerate: Callable[[str, Dict[str, Any]], Awaitable[str]],
+    method: str = "agenerate_structured",
+    max_repairs: int = DEFAULT_MAX_REPAIRS,
+    fallback: Optional[Callable[[str], Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """Async counterpart of structured_result."""
+    compiled, instance, errors = _start(text, schema, method)
+    for _ in range(max_repairs):
+        if not errors:
+            break
+        prompt, sub = repair_request(compiled, instance, errors, context)
+        instance, errors = _merge(compiled, instance, errors, await regenerate(prompt, sub), method)
+    return _finish(instance, errors, text, method, fallback)
@@ -0,0 +1,155 @@
+# src/memory/duplicate_index.py
+import re
+import time
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, FrozenSet, List, Optional, Tuple
+
+from src.geo.address import normalize_address, parse_address
+from src.utils.image_pipeline import hamming_distance
+
+# Categories too broad to say two reports are about the same problem
+CATCH_ALL_CATEGORIES = frozenset({"", "general_issue", "unclassified"})
+
+# 'Main St & Elm Rd', 'Main and Elm', 'Main / Elm'
+_INTERSECTION = re.compile(r"\s(?:&|and|/)\s", re.IGNORECASE)
+
+_WORD = re.compile(r"[a-z0-9]{3,}")
+_STOPWORDS = frozenset(
+    "the and for with from this that there here near are was were has have had not "
+    "our your their very too been its".split()
+)
+
+
+class DuplicateIndex:
+    """
+    Finds an existing ticket for the same problem before any LLM work runs.
+
+    Reports are bucketed by (normalized location, issue_category) in a dict,
+    so a lookup is O(1) to reach the bucket plus a scan of the few tickets
+    in that bucket still inside the time window. When both the new report
+    and a candidate carry images, at least one pair of perceptual hashes
+    must be within max_hamming bits; otherwise the descriptions must share
+    at least min_similarity of their words (Jaccard).
+
+    Only reports that pin down one problem take part (see eligible()): a
+    catch-all category or a place without a house number or intersection
+    ("City Hall", "Main St") would merge unrelated complaints.
+
+    Expired entries are pruned lazily from a global time-ordered queue, so
+    memory tracks the window rather than total ticket count.
+    """
+
+    def __init__(self, window_seconds: float = 24 * 3600, max_hamming: int = 10, min_similarity: float = 0.2):
+        self.window_seconds = window_seconds
+        self.max_hamming = max_hamming
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        # { (location_key, category): deque([record, ...]) }  oldest first
+        self._buckets: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = {}
+        # (created_at, bucket_key) in insertion order, for global expiry
+        self._timeline: Deque[Tuple[float, Tuple[str, str]]] = deque()
+
+    @staticmethod
+    def eligible(location: str, issue_category: str) -> bool:
+        """True when location and category are specific enough to dedupe on."""
+        if (issue_category or "").lower() in CATCH_ALL_CATEGORIES:
+            return False
+        parts = parse_address(location)
+        if not parts["street"]:
+            return False
+        return parts["number"] is not None or bool(_INTERSECTION.search(location or ""))
+
+    @staticmethod
+    def _words(description: str) -> FrozenSet[str]:
+        return frozenset(w for w in _WORD.findall((description or "").lower()) if w not in _STOPWORDS)
+
+    def _similar(self, a: FrozenSet[str], b: FrozenSet[str]) -> bool:
+        if not a or not b:
+            return False
+        return len(a & b) / len(a | b) >= self.min_similarity
+
+    @staticmethod
+    def _key(location: str, issue_category: str) -> Tuple[str, str]:
+        return normalize_address(location), (issue_category or "").lower()
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._timeline and self._timeline[0][0] < cutoff:
+            _, key = self._timeline.popleft()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            while bucket and bucket[0]["created_at"] < cutoff:
+                bucket.popleft()
+            if not bucket:
+                del self._buckets[key]
+
+    def _matches(self, words: FrozenSet[str], image_hashes: List[int], record: Dict[str, Any]) -> bool:
+        if image_hashes and record["image_hashes"]:
+            return any(hamming_distance(a, b) <= self.max_hamming for a in image_hashes for b in record["image_hashes"])
+        return self._similar(words, record["words"])
+
+    def find(
+        self,
+        location: str,
+        issue_category: str,
+        description: str,
+        image_hashes: Optional[List[int]] = None,
+        now: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Most recent matching record ({"ticket_id", "ticket", "created_at",
+        "image_hashes", "words", "linked_reports"}) or None.
+        """
+        if not self.eligible(location, issue_category):
+            return None
+        now = now if now is not None else time.time()
+        words = self._words(description)
+        with self._lock:
+            self._expire(now)
+            bucket = self._buckets.get(self._key(location, issue_category))
+            if not bucket:
+                return None
+            for record in reversed(bucket):
+                if self._matches(words, image_hashes or [], record):
+                    return record
+        return None
+
+    def add(
+        self,
+        location: str,
+        issue_category: str,
+        ticket: Dict[str, Any],
+        description: str,
+        image_hashes: Optional[List[int]] = None,
+        now: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """The stored record, or None when the report is not eligible."""
+        if not self.eligible(location, issue_category):
+            return None
+        now = now if now is not None else time.time()
+        key = self._key(location, issue_category)
+        record = {
+            "ticket_id": ticket["ticket_id"],
+            "ticket": ticket,
+            "created_at": now,
+            "image_hashes": list(image_hashes or []),
+            "words": self._words(description),
+            "linked_reports": 0,
+        }
+        with self._lock:
+            self._expire(now)
+            self._buckets.setdefault(key, deque()).append(record)
+            self._timeline.append((now, key))
+        return record
+
+    def link(self, record: Dict[str, Any]) -> int:
+        """Count another report against an existing ticket."""
+        with self._lock:
+            record["linked_reports"] += 1
+            return record["linked_reports"]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(b) for b in self._buckets.values())
@@ -1,15 +1,65 @@
 # src/memory/memory_manager.py
 import time
-from typing import Dict, Any, List
+import bisect
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.geo.address import normalize_address
+
+
+class _TimeIndex:
+    """
+    (created_at, seq) pairs kept sorted for range scans. Deletes are lazy:
+    the owning MemoryManager drops the record and readers skip unknown seqs;
+    the arrays are rebuilt once dead entries outnumber live ones.
+    """
+
+    __slots__ = ("keys", "dead")
+
+    def __init__(self):
+        self.keys: List[Tuple[float, int]] = []
+        self.dead = 0
+
+    def add(self, created_at: float, seq: int):
+        key = (created_at, seq)
+        if not self.keys or key >= self.keys[-1]:
+            self.keys.append(key)  # common case: arrivals are in time order
+        else:
+            bisect.insort(self.keys, key)
+
+    def live_count(self) -> int:
+        return len(self.keys) - self.dead
+
+    def scan(self, lo: Tuple[float, int], hi: Tuple[float, int], newest_first: bool):
+        """Yield seqs with lo <= (created_at, seq) < hi."""
+        start = bisect.bisect_left(self.keys, lo)
+        end = bisect.bisect_left(self.keys, hi)
+        rng = range(end - 1, start - 1, -1) if newest_first else range(start, end)
+        for i in rng:
+            yield self.keys[i][1]
+
+    def compact(self, live: Dict[int, Any]):
+        self.keys = [k for k in self.keys if k[1] in live]
+        self.dead = 0
 
 
 class MemoryManager:
     """
     Simple long-term memory storage for users.
     Stores knowledge as { user_id: { memory_key: [entries...] } }
+
+    Entries under INDEXED_KEYS (submitted tickets) are also indexed by
+    ticket_id, location, issue_category, severity and user, each index
+    sorted by created_at, so query_tickets() answers filtered time-range
+    queries with bisect + a scan of the smallest matching index instead of
+    walking every user. Each user keeps at most max_entries_per_key entries
+    per memory key; older ones are evicted from the list and the indexes.
     """
 
-    def __init__(self):
+    INDEXED_KEYS = ("submitted_ticket",)
+    INDEXED_FIELDS = ("location", "issue_category", "severity", "user_id")
+
+    def __init__(self, max_entries_per_key: int = 1000):
         # Example structure:
         # memories = {
         #   "user123": {
@@ -17,23 +67,166 @@ class MemoryManager:
         #   }
         # }
         self.memories: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        self.max_entries_per_key = max_entries_per_key
+        self._lock = threading.Lock()
+        self._seq = 0
+        # seq -> indexed entry (live records only)
+        self._records: Dict[int, Dict[str, Any]] = {}
+        # id(entry) -> seq; kept out of the entry so callers never see it
+        self._seq_of: Dict[int, int] = {}
+        self._by_ticket_id: Dict[str, int] = {}
+        self._all = _TimeIndex()
+        # field -> normalized value -> _TimeIndex
+        self._indexes: Dict[str, Dict[str, _TimeIndex]] = {f: {} for f in self.INDEXED_FIELDS}
 
-    def create_memory(self, user_id: str, memory_key: str, data: Dict[str, Any]):
-        if user_id not in self.memories:
-            self.memories[user_id] = {}
+    @staticmethod
+    def _normalize(field: str, value: Any) -> str:
+        if field == "location":
+            return normalize_address(value or "")
+        if field == "user_id":
+            return str(value)
+        return str(value or "").strip().lower()
+
+    def _index(self, entry: Dict[str, Any]):
+        self._seq += 1
+        seq = self._seq
+        self._seq_of[id(entry)] = seq
+        data = entry["data"]
+        created_at = data.get("created_at", entry["timestamp"])
+        self._records[seq] = entry
+        if data.get("ticket_id"):
+            self._by_ticket_id[data["ticket_id"]] = seq
+        self._all.add(created_at, seq)
+        for field in self.INDEXED_FIELDS:
+            value = data.get(field)
+            if value is not None:
+                idx = self._indexes[field].setdefault(self._normalize(field, value), _TimeIndex())
+                idx.add(created_at, seq)
 
-        if memory_key not in self.memories[user_id]:
-            self.memories[user_id][memory_key] = []
+    def _unindex(self, entry: Dict[str, Any]):
+        seq = self._seq_of.pop(id(entry), None)
+        if seq is None or self._records.pop(seq, None) is None:
+            return
+        data = entry["data"]
+        if self._by_ticket_id.get(data.get("ticket_id")) == seq:
+            del self._by_ticket_id[data["ticket_id"]]
+        self._release(self._all)
+        for field in self.INDEXED_FIELDS:
+            value = data.get(field)
+            if value is None:
+                continue
+            key = self._normalize(field, value)
+            idx = self._indexes[field].get(key)
+            if idx is not None and not self._release(idx):
+                # last entry for this value: drop the bucket itself
+                del self._indexes[field][key]
 
+    def _release(self, idx: _TimeIndex) -> bool:
+        """Mark one entry of idx dead; False once idx has no live entries."""
+        idx.dead += 1
+        if idx.dead > idx.live_count():
+            idx.compact(self._records)
+        return idx.live_count() > 0
+
+    def create_memory(self, user_id: str, memory_key: str, data: Dict[str, Any]):
         entry = {
             "timestamp": time.time(),
             "data": data
         }
-        self.memories[user_id][memory_key].append(entry)
+        with self._lock:
+            if user_id not in self.memories:
+                self.memories[user_id] = {}
+
+            if memory_key not in self.memories[user_id]:
+                self.memories[user_id][memory_key] = []
+
+            entries = self.memories[user_id][memory_key]
+            entries.append(entry)
+            if memory_key in self.INDEXED_KEYS:
+                self._index(entry)
+
+            # bounded per-user retention
+            if len(entries) > self.max_entries_per_key:
+                evicted = entries[:-self.max_entries_per_key]
+                del entries[:-self.max_entries_per_key]
+                if memory_key in self.INDEXED_KEYS:
+                    for old in evicted:
+                        self._unindex(old)
         return entry
 
     def query_memory(self, user_id: str, memory_key: str) -> List[Dict[str, Any]]:
         return self.memories.get(user_id, {}).get(memory_key, [])
 
+    def get_ticket(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            seq = self._by_ticket_id.get(ticket_id)
+            return self._records[seq]["data"] if seq is not None else None
+
+    def query_tickets(
+        self,
+        location: Optional[str] = None,
+        issue_category: Optional[str] = None,
+        severity: Optional[str] = None,
+        user_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        newest_first: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Filtered, time-bounded ticket lookup with keyset pagination.
+        since/until bound created_at (since inclusive, until exclusive).
+        Returns {"items": [ticket memory dicts], "next_cursor": str | None};
+        pass next_cursor back in to fetch the following page.
+        """
+        filters = {
+            field: self._normalize(field, value)
+            for field, value in (
+                ("location", location),
+                ("issue_category", issue_category),
+                ("severity", severity),
+                ("user_id", user_id),
+            )
+            if value is not None
+        }
+
+        lo = (since if since is not None else float("-inf"), -1)
+        hi = (until if until is not None else float("inf"), -1)
+        if cursor:
+            ts, seq = cursor.split(":")
+            if newest_first:
+                hi = min(hi, (float(ts), int(seq)))
+            else:
+                lo = max(lo, (float(ts), int(seq) + 1))
+
+        with self._lock:
+            # drive the scan from the most selective index
+            candidates = [self._all]
+            for field, value in filters.items():
+                idx = self._indexes[field].get(value)
+                if idx is None:
+                    return {"items": [], "next_cursor": None}
+                candidates.append(idx)
+            driver = min(candidates, key=lambda i: i.live_count())
+
+            items = []
+            next_cursor = None
+            last_seq = None
+            for seq in driver.scan(lo, hi, newest_first):
+                entry = self._records.get(seq)
+                if entry is None:
+                    continue
+                data = entry["data"]
+                if any(self._normalize(f, data.get(f)) != v for f, v in filters.items()):
+                    continue
+                if len(items) == limit:
+                    next_cursor = f"{items[-1]['created_at']!r}:{last_seq}"
+                    break
+                items.append({**data, "created_at": data.get("created_at", entry["timestamp"])})
+                last_seq = seq
+
+        return {"items": items, "next_cursor": next_cursor}
+
     def list_users(self):
-        return list(self.memories.keys())
\ No newline at end of file
+        return list(self.memories.keys())
@@ -0,0 +1,118 @@
+# src/session/backends.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional
+
+
+class SQLiteSessionStore:
+    """
+    Durable session store on SQLite in WAL mode.
+
+    Events are append-only rows; the only deletes come from compact(),
+    which drops events older than the retention window and sessions that
+    have been idle longer than that.
+    """
+
+    def __init__(self, path: str, event_retention_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.event_retention_seconds = event_retention_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY, user_id TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_active REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,"
+            " timestamp REAL NOT NULL, event TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_events_session ON events(session_id, seq)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_events_ts ON events(timestamp)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_active ON sessions(last_active)")
+        self._db.commit()
+
+    def create_session(self, session_id: str, user_id: str, created_at: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, user_id, created_at, last_active) VALUES (?, ?, ?, ?)",
+                (session_id, user_id, created_at, created_at),
+            )
+            self._db.commit()
+
+    def append_event(self, session_id: str, entry: Dict[str, Any]) -> bool:
+        """Append one event; returns False if the session is unknown."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE sessions SET last_active = ? WHERE session_id = ?",
+                (entry["timestamp"], session_id),
+            )
+            if cur.rowcount == 0:
+                return False
+            self._db.execute(
+                "INSERT INTO events (session_id, timestamp, event) VALUES (?, ?, ?)",
+                (session_id, entry["timestamp"], json.dumps(entry["event"], default=str)),
+            )
+            self._db.commit()
+            return True
+
+    def load_session(self, session_id: str, max_events: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT user_id, created_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if max_events is None:
+                rows = self._db.execute(
+                    "SELECT timestamp, event FROM events WHERE session_id = ? ORDER BY seq", (session_id,)
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT timestamp, event FROM events WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                    (session_id, max_events),
+                ).fetchall()[::-1]
+        return {
+            "user_id": row[0],
+            "events": [{"timestamp": ts, "event": json.loads(ev)} for ts, ev in rows],
+            "created_at": row[1],
+        }
+
+    def list_sessions(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT session_id FROM sessions ORDER BY created_at")]
+
+    def compact(self, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Drop events past the retention window, then sessions idle past it.
+        """
+        cutoff = (now if now is not None else time.time()) - self.event_retention_seconds
+        with self._lock:
+            events = self._db.execute("DELETE FROM events WHERE timestamp < ?", (cutoff,)).rowcount
+            sessions = self._db.execute("DELETE FROM sessions WHERE last_active < ?", (cutoff,)).rowcount
+            self._db.commit()
+        return {"events_deleted": events, "sessions_deleted": sessions}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def session_store_from_env() -> Optional[SQLiteSessionStore]:
+    """
+    CIVICAGENT_SESSION_DB=sessions.sqlite enables the durable store;
+    CIVICAGENT_SESSION_RETENTION (seconds) sets the compaction window.
+    """
+    path = os.getenv("CIVICAGENT_SESSION_DB")
+    if not path:
+        return None
+    return SQLiteSessionStore(
+        path,
+        event_retention_seconds=float(os.getenv("CIVICAGENT_SESSION_RETENTION", str(7 * 24 * 3600))),
+    )
@@ -1,7 +1,11 @@
 # src/session/session_manager.py
 import time
 import uuid
-from typing import Dict, Any, List
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from src.session.backends import SQLiteSessionStore
 
 
 class SessionManager:
@@ -10,35 +14,108 @@ class SessionManager:
       - session history (events)
       - created_at timestamps
 
-    In production this would be external (Redis, Firestore, etc.)
-    For capstone, in-memory dictionary is enough.
+    Hot sessions live in an in-memory LRU bounded by max_sessions, with
+    sessions idle longer than idle_ttl_seconds evicted, and at most
+    max_events_per_session events kept in memory per session. With a
+    SQLiteSessionStore attached every write goes through to disk, evicted
+    sessions are reloaded on demand, and the store is compacted every
+    compact_interval_seconds. Without a store, appending to an evicted
+    session starts it over (its earlier events are gone).
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        store: Optional[SQLiteSessionStore] = None,
+        max_sessions: int = 10000,
+        idle_ttl_seconds: float = 3600,
+        max_events_per_session: int = 200,
+        compact_interval_seconds: float = 600
+    ):
         # sessions stored as:
-        # { session_id: {"user_id": ..., "events": [...], "created_at": ... } }
-        self.sessions: Dict[str, Dict[str, Any]] = {}
+        # { session_id: {"user_id": ..., "events": [...], "created_at": ..., "last_active": ... } }
+        self.sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.store = store
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_events_per_session = max_events_per_session
+        self.compact_interval_seconds = compact_interval_seconds
+        self._last_compaction = time.time()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        # LRU order == last-activity order, so idle sessions sit at the front
+        while self.sessions:
+            _, oldest = next(iter(self.sessions.items()))
+            if len(self.sessions) > self.max_sessions or now - oldest["last_active"] > self.idle_ttl_seconds:
+                self.sessions.popitem(last=False)
+            else:
+                break
+
+    def _touch(self, session_id: str, session: Dict[str, Any], now: float):
+        session["last_active"] = now
+        self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+        self._evict(now)
+
+    def _maybe_compact(self, now: float):
+        if self.store is not None and now - self._last_compaction >= self.compact_interval_seconds:
+            self._last_compaction = now
+            self.store.compact(now)
 
     def new_session(self, user_id: str) -> str:
         session_id = str(uuid.uuid4())
-        self.sessions[session_id] = {
-            "user_id": user_id,
-            "events": [],
-            "created_at": time.time()
-        }
+        now = time.time()
+        with self._lock:
+            self._touch(session_id, {
+                "user_id": user_id,
+                "events": [],
+                "created_at": now
+            }, now)
+        if self.store is not None:
+            self.store.create_session(session_id, user_id, now)
         return session_id
 
     def append_event(self, session_id: str, event: Dict[str, Any]):
-        if session_id not in self.sessions:
-            raise ValueError(f"Session {session_id} not found")
-
-        self.sessions[session_id]["events"].append({
-            "timestamp": time.time(),
+        now = time.time()
+        entry = {
+            "timestamp": now,
             "event": event
-        })
+        }
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None and self.store is None:
+                # evicted (LRU / idle TTL) with nowhere to reload it from:
+                # start it over rather than fail the request mid-pipeline
+                session = {"user_id": None, "events": [], "created_at": now}
+            if session is not None:
+                session["events"].append(entry)
+                if len(session["events"]) > self.max_events_per_session:
+                    del session["events"][:-self.max_events_per_session]
+                self._touch(session_id, session, now)
+
+        persisted = self.store is not None and self.store.append_event(session_id, entry)
+        if session is None and not persisted:
+            raise ValueError(f"Session {session_id} not found")
+        self._maybe_compact(now)
 
     def get_session(self, session_id: str) -> Dict[str, Any]:
-        return self.sessions.get(session_id, {})
+        now = time.time()
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self._touch(session_id, session, now)
+                return session
+
+        if self.store is None:
+            return {}
+        session = self.store.load_session(session_id, max_events=self.max_events_per_session)
+        if session is None:
+            return {}
+        with self._lock:
+            self._touch(session_id, session, now)
+        return session
 
     def list_sessions(self):
-        return list(self.sessions.keys())
\ No newline at end of file
+        if self.store is not None:
+            return self.store.list_sessions()
+        return list(self.sessions.keys())
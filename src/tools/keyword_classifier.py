@@ -0,0 +1,116 @@
+# src/tools/keyword_classifier.py
+
+import os
+import re
+import json
+from typing import Any, Dict, List, Optional
+
+REGULATION_DB_PATH = os.path.join(os.path.dirname(__file__), "regulation_db.json")
+
+
+def load_regulation_db(path: str = REGULATION_DB_PATH) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _normalize_keyword(keyword: str) -> str:
+    return " ".join(keyword.lower().split())
+
+
+class KeywordClassifier:
+    """
+    Multi-pattern keyword matcher compiled once into a single regex.
+
+    Every keyword from every category becomes one alternative (longest
+    first, anchored on a leading word boundary), so a description is scanned
+    in a single pass regardless of how many categories exist. Each hit is
+    credited to every category owning that keyword.
+
+    The first `ranked` entries are ordered rules: the earliest of them with
+    any hit wins outright, however many hits other categories have. Only
+    when none of them matches do the remaining categories compete, the one
+    with the most hits winning and ties going to the entry registered first.
+
+    Entries are dicts with at least "issue_category" and "keywords"; any
+    other fields (department, severity_hint, form_url, ...) are carried
+    through to the result. When the same category appears more than once
+    (case-insensitive), keywords are merged and earlier fields take
+    precedence.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], ranked: int = 0):
+        self.categories: Dict[str, Dict[str, Any]] = {}
+        self._keyword_owners: Dict[str, List[str]] = {}
+        self._ranked = set()
+
+        for i, entry in enumerate(entries):
+            key = entry["issue_category"].lower()
+            if i < ranked:
+                self._ranked.add(key)
+            merged = self.categories.setdefault(key, {})
+            for field, value in entry.items():
+                if field != "keywords":
+                    merged.setdefault(field, value)
+            for kw in entry.get("keywords", []):
+                norm = _normalize_keyword(kw)
+                owners = self._keyword_owners.setdefault(norm, [])
+                if key not in owners:
+                    owners.append(key)
+
+        self._priority = {key: i for i, key in enumerate(self.categories)}
+
+        # Leading boundary only, so plurals/inflections still hit
+        # ("potholes", "overflowing"); whitespace inside phrases is flexible.
+        alternatives = [
+            r"\s+".join(re.escape(word) for word in kw.split())
+            for kw in sorted(self._keyword_owners, key=len, reverse=True)
+        ]
+        self._pattern = re.compile(r"\b(?:" + "|".join(alternatives) + ")", re.IGNORECASE)
+
+    @classmethod
+    def from_sources(
+        cls,
+        rules: List[Dict[str, Any]],
+        db_path: Optional[str] = REGULATION_DB_PATH,
+    ) -> "KeywordClassifier":
+        """
+        Build from hand-written rules, tried in order before anything else,
+        followed by the regulation database.
+        """
+        entries = list(rules)
+        if db_path and os.path.exists(db_path):
+            entries.extend(load_regulation_db(db_path))
+        return cls(entries, ranked=len(rules))
+
+    def _rank(self, key: str, count: int):
+        if key in self._ranked:
+            return (0, self._priority[key])
+        return (1, -count, self._priority[key])
+
+    def match(self, text: str) -> Dict[str, int]:
+        """
+        Return {category_key: hit_count} for every matched category,
+        best first. Keys are the lowercased category names.
+        """
+        counts: Dict[str, int] = {}
+        for m in self._pattern.finditer(text):
+            for key in self._keyword_owners[_normalize_keyword(m.group(0))]:
+                counts[key] = counts.get(key, 0) + 1
+        return dict(sorted(counts.items(), key=lambda kv: self._rank(*kv)))
+
+    def classify(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Best matching category entry plus "matches" and "confidence"
+        (share of keyword hits belonging to the winner), or None.
+        """
+        counts = self.match(text)
+        if not counts:
+            return None
+        best = next(iter(counts))
+        result = dict(self.categories[best])
+        result["matches"] = counts
+        result["confidence"] = counts[best] / sum(counts.values())
+        return result
+
+    def classify_batch(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return [self.classify(t) for t in texts]
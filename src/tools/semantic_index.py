@@ -0,0 +1,201 @@
+# src/tools/semantic_index.py
+
+import os
+import json
+import zlib
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.tools.keyword_classifier import REGULATION_DB_PATH, load_regulation_db
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+
+# function words that would otherwise dominate short civic descriptions
+STOPWORDS = frozenset(
+    "a an the and or of on in at to is are was were be been it its this that there here "
+    "my our your their near by for with from too very has have had not no up down over out".split()
+)
+
+
+class HashedNgramEmbedder:
+    """
+    Offline, deterministic text embedding: character n-grams (padded words,
+    stopwords dropped) hashed with crc32 into a fixed number of signed
+    buckets, then L2-normalized. No model download, identical output on
+    every machine.
+    """
+
+    def __init__(self, dim: int = 1024, ngram_min: int = 3, ngram_max: int = 5):
+        if np is None:
+            raise RuntimeError("numpy is not installed. Run: pip install numpy")
+        self.dim = dim
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "kind": "hashed_ngram",
+            "dim": self.dim,
+            "ngram_min": self.ngram_min,
+            "ngram_max": self.ngram_max,
+            "stopwords": len(STOPWORDS),
+        }
+
+    def _features(self, text: str) -> List[int]:
+        feats = []
+        for word in "".join(c if c.isalnum() else " " for c in text.lower()).split():
+            if word in STOPWORDS:
+                continue
+            padded = f" {word} "
+            for n in range(self.ngram_min, self.ngram_max + 1):
+                for i in range(max(1, len(padded) - n + 1)):
+                    feats.append(zlib.crc32(padded[i:i + n].encode("utf-8")))
+        return feats
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            feats = np.asarray(self._features(text), dtype=np.uint32)
+            if feats.size == 0:
+                continue
+            signs = np.where(feats & 0x80000000, -1.0, 1.0).astype(np.float32)
+            out[row] = np.bincount(feats % self.dim, weights=signs, minlength=self.dim)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+def _entry_id(entry: Dict[str, Any]) -> int:
+    # stable 63-bit id per category so entries can be updated in place
+    digest = hashlib.sha1(entry["issue_category"].lower().encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") & 0x7FFFFFFFFFFFFFFF
+
+
+def _entry_hash(entry: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(entry, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _entry_document(entry: Dict[str, Any]) -> str:
+    return " ".join(
+        [entry["issue_category"].replace("_", " ")]
+        + list(entry.get("keywords", []))
+        + [entry.get("department", "")]
+    )
+
+
+class RegulationIndex:
+    """
+    FAISS inner-product index over regulation_db.json entries, used as a
+    semantic fallback when keyword rules miss.
+
+    If index_path is given the index is persisted there (with a JSON
+    manifest of per-entry content hashes) and re-opened memory-mapped.
+    On load, entries whose content changed are re-embedded and swapped in;
+    unchanged entries are left alone, so a DB edit costs only the delta.
+
+    Hashed n-gram scores are noisy, so a hit must score at least min_score
+    and beat the runner-up by min_margin; a near tie means the text is
+    ambiguous between categories and is better left to the LLM.
+    """
+
+    def __init__(
+        self,
+        db_path: str = REGULATION_DB_PATH,
+        index_path: Optional[str] = None,
+        embedder: Optional[HashedNgramEmbedder] = None,
+        min_score: float = 0.35,
+        min_margin: float = 0.1,
+    ):
+        if faiss is None:
+            raise RuntimeError("faiss-cpu is not installed. Run: pip install faiss-cpu")
+
+        self.db_path = db_path
+        self.index_path = index_path
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        self.index = None
+        self.load()
+
+    @property
+    def _manifest_path(self) -> str:
+        return self.index_path + ".manifest.json"
+
+    def _new_index(self):
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.embedder.dim))
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        if not self.index_path or not (os.path.exists(self.index_path) and os.path.exists(self._manifest_path)):
+            return None
+        with open(self._manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("embedder") != self.embedder.config():
+            return None
+        return manifest
+
+    def load(self):
+        """
+        (Re)load the DB and bring the index in sync with it.
+        """
+        current = {_entry_id(e): e for e in load_regulation_db(self.db_path)}
+        hashes = {eid: _entry_hash(e) for eid, e in current.items()}
+        self.entries = current
+
+        manifest = self._read_manifest()
+        stored = {int(k): v for k, v in manifest["entries"].items()} if manifest else {}
+        stale = [eid for eid, h in stored.items() if hashes.get(eid) != h]
+        fresh = [eid for eid, h in hashes.items() if stored.get(eid) != h]
+
+        if manifest and not stale and not fresh:
+            self.index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            return
+
+        # mutate an in-memory copy; mmapped indexes are read-only
+        self.index = faiss.read_index(self.index_path) if manifest else self._new_index()
+        if stale:
+            self.index.remove_ids(np.asarray(stale, dtype=np.int64))
+        if fresh:
+            vectors = self.embedder.embed([_entry_document(current[eid]) for eid in fresh])
+            self.index.add_with_ids(vectors, np.asarray(fresh, dtype=np.int64))
+        logger.info(f"[semantic_index] synced: removed={len(stale)} added={len(fresh)}")
+
+        if self.index_path:
+            faiss.write_index(self.index, self.index_path)
+            with open(self._manifest_path, "w", encoding="utf-8") as f:
+                json.dump({"embedder": self.embedder.config(), "entries": hashes}, f)
+
+    def search_batch(self, texts: List[str], k: int = 1) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """
+        Top-k (entry, score) pairs per text, keeping only scores >= min_score.
+        Empty when the best score is within min_margin of the second best.
+        """
+        if not texts:
+            return []
+        scores, ids = self.index.search(self.embedder.embed(texts), max(k, 2))
+        out = []
+        for row_scores, row_ids in zip(scores, ids):
+            row = [
+                (self.entries[int(eid)], float(score))
+                for score, eid in zip(row_scores, row_ids)
+                if eid != -1 and int(eid) in self.entries
+            ]
+            if len(row) > 1 and row[0][1] - row[1][1] < self.min_margin:
+                row = []
+            out.append([(entry, score) for entry, score in row[:k] if score >= self.min_score])
+        return out
+
+    def search(self, text: str, k: int = 1) -> List[Tuple[Dict[str, Any], float]]:
+        return self.search_batch([text], k)[0]
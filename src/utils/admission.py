@@ -0,0 +1,155 @@
+# src/utils/admission.py
+"""
+Admission control for the API.
+
+At most max_in_flight requests run at once; up to max_queue more wait
+for a slot (FIFO) for at most queue_timeout seconds. Anything beyond
+that is rejected immediately instead of piling up in the thread pool:
+- queue full             -> 429 Too Many Requests
+- waited queue_timeout   -> 503 Service Unavailable
+Both carry a Retry-After estimate derived from recent service times.
+"""
+import os
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+from src.utils.metrics import REGISTRY
+
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+    "civicagent_admission_in_flight",
+    "Requests currently holding an admission slot.",
+)
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "civicagent_admission_queue_depth",
+    "Requests waiting for an admission slot.",
+)
+ADMISSION_WAIT = REGISTRY.histogram(
+    "civicagent_admission_wait_seconds",
+    "Time admitted requests spent waiting for a slot.",
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "civicagent_admission_rejected_total",
+    "Requests turned away by admission control.",
+    ["reason"],
+)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(f"Admission rejected ({reason})")
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Must be used from a single event loop (the API's).
+    - max_in_flight: concurrent admitted requests
+    - max_queue: waiters allowed beyond that (0 = fail fast when busy)
+    - queue_timeout: seconds a waiter may wait before a 503
+    """
+
+    def __init__(self, max_in_flight: int = 32, max_queue: int = 64, queue_timeout: float = 5.0):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be >= 1")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._in_flight = 0
+        self._waiting = 0
+        # EWMA of how long an admitted request holds its slot
+        self._service_time = 1.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    def retry_after(self) -> int:
+        # time for the current backlog to drain through the available slots
+        backlog = self._waiting + self._in_flight
+        return max(1, math.ceil(self._service_time * backlog / self.max_in_flight))
+
+    def _reject(self, status_code: int, reason: str):
+        ADMISSION_REJECTED.inc(reason=reason)
+        raise AdmissionRejected(status_code, self.retry_after(), reason)
+
+    async def _acquire(self):
+        if self._in_flight < self.max_in_flight and not self._waiting:
+            await self._slots.acquire()  # free slot: returns without yielding
+            return
+        if self._waiting >= self.max_queue:
+            self._reject(429, "queue_full")
+
+        self._waiting += 1
+        ADMISSION_QUEUE_DEPTH.set(self._waiting)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject(503, "queue_timeout")
+        finally:
+            self._waiting -= 1
+            ADMISSION_QUEUE_DEPTH.set(self._waiting)
+        ADMISSION_WAIT.observe(time.perf_counter() - start)
+
+    async def acquire(self, slots: int = 1) -> float:
+        """
+        Take slots (raises AdmissionRejected); pass the result and the same
+        slots to release(). A request that runs several tickets at once
+        takes one slot per concurrent ticket.
+        """
+        for taken in range(slots):
+            try:
+                await self._acquire()
+            except BaseException:
+                for _ in range(taken):
+                    self._slots.release()
+                self._in_flight -= taken
+                ADMISSION_IN_FLIGHT.set(self._in_flight)
+                raise
+            self._in_flight += 1
+            ADMISSION_IN_FLIGHT.set(self._in_flight)
+        return time.perf_counter()
+
+    def observe(self, service_time: float):
+        """Feed one request's service time into the Retry-After estimate."""
+        self._service_time = 0.8 * self._service_time + 0.2 * service_time
+
+    def release(self, admitted_at: float, slots: int = 1, observe: bool = True):
+        """observe=False when the caller already reported per-item times via observe()."""
+        if observe:
+            self.observe(time.perf_counter() - admitted_at)
+        self._in_flight -= slots
+        ADMISSION_IN_FLIGHT.set(self._in_flight)
+        for _ in range(slots):
+            self._slots.release()
+
+    @asynccontextmanager
+    async def admit(self):
+        """async with controller.admit(): ...  (raises AdmissionRejected)"""
+        admitted_at = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(admitted_at)
+
+
+def admission_controller_from_env() -> AdmissionController:
+    """
+    CIVICAGENT_MAX_IN_FLIGHT=32
+    CIVICAGENT_MAX_QUEUE=64
+    CIVICAGENT_QUEUE_TIMEOUT=5   (seconds)
+    """
+    return AdmissionController(
+        max_in_flight=int(os.getenv("CIVICAGENT_MAX_IN_FLIGHT", "32")),
+        max_queue=int(os.getenv("CIVICAGENT_MAX_QUEUE", "64")),
+        queue_timeout=float(os.getenv("CIVICAGENT_QUEUE_TIMEOUT", "5")),
+    )
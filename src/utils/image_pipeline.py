@@ -0,0 +1,171 @@
+# src/utils/image_pipeline.py
+
+import io
+import base64
+import hashlib
+import logging
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+
+READ_CHUNK_BYTES = 256 * 1024
+
+
+def read_image(path: str) -> Tuple[bytes, str]:
+    """
+    Stream a file in chunks, returning (raw_bytes, sha256_hex).
+    """
+    digest = hashlib.sha256()
+    buf = io.BytesIO()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_BYTES), b""):
+            digest.update(chunk)
+            buf.write(chunk)
+    return buf.getvalue(), digest.hexdigest()
+
+
+class ImagePreprocessor:
+    """
+    Turns a list of uploaded image paths into Gemini inline-image dicts:
+      - files are read (and hashed) in parallel on a thread pool
+      - byte-identical duplicates are dropped by sha256
+      - each image is downsized to max_dimension and re-encoded as JPEG
+        at jpeg_quality (needs Pillow; without it originals pass through)
+      - images that would push the base64 payload past max_total_bytes
+        are skipped
+    """
+
+    def __init__(
+        self,
+        max_dimension: int = 1024,
+        jpeg_quality: int = 80,
+        max_total_bytes: int = 4 * 1024 * 1024,
+        max_workers: int = 4,
+    ):
+        self.max_dimension = max_dimension
+        self.jpeg_quality = jpeg_quality
+        self.max_total_bytes = max_total_bytes
+        self.max_workers = max_workers
+
+    def _encode(self, raw: bytes, mime: str) -> Tuple[bytes, str]:
+        """
+        Downsize + re-encode. Keeps the original when Pillow is missing,
+        the file can't be decoded, or re-encoding wouldn't make it smaller.
+        """
+        if Image is None:
+            return raw, mime
+        try:
+            with Image.open(io.BytesIO(raw)) as img:
+                img = ImageOps.exif_transpose(img)
+                resized = max(img.size) > self.max_dimension
+                if resized:
+                    img.thumbnail((self.max_dimension, self.max_dimension))
+                if img.mode not in ("RGB", "L"):
+                    img = img.convert("RGB")
+                out = io.BytesIO()
+                img.save(out, format="JPEG", quality=self.jpeg_quality, optimize=True)
+        except Exception as e:
+            logger.warning(f"[images] could not re-encode image ({e}); sending original")
+            return raw, mime
+
+        encoded = out.getvalue()
+        if not resized and len(encoded) >= len(raw):
+            return raw, mime
+        return encoded, "image/jpeg"
+
+    def _prepare_one(self, path: str, raw: bytes, sha: str) -> Dict[str, Any]:
+        mime = mimetypes.guess_type(path)[0] or "image/jpeg"
+        data, mime = self._encode(raw, mime)
+        return {
+            "mime_type": mime,
+            "data": base64.b64encode(data).decode("utf-8"),
+            "sha256": sha,
+            "source": path,
+        }
+
+    def prepare(self, image_paths: Optional[List[str]]) -> List[Dict[str, Any]]:
+        if not image_paths:
+            return []
+
+        workers = max(1, min(self.max_workers, len(image_paths)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            loaded = list(pool.map(read_image, image_paths))
+
+            seen = set()
+            unique = []
+            for path, (raw, sha) in zip(image_paths, loaded):
+                if sha in seen:
+                    continue
+                seen.add(sha)
+                unique.append((path, raw, sha))
+            if len(unique) < len(image_paths):
+                logger.info(f"[images] dropped {len(image_paths) - len(unique)} duplicate image(s)")
+
+            prepared = list(pool.map(lambda item: self._prepare_one(*item), unique))
+
+        # enforce the per-request payload budget, keeping upload order
+        total = 0
+        kept = []
+        for img in prepared:
+            size = len(img["data"])
+            if total + size > self.max_total_bytes:
+                logger.warning(f"[images] skipping {img['source']}: payload budget {self.max_total_bytes}B exceeded")
+                continue
+            total += size
+            kept.append(img)
+        return kept
+
+
+def perceptual_hash(raw: bytes) -> Optional[int]:
+    """
+    64-bit difference hash (dHash): grayscale 9x8 thumbnail, one bit per
+    horizontally adjacent pixel pair. Robust to re-compression and resizing,
+    so two phone photos of the same scene land a few bits apart.
+    Returns None without Pillow or for undecodable data.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(raw)) as img:
+            small = img.convert("L").resize((9, 8), Image.BILINEAR)
+            pixels = list(small.getdata())
+    except Exception:
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return bits
+
+
+def perceptual_hashes(image_paths: Optional[List[str]], max_workers: int = 4) -> List[int]:
+    """
+    dHash every readable image in parallel; unreadable files are skipped.
+    """
+    if not image_paths:
+        return []
+
+    def _hash(path: str) -> Optional[int]:
+        try:
+            raw, _ = read_image(path)
+        except OSError:
+            return None
+        return perceptual_hash(raw)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(image_paths)))) as pool:
+        return [h for h in pool.map(_hash, image_paths) if h is not None]
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
@@ -0,0 +1,271 @@
+# src/utils/logging_tracing.py
+"""
+Low-overhead tracing for the agent pipeline.
+
+- TraceSpan records events as (monotonic offset, fields) tuples; nothing is
+  serialized on the request path. The sampling decision is made once, when
+  the root span starts (head-based), and inherited by child spans.
+- ObservabilityWriter hands finished spans to a background thread that
+  truncates payloads, batches NDJSON lines into one write per flush and
+  rotates the file by size and age. write_span() never blocks: if the
+  queue is full the span is dropped and counted.
+
+Logged values are captured by reference and serialized later, so callers
+should not mutate a dict after logging it.
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_config = {
+    "sample_rate": float(os.getenv("TRACE_SAMPLE_RATE", "1.0")),
+    "max_field_chars": int(os.getenv("TRACE_MAX_FIELD_CHARS", "512")),
+    "max_items": 20,
+    "max_depth": 4,
+}
+
+
+def configure_tracing(
+    sample_rate: Optional[float] = None,
+    max_field_chars: Optional[int] = None,
+    max_items: Optional[int] = None,
+    max_depth: Optional[int] = None
+):
+    """Override sampling / truncation defaults (also settable via TRACE_* env vars)."""
+    for key, value in (
+        ("sample_rate", sample_rate),
+        ("max_field_chars", max_field_chars),
+        ("max_items", max_items),
+        ("max_depth", max_depth),
+    ):
+        if value is not None:
+            _config[key] = value
+
+
+def _truncate(value: Any, depth: int = 0) -> Any:
+    """Bound the size of anything we put on disk."""
+    if isinstance(value, str):
+        limit = _config["max_field_chars"]
+        return value if len(value) <= limit else value[:limit] + f"...(+{len(value) - limit} chars)"
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if depth >= _config["max_depth"]:
+        return _truncate(repr(value), depth)
+    limit = _config["max_items"]
+    if isinstance(value, dict):
+        out = {str(k): _truncate(v, depth + 1) for k, v in list(value.items())[:limit]}
+        if len(value) > limit:
+            out["_truncated_keys"] = len(value) - limit
+        return out
+    if isinstance(value, (list, tuple, set)):
+        items = list(value)
+        out = [_truncate(v, depth + 1) for v in items[:limit]]
+        if len(items) > limit:
+            out.append(f"...(+{len(items) - limit} items)")
+        return out
+    return _truncate(str(value), depth)
+
+
+class TraceSpan:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled",
+                 "start_wall", "_start_ns", "duration_ms", "events")
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        sampled: Optional[bool] = None
+    ):
+        self.name = name
+        self.sampled = (random.random() < _config["sample_rate"]) if sampled is None else sampled
+        self.trace_id = trace_id
+        self.span_id = None
+        self.parent_id = parent_id
+        self.duration_ms = None
+        self.events: List[Any] = []
+        self.start_wall = 0.0
+        self._start_ns = 0
+        if self.sampled:
+            # getrandbits is much cheaper than uuid4; ids need no crypto strength
+            self.trace_id = trace_id or f"{random.getrandbits(128):032x}"
+            self.span_id = f"{random.getrandbits(64):016x}"
+            self.start_wall = time.time()
+            self._start_ns = time.perf_counter_ns()
+
+    def child(self, name: str) -> "TraceSpan":
+        """Child span sharing this span's trace and sampling decision."""
+        return TraceSpan(name, trace_id=self.trace_id, parent_id=self.span_id, sampled=self.sampled)
+
+    def log(self, **fields):
+        if self.sampled:
+            self.events.append((time.perf_counter_ns(), fields))
+
+    def finish(self):
+        if self.sampled and self.duration_ms is None:
+            self.duration_ms = (time.perf_counter_ns() - self._start_ns) / 1e6
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_wall,
+            "duration_ms": self.duration_ms,
+            "events": [
+                {"offset_ms": round((ts - self._start_ns) / 1e6, 3), **_truncate(fields)}
+                for ts, fields in self.events
+            ],
+        }
+
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class ObservabilityWriter:
+    """
+    Asynchronous, batched NDJSON span writer with size/age-based rotation
+    (output_path -> output_path.1 -> ... -> output_path.<backup_count>).
+    Rotation is checked before each batch write.
+    """
+
+    def __init__(
+        self,
+        output_path: str = "observability_spans.ndjson",
+        max_bytes: int = 50 * 1024 * 1024,
+        max_age_seconds: Optional[float] = 24 * 3600,
+        backup_count: int = 5,
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+        queue_size: int = 10000
+    ):
+        self.output_path = output_path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self._fh = None
+        self._opened_at = 0.0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="observability-writer", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def write_span(self, span: TraceSpan):
+        """Enqueue a finished span; O(1), never touches disk."""
+        if not span.sampled or self._closed:
+            return
+        span.finish()
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Block until everything enqueued so far is on disk."""
+        if self._thread is None:
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    # -- background thread -------------------------------------------------
+
+    def _open(self):
+        self._fh = open(self.output_path, "a", encoding="utf-8")
+        self._opened_at = time.monotonic()
+
+    def _rotate(self):
+        self._fh.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.output_path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.output_path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.output_path, f"{self.output_path}.1")
+        else:
+            os.remove(self.output_path)
+        self._open()
+
+    def _write_batch(self, spans: List[TraceSpan]):
+        lines = []
+        for span in spans:
+            try:
+                lines.append(json.dumps(span.to_record(), default=str))
+            except Exception as e:
+                logger.warning(f"[tracing] could not serialize span {span.name}: {e}")
+        if not lines:
+            return
+        data = "\n".join(lines) + "\n"
+        if self._fh is None:
+            self._open()
+        size = self._fh.tell()
+        too_big = size > 0 and size + len(data) > self.max_bytes
+        too_old = self.max_age_seconds is not None and time.monotonic() - self._opened_at > self.max_age_seconds
+        if too_big or (too_old and size > 0):
+            self._rotate()
+        self._fh.write(data)
+        self._fh.flush()
+        self.written += len(lines)
+
+    def _run(self):
+        batch: List[TraceSpan] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False
+
+            if isinstance(item, TraceSpan):
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+
+            try:
+                if batch:
+                    self._write_batch(batch)
+            except Exception as e:
+                logger.warning(f"[tracing] failed to write {len(batch)} spans: {e}")
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+
+            if isinstance(item, _Flush):
+                item.done.set()
+            elif item is None:
+                if self._fh is not None:
+                    self._fh.close()
+                    self._fh = None
+                return
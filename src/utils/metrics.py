@@ -0,0 +1,279 @@
+# src/utils/metrics.py
+"""
+In-process metrics with Prometheus text exposition.
+
+Histograms use fixed buckets; an observation is one bisect plus a couple
+of increments under a per-series lock that is practically never contended.
+Series (label combinations) are created on first use.
+"""
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 0.5ms .. 60s, roughly 2.5x apart: resolves both rule-only stages and LLM calls
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _child(self, labels: Dict[str, str]):
+        key = self._key(labels)
+        child = self._series.get(key)
+        if child is None:
+            with self._lock:
+                child = self._series.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._series[key] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _CounterChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0, **labels):
+        child = self._child(labels)
+        with child.lock:
+            child.value += amount
+
+    def value(self, **labels) -> float:
+        child = self._series.get(self._key(labels))
+        return child.value if child else 0.0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, child in list(self._series.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def set(self, value: float, **labels):
+        child = self._child(labels)
+        with child.lock:
+            child.value = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        child = self._child(labels)
+        with child.lock:
+            child.value += amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        child = self._series.get(self._key(labels))
+        return child.value if child else 0.0
+
+    render = Counter.render
+
+
+class _HistogramChild:
+    __slots__ = ("counts", "sum", "count", "lock")
+
+    def __init__(self, n: int):
+        self.counts = [0] * n
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def _new_child(self):
+        return _HistogramChild(len(self.buckets))
+
+    def observe(self, value: float, **labels):
+        child = self._child(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with child.lock:
+            child.counts[i] += 1
+            child.sum += value
+            child.count += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Bucket upper bound containing the q-quantile (coarse, for quick checks)."""
+        child = self._series.get(self._key(labels))
+        if not child or not child.count:
+            return None
+        target = q * child.count
+        running = 0
+        for bound, n in zip(self.buckets, child.counts):
+            running += n
+            if running >= target:
+                return bound
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, child in list(self._series.items()):
+            with child.lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            running = 0
+            for bound, n in zip(self.buckets, counts):
+                running += n
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render()
+
+
+# --- pipeline metrics shared across modules ---------------------------------
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "civicagent_stage_duration_seconds",
+    "Latency of each Orchestrator.create_ticket stage.",
+    ["stage"],
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "civicagent_stage_errors_total",
+    "Exceptions raised inside an Orchestrator.create_ticket stage.",
+    ["stage"],
+)
+LLM_LATENCY = REGISTRY.histogram(
+    "civicagent_llm_request_duration_seconds",
+    "Latency of Gemini generate_content calls (cache hits excluded).",
+    ["model", "method"],
+)
+LLM_ERRORS = REGISTRY.counter(
+    "civicagent_llm_errors_total",
+    "Gemini calls that raised.",
+    ["model", "method"],
+)
+LLM_PARSE_FAILURES = REGISTRY.counter(
+    "civicagent_llm_parse_failures_total",
+    "Structured Gemini responses that could not be parsed as JSON.",
+    ["method"],
+)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Time a pipeline stage and count it as an error if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
@@ -0,0 +1,100 @@
+# src/utils/singleflight.py
+"""
+Single-flight call coalescing.
+
+Concurrent calls with the same key share one execution: the first caller
+(the leader) runs the function, the rest block until it finishes and get
+the same result or exception. A successful result is also served to
+identical calls arriving within window_seconds after completion, which
+catches client retries and double submits. Dict results are handed out
+as shallow copies so one caller's edits don't leak into the others.
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from src.utils.metrics import REGISTRY
+
+SINGLEFLIGHT_COALESCED = REGISTRY.counter(
+    "civicagent_singleflight_coalesced_total",
+    "Calls served by another identical call instead of executing.",
+    ["name", "phase"],
+)
+SINGLEFLIGHT_EXECUTED = REGISTRY.counter(
+    "civicagent_singleflight_executed_total",
+    "Calls that actually executed (leaders).",
+    ["name"],
+)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+def _share(result: Any) -> Any:
+    return dict(result) if isinstance(result, dict) else result
+
+
+class SingleFlight:
+    """
+    Thread-safe; callers block on the leader's threading.Event.
+    - window_seconds: how long a finished result keeps answering
+      identical calls (0 = coalesce in-flight calls only)
+    - max_recent: bound on remembered finished results
+    """
+
+    def __init__(self, name: str = "default", window_seconds: float = 2.0, max_recent: int = 10000):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.max_recent = max_recent
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, _Call] = {}
+        # key -> (finished_at, result), in completion order
+        self._recent: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def _expire(self, now: float):
+        while self._recent:
+            key, (finished_at, _) = next(iter(self._recent.items()))
+            if now - finished_at < self.window_seconds and len(self._recent) <= self.max_recent:
+                break
+            self._recent.popitem(last=False)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._expire(time.monotonic())
+            recent = self._recent.get(key)
+            if recent is not None:
+                SINGLEFLIGHT_COALESCED.inc(name=self.name, phase="window")
+                return _share(recent[1])
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._in_flight[key] = call
+
+        if not leader:
+            SINGLEFLIGHT_COALESCED.inc(name=self.name, phase="in_flight")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _share(call.result)
+
+        SINGLEFLIGHT_EXECUTED.inc(name=self.name)
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                if call.error is None and self.window_seconds > 0:
+                    self._recent[key] = (time.monotonic(), call.result)
+            call.done.set()
+        return _share(call.result)